@@ -1,33 +1,548 @@
+import base64
 import itertools
+import math
 import random
 import json
+import struct
+from collections import deque
+from collections.abc import Iterator
 from Cell import Cell
 
+NEIGHBOR_OFFSETS = [
+  (-1, -1), (0, -1), (1, -1),
+  (-1, 0), (1, 0),
+  (-1, 1), (0, 1), (1, 1)
+]
+
+# Number of layouts drawn when shuffling the remaining mines
+SHUFFLE_ATTEMPTS = 10
+# Most layouts of the remaining mines that are listed in full instead of sampled
+MAX_ENUMERATED_LAYOUTS = 64
+
+neighborTables: dict[tuple[int, int], list[tuple[int, ...]]] = {}
+
+def getNeighborTable(width: int, height: int) -> list[tuple[int, ...]]:
+  """
+  Get the flat neighbor indexes of every cell for a board size.
+  Tables are built once per (width, height) and shared by every board of that size.
+
+  Args:
+    width (int): The width of the board.
+    height (int): The height of the board.
+
+  Returns:
+    list[tuple[int, ...]]: For each flat index, the flat indexes of its neighbors.
+  """
+  table = neighborTables.get((width, height))
+  if table is None:
+    table = []
+    for y in range(height):
+      for x in range(width):
+        table.append(tuple((y + dy) * width + x + dx for dx, dy in NEIGHBOR_OFFSETS if 0 <= x + dx < width and 0 <= y + dy < height))
+    neighborTables[(width, height)] = table
+  return table
+
+neighborBitTables: dict[tuple[int, int], list[tuple[tuple[int, int], ...]]] = {}
+
+def getNeighborBitTable(width: int, height: int) -> list[tuple[tuple[int, int], ...]]:
+  """
+  Get the neighbors of every cell for a board size along with the bit each one has in a neighborhood code.
+  Tables are built once per (width, height) and shared by every board of that size.
+
+  Args:
+    width (int): The width of the board.
+    height (int): The height of the board.
+
+  Returns:
+    list[tuple[tuple[int, int], ...]]: For each flat index, (flat index, 1 << k) for the neighbor at NEIGHBOR_OFFSETS[k].
+  """
+  table = neighborBitTables.get((width, height))
+  if table is None:
+    table = []
+    for y in range(height):
+      for x in range(width):
+        table.append(tuple(((y + dy) * width + x + dx, 1 << bit) for bit, (dx, dy) in enumerate(NEIGHBOR_OFFSETS) if 0 <= x + dx < width and 0 <= y + dy < height))
+    neighborBitTables[(width, height)] = table
+  return table
+
+laneMaskTables: dict[tuple[int, int], dict[str, int]] = {}
+
+def getLaneMasks(width: int, height: int) -> dict[str, int]:
+  """
+  Get the lane masks used for whole-board arithmetic on a board size.
+  A plane is loaded into a Python int with one byte ("lane") per cell, so shifting the int by 8 bits moves every
+  cell one column and shifting by 8 * width bits moves every cell one row. The masks clear the lanes that would
+  wrap around a row edge. Masks are built once per (width, height) and shared by every board of that size.
+
+  Args:
+    width (int): The width of the board.
+    height (int): The height of the board.
+
+  Returns:
+    dict[str, int]: The masks:
+      - ones: 0x01 in every lane.
+      - full: 0xFF in every lane.
+      - notFirstColumn: 0xFF in every lane except those in column 0.
+      - notLastColumn: 0xFF in every lane except those in the last column.
+  """
+  masks = laneMaskTables.get((width, height))
+  if masks is None:
+    masks = {
+      "ones": int.from_bytes(b'\x01' * (width * height), 'little'),
+      "full": int.from_bytes(b'\xff' * (width * height), 'little'),
+      "notFirstColumn": int.from_bytes((b'\x00' + b'\xff' * (width - 1)) * height, 'little'),
+      "notLastColumn": int.from_bytes((b'\xff' * (width - 1) + b'\x00') * height, 'little')
+    }
+    laneMaskTables[(width, height)] = masks
+  return masks
+
+neighborPatternTables: dict[int, dict[tuple[bool, bool], int]] = {}
+
+def getNeighborPatterns(width: int) -> dict[tuple[bool, bool], int]:
+  """
+  Get the bitmask patterns of a 3x3 neighborhood for a board width.
+  A pattern has bit r * width + c set for every neighbor in row r and column c of the 3x3 block (the center is left
+  out), so shifting it left by the flat index of the block's top-left cell gives the neighborhood of any cell as a
+  board-wide bitmask. Cells in the first or last column use a pattern without the column that would wrap around.
+
+  Args:
+    width (int): The width of the board.
+
+  Returns:
+    dict[tuple[bool, bool], int]: The patterns, keyed by (has a column to the left, has a column to the right).
+  """
+  patterns = neighborPatternTables.get(width)
+  if patterns is None:
+    patterns = {}
+    for hasLeft in (False, True):
+      for hasRight in (False, True):
+        columns = [column for column in (0, 1, 2) if (column != 0 or hasLeft) and (column != 2 or hasRight)]
+        patterns[(hasLeft, hasRight)] = sum(1 << (row * width + column) for row in (0, 1, 2) for column in columns if row != 1 or column != 1)
+    neighborPatternTables[width] = patterns
+  return patterns
+
+FLIPPED = bytes.maketrans(b'\x00\x01', b'\x01\x00')
+BIT_DIGITS = bytes.maketrans(b'\x00\x01', b'01')
+BIT_VALUES = bytes.maketrans(b'01', b'\x00\x01')
+# M/F/?/. board text to plane bytes: M is a hidden mine, F a flagged mine, ? a hidden safe cell and . a visible safe cell
+TEXT_SYMBOLS = b'MF?.'
+TEXT_MINES = bytes.maketrans(TEXT_SYMBOLS, b'\x01\x01\x00\x00')
+TEXT_VISIBLE = bytes.maketrans(TEXT_SYMBOLS, b'\x00\x00\x00\x01')
+TEXT_FLAGS = bytes.maketrans(TEXT_SYMBOLS, b'\x00\x01\x00\x00')
+# Header of the binary board format: width, height, mines, startX, startY, little-endian
+BINARY_HEADER = struct.Struct('<HHIHH')
+
+DISPLAY_SYMBOLS = bytearray(b'?' * 256)
+for number in range(9):
+  DISPLAY_SYMBOLS[number] = ord(str(number)) # visible number
+  DISPLAY_SYMBOLS[16 + number] = ord('!') # visible mine
+DISPLAY_SYMBOLS[33] = ord('F') # hidden flagged cell
+DISPLAY_SYMBOLS = bytes(DISPLAY_SYMBOLS)
+
+def packPlane(plane: bytearray) -> str:
+  """
+  Pack a plane into one bit per cell and encode it as unpadded base64url.
+  Bit i (least significant first within each byte) is set when plane[i] is 1.
+
+  Args:
+    plane (bytearray): The plane to pack, with one 0/1 byte per cell.
+
+  Returns:
+    str: The encoded plane.
+  """
+  mask = int(plane.translate(BIT_DIGITS)[::-1], 2) if len(plane) > 0 else 0
+  return base64.urlsafe_b64encode(mask.to_bytes((len(plane) + 7) // 8, 'little')).rstrip(b'=').decode('ascii')
+
+def unpackPlane(packed: str | bytes, size: int) -> bytearray:
+  """
+  Decode a plane packed by packPlane.
+
+  Args:
+    packed (str | bytes): The unpadded base64url text.
+    size (int): The number of cells on the board.
+
+  Returns:
+    bytearray: The plane, with one 0/1 byte per cell.
+
+  Raises:
+    ValueError: If the text is not valid base64url or does not hold exactly `size` cells.
+  """
+  if isinstance(packed, str):
+    packed = packed.encode('ascii')
+  data = base64.b64decode(packed + b'=' * (-len(packed) % 4), altchars=b'-_', validate=True)
+  return planeFromBits(data, size)
+
+def planeFromBits(data: bytes | memoryview, size: int) -> bytearray:
+  """
+  Expand raw packed bits (bit i of the little-endian integer is cell i) into a plane with one byte per cell.
+  The bits go through a single integer and one bytes.translate, so no per-cell Python objects are created.
+
+  Args:
+    data (bytes | memoryview): Exactly (size + 7) // 8 bytes. A memoryview is read in place.
+    size (int): The number of cells on the board.
+
+  Returns:
+    bytearray: The plane, with one 0/1 byte per cell.
+
+  Raises:
+    ValueError: If the data does not hold exactly `size` cells.
+  """
+  if len(data) != (size + 7) // 8:
+    raise ValueError(f"Packed plane has {len(data)} bytes, expected {(size + 7) // 8}")
+  mask = int.from_bytes(data, 'little')
+  if mask >> size:
+    raise ValueError("Packed plane has bits set past the last cell")
+  if size == 0:
+    return bytearray()
+  return bytearray(format(mask, f'0{size}b')[::-1].encode('ascii').translate(BIT_VALUES))
+
 class Board:
-  def __init__(self, *, width: int, height: int, mines: int, startLocation: tuple[int, int], grid: list[list[Cell]]):
+  def __init__(self, *, width: int, height: int, mines: int, startLocation: tuple[int, int], minePlane: bytearray, visiblePlane: bytearray = None, flagPlane: bytearray = None, mineCounts: bytearray = None, flagCounts: bytearray = None):
     """
     Initialize the Board.
+    Cell state is kept in three packed planes with one byte per cell, indexed by y * width + x.
+    The number of mines and flags around every cell is kept alongside the planes and updated as cells change.
 
     Args:
       width (int): The width of the board.
       height (int): The height of the board.
       mines (int): The number of mines on the board.
       startLocation tuple[int, int]: The starting location on the board
-      grid list[list[Cell]]: The grid of cells
+      minePlane bytearray: 1 where a cell holds a mine, 0 otherwise
+      visiblePlane bytearray: 1 where a cell is visible, 0 otherwise. Defaults to all hidden.
+      flagPlane bytearray: 1 where a cell is flagged, 0 otherwise. Defaults to no flags.
+      mineCounts bytearray: The number of mines around each cell. Computed from the planes when omitted.
+      flagCounts bytearray: The number of flags around each cell. Computed from the planes when omitted.
 
     Raises:
-      ValueError: If required parameters are missing or start location is not provided when grid is None.
+      ValueError: If required parameters are missing or the planes do not match the board size.
     """
     self.width = width
     self.height = height
-    self.grid = grid
-    self.mines = self.getMineCount()
     self.startLocation = startLocation
-    requiredParams = ['width', 'height', 'mines', 'startLocation', 'grid']
+    requiredParams = ['width', 'height', 'startLocation']
     missingParams = [param for param in requiredParams if self.__dict__[param] is None]
+    if minePlane is None:
+      missingParams.append('minePlane')
     if missingParams:
       raise ValueError(f"Missing required parameters: {', '.join(missingParams)}")
-	
+    self.size = width * height
+    self.neighborTable = getNeighborTable(width, height)
+    self.neighborBitTable = None # built on first use by neighborCode
+    self.laneMasks = getLaneMasks(width, height)
+    self.neighborPatterns = getNeighborPatterns(width)
+    if mineCounts is None or flagCounts is None:
+      self.loadPlanes(minePlane, visiblePlane, flagPlane)
+    else:
+      self.minePlane = minePlane
+      self.visiblePlane = visiblePlane
+      self.flagPlane = flagPlane
+      self.mineCounts = mineCounts
+      self.flagCounts = flagCounts
+      self.mines = self.getMineCount()
+
+  def loadPlanes(self, minePlane: bytearray, visiblePlane: bytearray = None, flagPlane: bytearray = None):
+    """
+    Replace the cell planes of the board and recompute the neighbor counts. Missing visibility and flag planes are cleared.
+
+    Args:
+      minePlane (bytearray): The new mine plane.
+      visiblePlane (bytearray): The new visibility plane.
+      flagPlane (bytearray): The new flag plane.
+
+    Raises:
+      ValueError: If a plane does not match the board size.
+    """
+    visiblePlane = bytearray(self.size) if visiblePlane is None else visiblePlane
+    flagPlane = bytearray(self.size) if flagPlane is None else flagPlane
+    if any(len(plane) != self.size for plane in (minePlane, visiblePlane, flagPlane)):
+      raise ValueError(f"Cell planes must have {self.size} entries")
+    self.minePlane = minePlane
+    self.visiblePlane = visiblePlane
+    self.flagPlane = flagPlane
+    self.mineCounts = self.countNeighbors(minePlane)
+    self.flagCounts = self.countNeighbors(flagPlane)
+    self.mines = self.getMineCount()
+
+  def toLanes(self, plane: bytearray) -> int:
+    """
+    Load a plane into an int with one byte lane per cell, for whole-board arithmetic.
+
+    Args:
+      plane (bytearray): The plane to load.
+
+    Returns:
+      int: The lane-packed plane.
+    """
+    return int.from_bytes(plane, 'little')
+
+  def fromLanes(self, lanes: int) -> bytearray:
+    """
+    Unpack a lane-packed int back into a plane.
+
+    Args:
+      lanes (int): The lane-packed plane.
+
+    Returns:
+      bytearray: The plane.
+    """
+    return bytearray(lanes.to_bytes(self.size, 'little'))
+
+  def sumNeighborLanes(self, lanes: int) -> int:
+    """
+    Sum the lanes of the eight neighbors of every cell, using padded shifts instead of a per-cell loop.
+    Lanes must hold values of at most 28 so that no sum overflows into the next lane.
+
+    Args:
+      lanes (int): The lane-packed plane to sum.
+
+    Returns:
+      int: The lane-packed neighbor sums.
+    """
+    masks = self.laneMasks
+    rowShift = 8 * self.width
+    rowSums = lanes + ((lanes >> 8) & masks["notLastColumn"]) + ((lanes << 8) & masks["notFirstColumn"])
+    return rowSums + (rowSums >> rowShift) + ((rowSums << rowShift) & masks["full"]) - lanes
+
+  def sumOrthogonalLanes(self, lanes: int) -> int:
+    """
+    Sum the lanes of the four orthogonal neighbors of every cell.
+
+    Args:
+      lanes (int): The lane-packed plane to sum.
+
+    Returns:
+      int: The lane-packed neighbor sums.
+    """
+    masks = self.laneMasks
+    rowShift = 8 * self.width
+    return ((lanes >> 8) & masks["notLastColumn"]) + ((lanes << 8) & masks["notFirstColumn"]) + (lanes >> rowShift) + ((lanes << rowShift) & masks["full"])
+
+  def nonZeroLanes(self, lanes: int) -> int:
+    """
+    Turn lanes holding values below 16 into 0x01 where they are non-zero and 0x00 elsewhere.
+
+    Args:
+      lanes (int): The lane-packed values.
+
+    Returns:
+      int: The lane-packed mask.
+    """
+    return (lanes | (lanes >> 1) | (lanes >> 2) | (lanes >> 3)) & self.laneMasks["ones"]
+
+  def countNeighbors(self, plane: bytearray) -> bytearray:
+    """
+    Count, for every cell, how many of its neighbors are set in a plane.
+
+    Args:
+      plane (bytearray): The plane to count.
+
+    Returns:
+      bytearray: The neighbor count of every cell.
+    """
+    return self.fromLanes(self.sumNeighborLanes(self.toLanes(plane)))
+
+  def neighborCodes(self, plane: bytearray) -> bytearray:
+    """
+    Encode, for every cell, which of its neighbors are set in a plane as one byte.
+    Bit k of a code is set when the neighbor at NEIGHBOR_OFFSETS[k] is set. Neighbors off the board count as unset.
+
+    Args:
+      plane (bytearray): The plane to encode.
+
+    Returns:
+      bytearray: The neighbor code of every cell.
+    """
+    masks = self.laneMasks
+    rowShift = 8 * self.width
+    lanes = self.toLanes(plane)
+    left = (lanes << 8) & masks["notFirstColumn"]
+    right = (lanes >> 8) & masks["notLastColumn"]
+    rowCodes = left | (lanes << 1) | (right << 2) # bits 0-2: the cell to the left, the cell itself, the cell to the right
+    codes = ((rowCodes << rowShift) & masks["full"]) | ((left | (right << 1)) << 3) | ((rowCodes >> rowShift) << 5)
+    return self.fromLanes(codes)
+
+  def neighborCode(self, plane: bytearray, index: int) -> int:
+    """
+    Encode which neighbors of one cell are set in a plane, like neighborCodes does for every cell.
+
+    Args:
+      plane (bytearray): The plane to encode.
+      index (int): The flat index of the cell.
+
+    Returns:
+      int: The neighbor code of the cell.
+    """
+    if self.neighborBitTable is None:
+      self.neighborBitTable = getNeighborBitTable(self.width, self.height)
+    return sum(bit for neighbor, bit in self.neighborBitTable[index] if plane[neighbor])
+
+  def planeIndexes(self, plane: bytearray) -> list[int]:
+    """
+    Get the flat indexes that are set in a plane.
+
+    Args:
+      plane (bytearray): The plane to scan.
+
+    Returns:
+      list[int]: The set indexes, in ascending order.
+    """
+    indexes = []
+    index = plane.find(1)
+    while index != -1:
+      indexes.append(index)
+      index = plane.find(1, index + 1)
+    return indexes
+
+  def frontierPlane(self) -> bytearray:
+    """
+    Get the frontier: hidden, unflagged cells that touch at least one visible cell.
+
+    Returns:
+      bytearray: 1 where a cell is on the frontier, 0 otherwise.
+    """
+    visible = self.toLanes(self.visiblePlane)
+    hidden = self.laneMasks["ones"] ^ (visible | self.toLanes(self.flagPlane))
+    return self.fromLanes(hidden & self.nonZeroLanes(self.sumNeighborLanes(visible)))
+
+  def hiddenPlane(self) -> bytearray:
+    """
+    Get the cells that are neither visible nor flagged.
+
+    Returns:
+      bytearray: 1 where a cell is hidden and unflagged, 0 otherwise.
+    """
+    return self.fromLanes(self.laneMasks["ones"] ^ (self.toLanes(self.visiblePlane) | self.toLanes(self.flagPlane)))
+
+  def planeMask(self, plane: bytearray) -> int:
+    """
+    Load a plane into a bitmask with one bit per cell: bit i is set when plane[i] is 1.
+    Set operations on cells then become &, | and ^ on ints, and counting them becomes int.bit_count.
+
+    Args:
+      plane (bytearray): The plane to load.
+
+    Returns:
+      int: The bitmask.
+    """
+    return int(plane.translate(BIT_DIGITS)[::-1], 2) if self.size > 0 else 0
+
+  def neighborMask(self, index: int) -> int:
+    """
+    Get the neighborhood of a cell as a bitmask.
+
+    Args:
+      index (int): The flat index of the cell.
+
+    Returns:
+      int: A bitmask with the bit of every neighbor set. Bits past the last cell may be set and should be masked off.
+    """
+    x = index % self.width
+    pattern = self.neighborPatterns[(x > 0, x < self.width - 1)]
+    shift = index - self.width - 1
+    return pattern << shift if shift >= 0 else pattern >> -shift
+
+  def maskIndexes(self, mask: int) -> list[int]:
+    """
+    Get the flat indexes of the cells set in a bitmask.
+
+    Args:
+      mask (int): The bitmask.
+
+    Returns:
+      list[int]: The set indexes, in ascending order.
+    """
+    indexes = []
+    while mask:
+      lowest = mask & -mask
+      indexes.append(lowest.bit_length() - 1)
+      mask ^= lowest
+    return indexes
+
+  def maskLocations(self, mask: int) -> set[tuple[int, int]]:
+    """
+    Get the (x, y) locations of the cells set in a bitmask.
+
+    Args:
+      mask (int): The bitmask.
+
+    Returns:
+      set[tuple[int, int]]: The locations.
+    """
+    width = self.width
+    return {(index % width, index // width) for index in self.maskIndexes(mask)}
+
+  def setMine(self, index: int, isMine: bool):
+    """
+    Place or remove a mine, updating the mine counts of its neighbors.
+
+    Args:
+      index (int): The flat index of the cell.
+      isMine (bool): Whether the cell should hold a mine.
+    """
+    value = 1 if isMine else 0
+    if self.minePlane[index] == value:
+      return
+    self.minePlane[index] = value
+    mineCounts = self.mineCounts
+    if value:
+      for neighbor in self.neighborTable[index]:
+        mineCounts[neighbor] += 1
+    else:
+      for neighbor in self.neighborTable[index]:
+        mineCounts[neighbor] -= 1
+
+  def setFlag(self, index: int, isFlagged: bool):
+    """
+    Place or remove a flag, updating the flag counts of its neighbors.
+
+    Args:
+      index (int): The flat index of the cell.
+      isFlagged (bool): Whether the cell should be flagged.
+    """
+    value = 1 if isFlagged else 0
+    if self.flagPlane[index] == value:
+      return
+    self.flagPlane[index] = value
+    flagCounts = self.flagCounts
+    if value:
+      for neighbor in self.neighborTable[index]:
+        flagCounts[neighbor] += 1
+    else:
+      for neighbor in self.neighborTable[index]:
+        flagCounts[neighbor] -= 1
+
+  def resetVisibility(self):
+    """
+    Hide every cell and remove every flag, keeping the mine layout.
+    """
+    self.visiblePlane = bytearray(self.size)
+    self.flagPlane = bytearray(self.size)
+    self.flagCounts = bytearray(self.size)
+
+  @property
+  def cells(self) -> list[Cell]:
+    """
+    list[Cell]: A Cell view for every flat index. Views are created on first use and reused afterwards.
+    """
+    cells = self.__dict__.get('_cells')
+    if cells is None:
+      cells = [Cell(self, index) for index in range(self.size)]
+      self._cells = cells
+    return cells
+
+  @property
+  def grid(self) -> list[list[Cell]]:
+    """
+    list[list[Cell]]: The cell views arranged in rows, so that grid[y][x] is the cell at (x, y).
+    """
+    rows = self.__dict__.get('_rows')
+    if rows is None:
+      cells = self.cells
+      rows = [cells[y * self.width:(y + 1) * self.width] for y in range(self.height)]
+      self._rows = rows
+    return rows
+
   def copy(self) -> 'Board':
     """
     Create a deep copy of the board.
@@ -35,8 +550,7 @@ class Board:
     Returns:
       Board: The copied Board object.
     """
-    gridCopy = [[Cell(cell.isMine, cell.isVisible, cell.isFlagged, cell.location) for cell in row] for row in self.grid]
-    return Board(width=self.width, height=self.height, mines=self.mines, startLocation=self.startLocation, grid=gridCopy)
+    return Board(width=self.width, height=self.height, mines=self.mines, startLocation=self.startLocation, minePlane=self.minePlane.copy(), visiblePlane=self.visiblePlane.copy(), flagPlane=self.flagPlane.copy(), mineCounts=self.mineCounts.copy(), flagCounts=self.flagCounts.copy())
 
   def getMineCount(self) -> int:
     """
@@ -45,7 +559,7 @@ class Board:
     Returns:
       int: The number of mines.
     """
-    return sum(1 for row in self.grid for cell in row if cell.isMine)
+    return self.minePlane.count(1)
 
   def getRemainingMineCount(self) -> int:
     """
@@ -54,58 +568,71 @@ class Board:
     Returns:
       int: The number of remaining mines.
     """
-    return self.mines - sum(1 for row in self.grid for cell in row if cell.isFlagged)
+    return self.mines - self.flagPlane.count(1)
 	
-  def shuffleRemainingMines(self, returnAll: bool = False) -> list[list[Cell]]:
+  def iterateRemainingMineLayouts(self, rng: random.Random = None, attempts: int = SHUFFLE_ATTEMPTS) -> Iterator[bytearray]:
+    """
+    Yield distinct new layouts of the remaining mines over the hidden, unflagged cells, one at a time.
+    When there are at most MAX_ENUMERATED_LAYOUTS layouts, every one of them except the current layout is yielded in
+    random order. Otherwise `attempts` layouts are drawn with random.sample over the cell indexes, and repeats are
+    skipped by keeping the bitmask of every layout seen in a set.
+
+    Args:
+      rng (random.Random): The random generator to draw from. Defaults to the global random state.
+      attempts (int): The number of layouts to draw when there are too many to list.
+
+    Yields:
+      bytearray: A new mine plane. Visible and flagged cells keep their current mines.
+    """
+    rng = rng or random
+    hiddenPlane = self.hiddenPlane()
+    remainingSquares = self.planeIndexes(hiddenPlane)
+    numRemainingMines = min(self.getRemainingMineCount(), len(remainingSquares))
+    if numRemainingMines < 0:
+      return
+    basePlane = self.fromLanes(self.toLanes(self.minePlane) & (self.laneMasks["ones"] ^ self.toLanes(hiddenPlane))) # mines outside the remaining squares
+    def toPlane(layout) -> bytearray:
+      plane = basePlane.copy()
+      for index in layout:
+        plane[index] = 1
+      return plane
+    if math.comb(len(remainingSquares), numRemainingMines) <= MAX_ENUMERATED_LAYOUTS:
+      layouts = list(itertools.combinations(remainingSquares, numRemainingMines))
+      rng.shuffle(layouts)
+      for layout in layouts:
+        plane = toPlane(layout)
+        if plane != self.minePlane:
+          yield plane
+      return
+    seenLayouts = {self.planeMask(self.minePlane)}
+    for _ in range(attempts):
+      plane = toPlane(rng.sample(remainingSquares, numRemainingMines))
+      mask = self.planeMask(plane)
+      if mask not in seenLayouts:
+        seenLayouts.add(mask)
+        yield plane
+
+  def shuffleRemainingMines(self, returnAll: bool = False, rng: random.Random = None) -> bytearray | list[bytearray]:
     """
     Shuffle the remaining mines on the board.
+
+    Args:
+      returnAll (bool): Return every candidate mine plane instead of applying one.
+      rng (random.Random): The random generator to draw from. Defaults to the global random state.
+
+    Returns:
+      bytearray | list[bytearray]: The new mine plane, every candidate mine plane if returnAll is set, or None if no other layout was found.
     """
-    remainingSquares = [(x, y) for y in range(self.height) for x in range(self.width) if not self.grid[y][x].isVisible and not self.grid[y][x].isFlagged]
-    currentMineLayout = set([(x, y) for y in range(self.height) for x in range(self.width) if self.grid[y][x].isMine and not self.grid[y][x].isFlagged])
-    numRemainingMines = self.getRemainingMineCount()
-    combinations = []
-    if len(remainingSquares) < 8:
-      combinations = list([set(combination) for combination in itertools.combinations(remainingSquares, numRemainingMines)])
-      random.shuffle(combinations)
-    else:
-       # implement our own random distribution
-       for _ in range(10):
-        remainingMines = numRemainingMines
-        cellsToPlaceMines = remainingSquares.copy()
-        newMineLayout = set()
-        while remainingMines > 0:
-            newCell = cellsToPlaceMines.pop(0)
-            if random.random() < remainingMines / (len(cellsToPlaceMines) + 1):
-              newMineLayout.add(newCell)
-              remainingMines -= 1
-        if newMineLayout not in combinations:
-          combinations.append(newMineLayout)
-    if currentMineLayout in combinations:
-      try:
-        combinations.remove(currentMineLayout)
-      except:
-        print("Current mine layout not in combinations")
+    layouts = self.iterateRemainingMineLayouts(rng)
     if returnAll:
-      newGrids = []
-      for combination in combinations:
-        gridCopy = [[Cell(cell.isMine, cell.isVisible, cell.isFlagged, cell.location) for cell in row] for row in self.grid]
-        for x, y in remainingSquares:
-          if (x, y) in combination:
-            gridCopy[y][x].isMine = True
-          else:
-            gridCopy[y][x].isMine = False
-        newGrids.append(gridCopy)
-      return newGrids
-    if len(combinations) == 0:
+      return list(layouts)
+    plane = next(layouts, None)
+    if plane is None:
       return None
-    combination = random.choice(combinations)
-    for x, y in remainingSquares:
-      if (x, y) in combination:
-        self.grid[y][x].isMine = True
-      else:
-        self.grid[y][x].isMine = False
-    return self.grid
-
+    for index in self.planeIndexes(self.hiddenPlane()):
+      if plane[index] != self.minePlane[index]:
+        self.setMine(index, plane[index] == 1)
+    return self.minePlane
 
   def neighbors(self, cell: Cell) -> list[Cell]:
     """
@@ -117,17 +644,8 @@ class Board:
     Returns:
         list[Cell]: A list of neighboring cells.
     """
-    x, y = cell.location
-    neighborLocations = [
-      (-1, -1), (0, -1), (1, -1),
-      (-1, 0), (1, 0),
-      (-1, 1), (0, 1), (1, 1)
-    ]
-    neighbors = []
-    for dx, dy in neighborLocations:
-      if 0 <= x + dx < self.width and 0 <= y + dy < self.height:
-        neighbors.append(self.grid[y + dy][x + dx])
-    return neighbors
+    cells = self.cells
+    return [cells[index] for index in self.neighborTable[cell.index]]
 
   def cellMinesNum(self, cell: Cell) -> int:
     """
@@ -139,8 +657,7 @@ class Board:
     Returns:
       int: The number of neighboring mines.
     """
-    neighbors = self.neighbors(cell)
-    return sum(1 for neighbor in neighbors if neighbor.isMine)
+    return self.mineCounts[cell.index]
 
   def cellFlagsNum(self, cell: Cell) -> int:
     """
@@ -152,28 +669,40 @@ class Board:
     Returns:
       int: The number of neighboring flags.
     """
-    neighbors = self.neighbors(cell)
-    return sum(1 for neighbor in neighbors if neighbor.isFlagged)
+    return self.flagCounts[cell.index]
+
+  def symbolPlane(self, revealed: bool = False) -> bytes:
+    """
+    Get the board as one display symbol per cell: the number of a visible cell, '!' for a visible mine, 'F' for a flag
+    and '?' for any other hidden cell.
+    Without revealed, this is exactly what the player can see: the hidden mine layout plays no part in it.
+
+    Args:
+      revealed (bool): Show every cell as if it were visible.
+
+    Returns:
+      bytes: The symbols, indexed by y * width + x.
+    """
+    masks = self.laneMasks
+    # visible cells get their number, or 16 + their number for a mine; hidden cells get 32, or 33 when flagged
+    visibleCodes = self.toLanes(self.mineCounts) | (self.toLanes(self.minePlane) << 4)
+    if revealed:
+      codes = visibleCodes
+    else:
+      visibleMask = self.toLanes(self.visiblePlane) * 0xFF
+      hiddenCodes = (masks["ones"] << 5) | self.toLanes(self.flagPlane)
+      codes = (visibleCodes & visibleMask) | (hiddenCodes & (masks["full"] ^ visibleMask))
+    return bytes(self.fromLanes(codes).translate(DISPLAY_SYMBOLS))
 
   def display(self, revealed: bool = False):
     """
     Display the board in the console.
     """
+    symbols = self.symbolPlane(revealed).decode()
     displayString = ""
     displayString += "+" + "-" * self.width * 2 + "+\n"
-    for row in self.grid:
-      displayString += "|"
-      for cell in row:
-        if cell.isVisible or revealed:
-          if cell.isMine:
-            displayString += "! "
-          else:
-            displayString += str(self.cellMinesNum(cell)) + " "
-        elif cell.isFlagged:
-          displayString += "F " # ⚑
-        else:
-          displayString += "? "
-      displayString += "|\n"
+    for y in range(self.height):
+      displayString += "|" + " ".join(symbols[y * self.width:(y + 1) * self.width]) + " |\n"
     displayString += "+" + "-" * self.width * 2 + "+"
     print(displayString)
 
@@ -185,24 +714,46 @@ class Board:
       cell (Cell): The cell to reveal.
 
     Returns:
-      bool: True if the cell is not a mine, False otherwise.
-    """
-    if cell.isVisible:  # reveal neighbors if all mines are flagged
-      neighbors = self.neighbors(cell)
-      numberOfMines = self.cellMinesNum(cell)
-      numberOfFlags = self.cellFlagsNum(cell)
-      neighborsSafe = True
-      if numberOfMines == numberOfFlags:
-        for neighbor in neighbors:
-          if not neighbor.isVisible and not neighbor.isFlagged:
-            neighborsSafe = self.revealCell(neighbor) and neighborsSafe
-      return neighborsSafe
-    else:  # reveal cells recursively
-      cell.isVisible = True
-      if self.cellMinesNum(cell) == 0:
-        for neighbor in self.neighbors(cell):
-          self.revealCell(neighbor)
-      return not cell.isMine
+      bool: True if no mine was revealed, False otherwise.
+    """
+    minePlane = self.minePlane
+    return not any(minePlane[index] for index in self.reveal(cell.index))
+
+  def reveal(self, index: int) -> set[int]:
+    """
+    Reveal a cell, flooding outwards from cells with no neighboring mines.
+    If the cell is already visible and its neighboring flags match its number, its hidden neighbors are revealed instead.
+    The flood is iterative and uses the visibility plane as its visited bitmap, so each cell is handled at most once.
+
+    Args:
+      index (int): The flat index of the cell to reveal.
+
+    Returns:
+      set[int]: The flat indexes of every cell that was newly revealed.
+    """
+    minePlane = self.minePlane
+    visiblePlane = self.visiblePlane
+    flagPlane = self.flagPlane
+    mineCounts = self.mineCounts
+    neighborTable = self.neighborTable
+    if visiblePlane[index]:  # reveal neighbors if all mines are flagged
+      if mineCounts[index] != self.flagCounts[index]:
+        return set()
+      frontier = deque(neighbor for neighbor in neighborTable[index] if not visiblePlane[neighbor] and not flagPlane[neighbor])
+    else:
+      frontier = deque([index])
+    revealed = set(frontier)
+    for queued in frontier:
+      visiblePlane[queued] = 1
+    while frontier:
+      current = frontier.popleft()
+      if mineCounts[current] == 0 and not minePlane[current]:
+        for neighbor in neighborTable[current]:
+          if not visiblePlane[neighbor] and not flagPlane[neighbor]:
+            visiblePlane[neighbor] = 1
+            revealed.add(neighbor)
+            frontier.append(neighbor)
+    return revealed
 
   def flagCell(self, cell: Cell):
     """
@@ -211,7 +762,7 @@ class Board:
     Args:
       cell (Cell): The cell to flag or unflag.
     """
-    cell.isFlagged = not cell.isFlagged
+    self.setFlag(cell.index, not self.flagPlane[cell.index])
 
   def toJSON(self):
     """
@@ -228,6 +779,38 @@ class Board:
       "startX": self.startLocation[0],
       "startY": self.startLocation[1]
     }
+
+  def toCompactJSON(self):
+    """
+    Convert the board to the compact wire format: the board size, mine count and start location, and the mine, visible
+    and flag planes bit-packed with packPlane. An expert board takes under 400 bytes instead of about 40 KB.
+
+    Returns:
+      dict: The JSON-serializable compact representation of the board.
+    """
+    return {
+      "width": self.width,
+      "height": self.height,
+      "mines": self.mines,
+      "startX": self.startLocation[0],
+      "startY": self.startLocation[1],
+      "minePlane": packPlane(self.minePlane),
+      "visiblePlane": packPlane(self.visiblePlane),
+      "flagPlane": packPlane(self.flagPlane)
+    }
+
+  def toBinary(self) -> bytes:
+    """
+    Convert the board to the binary wire format read by parseBinaryBoard: a BINARY_HEADER with the board size, mine
+    count and start location, followed by the raw bit-packed mine, visible and flag planes.
+
+    Returns:
+      bytes: The encoded board.
+    """
+    planeBytes = (self.size + 7) // 8
+    planes = [self.planeMask(plane).to_bytes(planeBytes, 'little') for plane in (self.minePlane, self.visiblePlane, self.flagPlane)]
+    return BINARY_HEADER.pack(self.width, self.height, self.mines, self.startLocation[0], self.startLocation[1]) + b''.join(planes)
+
   def isSolved(self):
     """
     Check if the board is solved.
@@ -235,13 +818,7 @@ class Board:
     Returns:
       bool: True if the board is solved, False otherwise.
     """
-    for row in self.grid:
-      for cell in row:
-        if cell.isVisible and cell.isMine:
-          return False
-        if not cell.isVisible and not cell.isMine:
-          return False
-    return True
+    return self.visiblePlane.translate(FLIPPED) == self.minePlane
 
 def parseBoard(boardJson: json) -> Board:
 	"""
@@ -251,7 +828,8 @@ def parseBoard(boardJson: json) -> Board:
 		boardJson (json): The JSON representation of the board.
 
 	Returns:
-		Board: The parsed Board object, or None if parsing fails.
+		Board: The parsed Board object, or None if parsing fails, including when the grid does not have height rows of
+		width cells or a cell's location is outside the board or repeated.
 	"""
 	try:
 		grid = boardJson['grid']
@@ -260,50 +838,123 @@ def parseBoard(boardJson: json) -> Board:
 		mines = boardJson['mines']
 		startX = boardJson['startX']
 		startY = boardJson['startY']
-		grid = [[Cell(cell['isMine'], cell['isVisible'], cell['isFlagged'], (cell['location'][0], cell['location'][1])) for cell in row] for row in grid]
-		return Board(width=width, height=height, mines=mines, grid=grid, startLocation=(startX, startY))
+		if not all(isinstance(value, int) and value >= 0 for value in (width, height, mines, startX, startY)):
+			raise ValueError("Board dimensions, mine count and start location must be non-negative integers")
+		if len(grid) != height or any(len(row) != width for row in grid):
+			raise ValueError(f"Grid does not have {height} rows of {width} cells")
+		minePlane = bytearray(width * height)
+		visiblePlane = bytearray(width * height)
+		flagPlane = bytearray(width * height)
+		seenPlane = bytearray(width * height)
+		for row in grid:
+			for cell in row:
+				x, y = cell['location']
+				if not (isinstance(x, int) and isinstance(y, int) and 0 <= x < width and 0 <= y < height):
+					raise ValueError(f"Cell location {cell['location']} is out of bounds")
+				index = y * width + x
+				if seenPlane[index]:
+					raise ValueError(f"Cell location {cell['location']} appears more than once")
+				seenPlane[index] = 1
+				minePlane[index] = 1 if cell['isMine'] else 0
+				visiblePlane[index] = 1 if cell['isVisible'] else 0
+				flagPlane[index] = 1 if cell['isFlagged'] else 0
+		return Board(width=width, height=height, mines=mines, minePlane=minePlane, visiblePlane=visiblePlane, flagPlane=flagPlane, startLocation=(startX, startY))
 	except Exception as e:
 		print("Could not parse board JSON" + str(e))
 		return None
 	
-def boardFromString(boardString: str) -> Board:
-	"""
-	Generate a Board object from a string.
-
-	Args:
-		boardString (str): The string representation of the board.
+def parseCompactBoard(boardJson: json) -> Board:
+  """
+  Parse a board in the compact wire format written by Board.toCompactJSON.
+
+  Args:
+    boardJson (json): The compact representation of the board.
+
+  Returns:
+    Board: The parsed Board object, or None if parsing fails.
+  """
+  try:
+    width = boardJson['width']
+    height = boardJson['height']
+    mines = boardJson['mines']
+    startX = boardJson['startX']
+    startY = boardJson['startY']
+    if not all(isinstance(value, int) and value >= 0 for value in (width, height, mines, startX, startY)):
+      raise ValueError("Board dimensions, mine count and start location must be non-negative integers")
+    size = width * height
+    minePlane = unpackPlane(boardJson['minePlane'], size)
+    visiblePlane = unpackPlane(boardJson['visiblePlane'], size)
+    flagPlane = unpackPlane(boardJson['flagPlane'], size)
+    return Board(width=width, height=height, mines=mines, minePlane=minePlane, visiblePlane=visiblePlane, flagPlane=flagPlane, startLocation=(startX, startY))
+  except Exception as e:
+    print("Could not parse compact board " + str(e))
+    return None
+
+def parseBinaryBoard(data: bytes | memoryview) -> Board:
+  """
+  Parse a board in the binary wire format written by Board.toBinary.
+  The planes are read through memoryview slices of the input, so nothing is copied before decoding.
+
+  Args:
+    data (bytes | memoryview): The encoded board.
+
+  Returns:
+    Board: The parsed Board object, or None if parsing fails.
+  """
+  try:
+    view = memoryview(data)
+    width, height, mines, startX, startY = BINARY_HEADER.unpack_from(view)
+    size = width * height
+    planeBytes = (size + 7) // 8
+    offset = BINARY_HEADER.size
+    if len(view) != offset + 3 * planeBytes:
+      raise ValueError(f"Binary board has {len(view)} bytes, expected {offset + 3 * planeBytes}")
+    minePlane, visiblePlane, flagPlane = (planeFromBits(view[offset + plane * planeBytes:offset + (plane + 1) * planeBytes], size) for plane in range(3))
+    return Board(width=width, height=height, mines=mines, minePlane=minePlane, visiblePlane=visiblePlane, flagPlane=flagPlane, startLocation=(startX, startY))
+  except Exception as e:
+    print(f"Could not parse binary board: {e}")
+    return None
+
+def boardFromBytes(boardText: bytes | memoryview) -> Board:
+  """
+  Generate a Board object from the M/F/?/. text format, given as bytes.
+  Each plane is decoded from the joined rows with a single bytes.translate instead of a loop over the characters.
+
+  Args:
+    boardText (bytes | memoryview): The board text, one row per line. Blank lines and surrounding whitespace are ignored.
+
+  Returns:
+    Board: The Board object, or None if parsing fails.
+  """
+  try:
+    rows = [row.strip() for row in bytes(boardText).split(b'\n')]
+    rows = [row for row in rows if row]
+    width = len(rows[0])
+    height = len(rows)
+    if any(len(row) != width for row in rows):
+      raise ValueError("Rows have different lengths")
+    cells = b''.join(rows)
+    invalid = cells.translate(None, TEXT_SYMBOLS)
+    if invalid:
+      raise ValueError(f"Invalid character: {chr(invalid[0])}")
+    minePlane = bytearray(cells.translate(TEXT_MINES))
+    return Board(width=width, height=height, mines=minePlane.count(1), minePlane=minePlane, visiblePlane=bytearray(cells.translate(TEXT_VISIBLE)), flagPlane=bytearray(cells.translate(TEXT_FLAGS)), startLocation=(0, 0))
+  except Exception as e:
+    print(f"Could not parse board text: {e}")
+    return None
 
-	Returns:
-		Board: The Board object, or None if parsing fails.
-	"""
-	try:
-		lines = [line.strip() for line in boardString.split("\n") if line.strip() != '' and line.strip() != '\n']
-		width = len(lines[0])
-		height = len(lines)
-		numMines = boardString.count('M') + boardString.count('F')
-		grid = [[Cell(False, True, False, (x, y)) for x in range(width)] for y in range(height)]
-		for y, line in enumerate(lines):
-			for x, char in enumerate(line):
-				if char == 'M':
-					grid[y][x].isMine = True
-					grid[y][x].isFlagged = False
-					grid[y][x].isVisible = False
-				elif char == 'F':
-					grid[y][x].isFlagged = True
-					grid[y][x].isMine = True
-					grid[y][x].isVisible = False
-				elif char == '?':
-					grid[y][x].isVisible = False
-					grid[y][x].isMine = False
-					grid[y][x].isFlagged = False
-				elif char == '.':
-					grid[y][x].isVisible = True
-					grid[y][x].isMine = False
-					grid[y][x].isFlagged = False
-				else:
-					raise ValueError(f"Invalid character: {char}")
-		boardInst = Board(width=width,height=height,mines=numMines, grid=grid, startLocation=(0, 0))
-		return boardInst
-	except Exception as e:
-		print(f"Could not parse board string: {e}")
-		return None
\ No newline at end of file
+def boardFromString(boardString: str) -> Board:
+  """
+  Generate a Board object from a string.
+
+  Args:
+    boardString (str): The string representation of the board.
+
+  Returns:
+    Board: The Board object, or None if parsing fails.
+  """
+  try:
+    return boardFromBytes(boardString.encode('ascii'))
+  except UnicodeEncodeError as e:
+    print(f"Could not parse board string: {e}")
+    return None
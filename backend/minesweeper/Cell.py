@@ -1,17 +1,50 @@
 class Cell:
-  def __init__(self, isMine: bool, isVisible: bool, isFlagged: bool, location: tuple[int, int]):
+  __slots__ = ('board', 'index', 'location')
+
+  def __init__(self, board: 'Board', index: int):
     """
-    Initializes a Cell object.
+    Initializes a Cell view.
+    A Cell holds no state of its own: it reads and writes the packed cell planes of its board.
     Args:
-      isMine (bool): Indicates if the cell contains a mine.
-      isVisible (bool): Indicates if the cell is visible to the player.
-      isFlagged (bool): Indicates if the cell is flagged by the player.
-      location (tuple[int, int]): The (x, y) location of the cell on the board.
-    """
-    self.isMine = isMine
-    self.isVisible = isVisible
-    self.isFlagged = isFlagged
-    self.location = location
+      board (Board): The board the cell belongs to.
+      index (int): The flat index of the cell on the board (y * width + x).
+    """
+    self.board = board
+    self.index = index
+    self.location = (index % board.width, index // board.width)
+
+  @property
+  def isMine(self) -> bool:
+    """
+    bool: Indicates if the cell contains a mine.
+    """
+    return self.board.minePlane[self.index] == 1
+
+  @isMine.setter
+  def isMine(self, value: bool):
+    self.board.setMine(self.index, value)
+
+  @property
+  def isVisible(self) -> bool:
+    """
+    bool: Indicates if the cell is visible to the player.
+    """
+    return self.board.visiblePlane[self.index] == 1
+
+  @isVisible.setter
+  def isVisible(self, value: bool):
+    self.board.visiblePlane[self.index] = 1 if value else 0
+
+  @property
+  def isFlagged(self) -> bool:
+    """
+    bool: Indicates if the cell is flagged by the player.
+    """
+    return self.board.flagPlane[self.index] == 1
+
+  @isFlagged.setter
+  def isFlagged(self, value: bool):
+    self.board.setFlag(self.index, value)
 
   def toJSON(self):
     """
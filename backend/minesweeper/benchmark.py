@@ -0,0 +1,560 @@
+import itertools
+import random
+import sys
+import time
+import tracemalloc
+import json
+from Board import Board, parseBoard, parseCompactBoard, parseBinaryBoard, boardFromBytes
+from generate import basicGrid
+from solver import getNextMove, getFlagRemainingNeighbors, getExpandCell, getIntersectCells, SolverSession, PAIR_OFFSETS
+from patterns import NO_MOVE, singleTemplate, pairTemplate
+from constraints import getFrontierConstraints, splitComponents, resultCache
+from probability import getMineProbabilities, componentCache
+from hintcache import getCachedHint, hintCache
+
+# Board sizes used throughout the benchmarks: expert, and two large custom boards.
+BOARD_SIZES = [(30, 16, 99), (100, 100, 2000), (200, 200, 8000)]
+
+def timeCall(function, repeats: int) -> float:
+  """
+  Time a function call.
+  Args:
+    function (callable): The function to call.
+    repeats (int): The number of times to call it.
+  Returns:
+    float: The average time per call in microseconds.
+  """
+  start = time.perf_counter()
+  for _ in range(repeats):
+    function()
+  return (time.perf_counter() - start) / repeats * 1_000_000
+
+def measureMemory(function) -> int:
+  """
+  Measure the memory allocated by a function and still held by its result.
+  Args:
+    function (callable): The function to call.
+  Returns:
+    int: The number of bytes held by the result.
+  """
+  tracemalloc.start()
+  result = function()
+  size, _ = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  del result
+  return size
+
+def randomMinePlane(width: int, height: int, mines: int) -> bytearray:
+  minePlane = bytearray(width * height)
+  for index in random.sample(range(width * height), mines):
+    minePlane[index] = 1
+  return minePlane
+
+class LegacyCell:
+  """
+  The per-cell object layout the board used before cell state moved into packed planes.
+  """
+  def __init__(self, isMine: bool, isVisible: bool, isFlagged: bool, location: tuple[int, int]):
+    self.isMine = isMine
+    self.isVisible = isVisible
+    self.isFlagged = isFlagged
+    self.location = location
+
+def legacyGrid(width: int, height: int, minePlane: bytearray) -> list[list[LegacyCell]]:
+  return [[LegacyCell(minePlane[y * width + x] == 1, False, False, (x, y)) for x in range(width)] for y in range(height)]
+
+def legacyCopy(grid: list[list[LegacyCell]]) -> list[list[LegacyCell]]:
+  return [[LegacyCell(cell.isMine, cell.isVisible, cell.isFlagged, cell.location) for cell in row] for row in grid]
+
+def benchmarkLayout():
+  """
+  Compare the memory and copy speed of the packed board layout against the legacy per-cell object layout.
+  """
+  print("Board layout: memory and copy speed")
+  print(f"{'size':>12} {'legacy mem':>12} {'packed mem':>12} {'legacy copy':>14} {'packed copy':>14}")
+  for width, height, mines in BOARD_SIZES:
+    minePlane = randomMinePlane(width, height, mines)
+    grid = legacyGrid(width, height, minePlane)
+    board = Board(width=width, height=height, mines=mines, startLocation=(0, 0), minePlane=minePlane)
+    legacyMemory = measureMemory(lambda: legacyGrid(width, height, minePlane))
+    packedMemory = measureMemory(lambda: Board(width=width, height=height, mines=mines, startLocation=(0, 0), minePlane=minePlane.copy()))
+    legacyTime = timeCall(lambda: legacyCopy(grid), 20)
+    packedTime = timeCall(board.copy, 20)
+    print(f"{f'{width}x{height}':>12} {legacyMemory:>11}B {packedMemory:>11}B {legacyTime:>12.1f}us {packedTime:>12.1f}us")
+
+def legacyBasicGrid(width: int, height: int, mines: int, startLocation: tuple[int, int]) -> bytearray:
+  minePlane = bytearray(width * height)
+  startingSquareLocations = []
+  remainingSquareLocations = []
+  for y in range(height):
+    for x in range(width):
+      if abs(x - startLocation[0]) <= 1 and abs(y - startLocation[1]) <= 1:
+        startingSquareLocations.append((x, y))
+      else:
+        remainingSquareLocations.append((x, y))
+  remainingMines = mines
+  for y in range(height):
+    for x in range(width):
+      if (x, y) not in startingSquareLocations:
+        if random.random() < remainingMines / len(remainingSquareLocations):
+          minePlane[y * width + x] = 1
+          remainingMines -= 1
+        remainingSquareLocations.remove((x, y))
+  return minePlane
+
+def benchmarkPlacement():
+  """
+  Compare the legacy per-cell mine placement, which removes every cell from a list, against sampling flat indexes.
+  """
+  print("Mine placement: per-cell list removal vs index sampling")
+  print(f"{'size':>12} {'legacy':>14} {'sampled':>14} {'speedup':>8}")
+  for width, height, mines in BOARD_SIZES:
+    startLocation = (width // 2, height // 2)
+    legacyTime = timeCall(lambda: legacyBasicGrid(width, height, mines, startLocation), 1)
+    sampledTime = timeCall(lambda: basicGrid(width, height, mines, startLocation), 20)
+    print(f"{f'{width}x{height}':>12} {legacyTime:>12.1f}us {sampledTime:>12.1f}us {legacyTime / sampledTime:>7.1f}x")
+
+def legacyShuffleLayouts(board: Board) -> list[bytearray]:
+  remainingSquares = [index for index in range(board.size) if not board.visiblePlane[index] and not board.flagPlane[index]]
+  currentMineLayout = set([index for index in range(board.size) if board.minePlane[index] and not board.flagPlane[index]])
+  numRemainingMines = board.getRemainingMineCount()
+  combinations = []
+  for _ in range(10):
+    remainingMines = numRemainingMines
+    cellsToPlaceMines = remainingSquares.copy()
+    newMineLayout = set()
+    while remainingMines > 0:
+      newCell = cellsToPlaceMines.pop(0)
+      if random.random() < remainingMines / (len(cellsToPlaceMines) + 1):
+        newMineLayout.add(newCell)
+        remainingMines -= 1
+    if newMineLayout not in combinations:
+      combinations.append(newMineLayout)
+  if currentMineLayout in combinations:
+    combinations.remove(currentMineLayout)
+  newPlanes = []
+  for combination in combinations:
+    planeCopy = board.minePlane.copy()
+    for index in remainingSquares:
+      planeCopy[index] = 1 if index in combination else 0
+    newPlanes.append(planeCopy)
+  return newPlanes
+
+def benchmarkShuffle():
+  """
+  Compare the legacy remaining-mine shuffle (sequential pops and a list of sets) against sampling with bitmask dedupe.
+  """
+  print("Remaining-mine shuffle: 10 layouts, sequential pops vs index sampling")
+  print(f"{'size':>12} {'legacy':>14} {'sampled':>14} {'speedup':>8}")
+  for width, height, mines in BOARD_SIZES:
+    board = lateGameBoard(width, height, mines)
+    legacyTime = timeCall(lambda: legacyShuffleLayouts(board), 1)
+    sampledTime = timeCall(lambda: board.shuffleRemainingMines(returnAll=True), 5)
+    print(f"{f'{width}x{height}':>12} {legacyTime:>12.1f}us {sampledTime:>12.1f}us {legacyTime / sampledTime:>7.1f}x")
+
+def benchmarkWire():
+  """
+  Compare the per-cell JSON board format against the compact bit-packed format: payload size, and time to serialize and
+  to parse a board sent as a request body.
+  """
+  print("Board wire format: per-cell JSON vs bit-packed planes")
+  print(f"{'size':>12} {'json size':>11} {'compact size':>13} {'json parse':>14} {'compact parse':>14} {'json dump':>14} {'compact dump':>14}")
+  for width, height, mines in BOARD_SIZES:
+    board = lateGameBoard(width, height, mines)
+    jsonBody = json.dumps(board.toJSON())
+    compactBody = json.dumps(board.toCompactJSON())
+    jsonParse = timeCall(lambda: parseBoard(json.loads(jsonBody)), 3)
+    compactParse = timeCall(lambda: parseCompactBoard(json.loads(compactBody)), 20)
+    jsonDump = timeCall(lambda: json.dumps(board.toJSON()), 3)
+    compactDump = timeCall(lambda: json.dumps(board.toCompactJSON()), 20)
+    print(f"{f'{width}x{height}':>12} {len(jsonBody):>10}B {len(compactBody):>12}B {jsonParse:>12.1f}us {compactParse:>12.1f}us {jsonDump:>12.1f}us {compactDump:>12.1f}us")
+
+def legacyBoardFromString(boardString: str) -> Board:
+  lines = [line.strip() for line in boardString.split("\n") if line.strip() != '']
+  width = len(lines[0])
+  height = len(lines)
+  minePlane = bytearray(width * height)
+  visiblePlane = bytearray(b'\x01' * (width * height))
+  flagPlane = bytearray(width * height)
+  for y, line in enumerate(lines):
+    for x, char in enumerate(line):
+      index = y * width + x
+      if char == 'M':
+        minePlane[index] = 1
+        visiblePlane[index] = 0
+      elif char == 'F':
+        minePlane[index] = 1
+        visiblePlane[index] = 0
+        flagPlane[index] = 1
+      elif char == '?':
+        visiblePlane[index] = 0
+  return Board(width=width, height=height, mines=minePlane.count(1), minePlane=minePlane, visiblePlane=visiblePlane, flagPlane=flagPlane, startLocation=(0, 0))
+
+def boardText(board: Board) -> bytes:
+  symbols = {(0, 0, 0): '?', (0, 1, 0): '.', (1, 0, 0): 'M', (1, 0, 1): 'F'}
+  return "\n".join("".join(symbols[(board.minePlane[index], board.visiblePlane[index], board.flagPlane[index])] for index in range(y * board.width, (y + 1) * board.width)) for y in range(board.height)).encode()
+
+def benchmarkParse():
+  """
+  Compare the per-character text parser against bytes.translate decoding, and against the binary format read from a
+  memoryview.
+  """
+  print("Board parsing: per-character loop vs translate vs binary planes")
+  print(f"{'size':>12} {'text loop':>14} {'text translate':>15} {'binary':>14}")
+  for width, height, mines in BOARD_SIZES:
+    board = lateGameBoard(width, height, mines)
+    board.loadPlanes(board.minePlane, board.visiblePlane, bytearray(board.minePlane[index] & (not board.visiblePlane[index]) & (index % 7 == 0) for index in range(board.size)))
+    text = boardText(board)
+    binary = memoryview(board.toBinary())
+    loopTime = timeCall(lambda: legacyBoardFromString(text.decode()), 3)
+    translateTime = timeCall(lambda: boardFromBytes(text), 20)
+    binaryTime = timeCall(lambda: parseBinaryBoard(binary), 20)
+    print(f"{f'{width}x{height}':>12} {loopTime:>12.1f}us {translateTime:>13.1f}us {binaryTime:>12.1f}us")
+
+def benchmarkHintCache():
+  """
+  Compare finding a hint from scratch against a hint cache hit for the same position.
+  """
+  print("Hint cache: solve vs canonical-key lookup")
+  print(f"{'size':>12} {'solve':>14} {'cached':>14} {'speedup':>8}")
+  for width, height, mines in BOARD_SIZES:
+    board = lateGameBoard(width, height, mines)
+    def solve():
+      move = getNextMove(board)
+      return {"hint": [] if move is None else [hintStep.toJSON() for hintStep in move.hintSteps]}
+    def uncachedSolve():
+      resultCache.clear()
+      componentCache.clear()
+      return solve()
+    solveTime = timeCall(uncachedSolve, 3)
+    hintCache.hints.clear()
+    getCachedHint(board, solve)
+    cachedTime = timeCall(lambda: getCachedHint(board, solve), 20)
+    print(f"{f'{width}x{height}':>12} {solveTime:>12.1f}us {cachedTime:>12.1f}us {solveTime / cachedTime:>7.1f}x")
+
+def loopNeighborCounts(board: Board, plane: bytearray) -> bytearray:
+  return bytearray(sum(plane[neighbor] for neighbor in neighbors) for neighbors in board.neighborTable)
+
+def loopIsSolved(board: Board) -> bool:
+  for index in range(board.size):
+    if board.visiblePlane[index] == board.minePlane[index]:
+      return False
+  return True
+
+def loopFrontier(board: Board) -> bytearray:
+  visiblePlane = board.visiblePlane
+  flagPlane = board.flagPlane
+  return bytearray(1 if not visiblePlane[index] and not flagPlane[index] and any(visiblePlane[neighbor] for neighbor in neighbors) else 0 for index, neighbors in enumerate(board.neighborTable))
+
+def benchmarkWholeBoard():
+  """
+  Compare per-cell loops against lane-packed whole-board arithmetic for counting, frontier and solved checks.
+  """
+  print("Whole-board operations: per-cell loop vs lane arithmetic")
+  print(f"{'size':>12} {'operation':>12} {'loop':>14} {'lanes':>14} {'speedup':>8}")
+  for width, height, mines in [(30, 16, 99), (100, 100, 2000), (500, 500, 50000)]:
+    minePlane = randomMinePlane(width, height, mines)
+    visiblePlane = bytearray(0 if minePlane[index] or random.random() < 0.3 else 1 for index in range(width * height))
+    board = Board(width=width, height=height, mines=mines, startLocation=(0, 0), minePlane=minePlane, visiblePlane=visiblePlane)
+    solvedBoard = Board(width=width, height=height, mines=mines, startLocation=(0, 0), minePlane=minePlane, visiblePlane=bytearray(1 - mine for mine in minePlane))
+    repeats = 3 if width * height > 100000 else 20
+    operations = [
+      ("counts", lambda: loopNeighborCounts(board, minePlane), lambda: board.countNeighbors(minePlane)),
+      ("frontier", lambda: loopFrontier(board), board.frontierPlane),
+      ("isSolved", lambda: loopIsSolved(solvedBoard), solvedBoard.isSolved)
+    ]
+    for name, loopFunction, laneFunction in operations:
+      assert loopFunction() == laneFunction()
+      loopTime = timeCall(loopFunction, repeats)
+      laneTime = timeCall(laneFunction, repeats)
+      print(f"{f'{width}x{height}':>12} {name:>12} {loopTime:>12.1f}us {laneTime:>12.1f}us {loopTime / laneTime:>7.1f}x")
+
+def solvableBoard(width: int, height: int, mines: int) -> Board:
+  """
+  Generate a board the solver can finish from its start cell without guessing.
+  """
+  startLocation = (width // 2, height // 2)
+  while True:
+    board = Board(width=width, height=height, mines=mines, startLocation=startLocation, minePlane=basicGrid(width, height, mines, startLocation))
+    board.reveal(startLocation[1] * width + startLocation[0])
+    session = SolverSession(board.copy())
+    move = session.getNextMove()
+    while move is not None:
+      session.applyMove(move)
+      move = session.getNextMove()
+    if session.board.isSolved():
+      return board
+
+def solveStateless(board: Board) -> int:
+  moves = 0
+  move = getNextMove(board)
+  while move is not None:
+    for x, y in move.cellsToReveal:
+      board.revealCell(board.grid[y][x])
+    for x, y in move.cellsToFlag:
+      board.flagCell(board.grid[y][x])
+    moves += 1
+    move = getNextMove(board)
+  return moves
+
+def solveSession(board: Board) -> int:
+  moves = 0
+  session = SolverSession(board)
+  move = session.getNextMove()
+  while move is not None:
+    session.applyMove(move)
+    moves += 1
+    move = session.getNextMove()
+  return moves
+
+def benchmarkSolve():
+  """
+  Compare a full solve with a board scan per move against a SolverSession that only re-examines changed cells.
+  """
+  print("Full solve: stateless getNextMove vs SolverSession")
+  print(f"{'size':>12} {'moves':>6} {'stateless':>14} {'session':>14} {'speedup':>8}")
+  for width, height, mines in [(9, 9, 10), (16, 16, 40), (30, 16, 70)]:
+    board = solvableBoard(width, height, mines)
+    moves = solveSession(board.copy())
+    statelessTime = timeCall(lambda: solveStateless(board.copy()), 3)
+    sessionTime = timeCall(lambda: solveSession(board.copy()), 3)
+    print(f"{f'{width}x{height}':>12} {moves:>6} {statelessTime:>12.1f}us {sessionTime:>12.1f}us {statelessTime / sessionTime:>7.1f}x")
+
+def lateGameBoard(width: int, height: int, mines: int) -> Board:
+  """
+  Play a random board with the solver until it gets stuck, leaving a large revealed area and a long frontier.
+  """
+  startLocation = (width // 2, height // 2)
+  board = Board(width=width, height=height, mines=mines, startLocation=startLocation, minePlane=basicGrid(width, height, mines, startLocation))
+  board.reveal(startLocation[1] * width + startLocation[0])
+  solveSession(board)
+  return board
+
+def legacyIntersectCells(mineCount1: int, flagCount1: int, neighbors1: list, mineCount2: int, flagCount2: int, neighbors2: list) -> tuple[set, set]:
+  """
+  The pair rule as it was written before bitmasks: set math on sets of Cell objects. Returns (safe, mine) locations.
+  """
+  if mineCount1 == 0 or mineCount2 == 0 or mineCount1 == flagCount1 or mineCount2 == flagCount2:
+    return None
+  set1 = {neighbor for neighbor in neighbors1 if not neighbor.isFlagged and not neighbor.isVisible}
+  set2 = {neighbor for neighbor in neighbors2 if not neighbor.isFlagged and not neighbor.isVisible}
+  biggerSet, biggerSetMineCount = (set1, mineCount1 - flagCount1) if len(set1) > len(set2) else (set2, mineCount2 - flagCount2)
+  smallerSet, smallerSetMineCount = (set2, mineCount2 - flagCount2) if len(set1) > len(set2) else (set1, mineCount1 - flagCount1)
+  intersection = set1.intersection(set2)
+  mineDifference = biggerSetMineCount - smallerSetMineCount
+  setDifference = biggerSet - smallerSet
+  if mineDifference == len(setDifference) and len(setDifference) > 0:
+    return {cell.location for cell in smallerSet - biggerSet}, {cell.location for cell in setDifference}
+  elif mineDifference == 0 and len(setDifference) > 0 and intersection == smallerSet:
+    return {cell.location for cell in setDifference}, set()
+  return None
+
+def legacyPairScan(board: Board):
+  visibleCells = []
+  for cell in board.cells:
+    if cell.isVisible:
+      visibleCells.append((cell.location, (board.cellMinesNum(cell), board.cellFlagsNum(cell), board.neighbors(cell))))
+  for cell1Info, cell2Info in itertools.combinations(visibleCells, 2):
+    xDiff = cell1Info[0][0] - cell2Info[0][0]
+    yDiff = cell1Info[0][1] - cell2Info[0][1]
+    if xDiff < -2 or xDiff > 2 or yDiff < -2 or yDiff > 2:
+      continue
+    move = legacyIntersectCells(*cell1Info[1], *cell2Info[1])
+    if move:
+      return move
+  return None
+
+def benchmarkPairs():
+  """
+  Compare the all-pairs intersection scan against the frontier-only 5x5 window scan on late-game boards.
+  """
+  print("Intersection phase: all visible pairs vs frontier 5x5 window")
+  print(f"{'size':>12} {'visible':>8} {'all pairs':>14} {'window':>14} {'speedup':>8}")
+  for width, height, mines in [(30, 16, 70), (100, 100, 1500)]:
+    board = lateGameBoard(width, height, mines)
+    legacyMove = legacyPairScan(board)
+    move = getNextMove(board, type='getIntersectCells')
+    assert (legacyMove is None and move is None) or legacyMove == (move.cellsToReveal, move.cellsToFlag)
+    repeats = 1 if width * height > 1000 else 5
+    legacyTime = timeCall(lambda: legacyPairScan(board), repeats)
+    windowTime = timeCall(lambda: getNextMove(board, type='getIntersectCells'), repeats)
+    print(f"{f'{width}x{height}':>12} {board.visiblePlane.count(1):>8} {legacyTime:>12.1f}us {windowTime:>12.1f}us {legacyTime / windowTime:>7.1f}x")
+
+def windowPartners(board: Board, index: int, offsets: list[tuple[int, int]]) -> list[int]:
+  """
+  Get the cells at the given offsets from a cell that lie on the board.
+  Args:
+    board (Board): The Minesweeper board.
+    index (int): The flat index of the cell.
+    offsets (list[tuple[int, int]]): The (dx, dy) offsets to visit.
+  Returns:
+    list[int]: The flat indexes of the partner cells, in the order of the offsets.
+  """
+  width = board.width
+  height = board.height
+  x, y = index % width, index // width
+  return [index + dy * width + dx for dx, dy in offsets if 0 <= x + dx < width and 0 <= y + dy < height]
+
+def frontierPairs(board: Board) -> list[tuple[int, int]]:
+  frontier = [index for index in board.planeIndexes(board.visiblePlane) if board.mineCounts[index] != board.flagCounts[index]]
+  frontierSet = set(frontier)
+  return [(index, partner) for index in frontier for partner in windowPartners(board, index, PAIR_OFFSETS) if partner in frontierSet]
+
+def benchmarkBitmask():
+  """
+  Compare the cost of the pair rule on every frontier pair: sets of Cell objects against neighborhood bitmasks.
+  """
+  print("Pair rule per pair: Cell sets vs bitmasks")
+  print(f"{'size':>12} {'pairs':>7} {'sets':>14} {'bitmasks':>14} {'speedup':>8}")
+  for width, height, mines in [(30, 16, 99), (100, 100, 2000)]:
+    board = lateGameBoard(width, height, mines)
+    pairs = frontierPairs(board)
+    cells = board.cells
+    mineCounts = board.mineCounts
+    flagCounts = board.flagCounts
+    def setPairs():
+      for index, partner in pairs:
+        legacyIntersectCells(mineCounts[index], flagCounts[index], board.neighbors(cells[index]), mineCounts[partner], flagCounts[partner], board.neighbors(cells[partner]))
+    def maskPairs():
+      hiddenMask = board.planeMask(board.hiddenPlane())
+      for index, partner in pairs:
+        getIntersectCells(board, index, hiddenMask & board.neighborMask(index), partner, hiddenMask & board.neighborMask(partner))
+    setTime = timeCall(setPairs, 5)
+    maskTime = timeCall(maskPairs, 5)
+    print(f"{f'{width}x{height}':>12} {len(pairs):>7} {setTime / max(len(pairs), 1):>12.2f}us {maskTime / max(len(pairs), 1):>12.2f}us {setTime / maskTime:>7.1f}x")
+
+def midGameBoard(width: int, height: int, mines: int) -> Board:
+  """
+  Play a random board with the solver until about half of its safe cells are revealed, leaving a long open frontier.
+  """
+  startLocation = (width // 2, height // 2)
+  board = Board(width=width, height=height, mines=mines, startLocation=startLocation, minePlane=basicGrid(width, height, mines, startLocation))
+  board.reveal(startLocation[1] * width + startLocation[0])
+  session = SolverSession(board)
+  move = session.getNextMove()
+  while move is not None and board.visiblePlane.count(1) < (board.size - mines) // 2:
+    session.applyMove(move)
+    move = session.getNextMove()
+  return board
+
+def benchmarkPatterns():
+  """
+  Compare scanning the frontier with the single-cell and pair rules against looking its numbers up in the pattern tables.
+  """
+  print("Frontier scan: bitmask rules vs pattern tables")
+  print(f"{'size':>12} {'pairs':>7} {'rules':>14} {'tables':>14} {'speedup':>8}")
+  for width, height, mines in [(30, 16, 70), (100, 100, 1500), (200, 200, 6000)]:
+    board = midGameBoard(width, height, mines)
+    pairs = frontierPairs(board)
+    numbers = sorted({index for pair in pairs for index in pair})
+    offsets = {(dx, dy): offset for offset, (dx, dy) in enumerate(PAIR_OFFSETS)}
+    pairOffsets = [(index, partner, offsets[(partner % width - index % width, partner // width - index // width)]) for index, partner in pairs]
+    mineCounts = board.mineCounts
+    flagCounts = board.flagCounts
+    def ruleScan():
+      hiddenMask = board.planeMask(board.hiddenPlane())
+      for index in numbers:
+        hiddenNeighbors = hiddenMask & board.neighborMask(index)
+        getFlagRemainingNeighbors(board, index, hiddenNeighbors)
+        getExpandCell(board, index, hiddenNeighbors)
+      for index, partner, _ in pairOffsets:
+        getIntersectCells(board, index, hiddenMask & board.neighborMask(index), partner, hiddenMask & board.neighborMask(partner))
+    def tableScan():
+      hiddenPlane = board.hiddenPlane()
+      hiddenMask = board.planeMask(hiddenPlane)
+      hiddenCodes = board.neighborCodes(hiddenPlane)
+      for index in numbers:
+        if singleTemplate(mineCounts[index] - flagCounts[index], hiddenCodes[index]) != NO_MOVE:
+          hiddenNeighbors = hiddenMask & board.neighborMask(index)
+          getFlagRemainingNeighbors(board, index, hiddenNeighbors)
+          getExpandCell(board, index, hiddenNeighbors)
+      for index, partner, offset in pairOffsets:
+        if pairTemplate(offset, mineCounts[index] - flagCounts[index], hiddenCodes[index], mineCounts[partner] - flagCounts[partner], hiddenCodes[partner]) != NO_MOVE:
+          getIntersectCells(board, index, hiddenMask & board.neighborMask(index), partner, hiddenMask & board.neighborMask(partner))
+    ruleTime = timeCall(ruleScan, 5)
+    tableTime = timeCall(tableScan, 5)
+    print(f"{f'{width}x{height}':>12} {len(pairs):>7} {ruleTime:>12.1f}us {tableTime:>12.1f}us {ruleTime / tableTime:>7.1f}x")
+
+def stripeBoard(width: int, height: int) -> Board:
+  """
+  Build a board whose top three rows are partly revealed, giving one long frontier of loosely constrained cells.
+  """
+  minePlane = bytearray(1 if random.random() < 0.3 else 0 for _ in range(width * height))
+  visiblePlane = bytearray(1 if index < 3 * width and not minePlane[index] and random.random() < 0.6 else 0 for index in range(width * height))
+  return Board(width=width, height=height, mines=minePlane.count(1), startLocation=(0, 0), minePlane=minePlane, visiblePlane=visiblePlane)
+
+def findAllForcedCells(board: Board) -> int:
+  resultCache.clear()
+  forcedCells = 0
+  for component in splitComponents(getFrontierConstraints(board)):
+    safeCells, mineCells = component.getForcedCells()
+    forcedCells += len(safeCells) + len(mineCells)
+  return forcedCells
+
+def findReducedCells(board: Board) -> int:
+  resultCache.clear()
+  reducedCells = 0
+  for component in splitComponents(getFrontierConstraints(board)):
+    safeCells, mineCells, _ = component.reduceForcedCells()
+    reducedCells += len(safeCells) + len(mineCells)
+  return reducedCells
+
+def benchmarkFrontier():
+  """
+  Time the constraint solver on long frontiers that the old 15-cell grouping gave up on, next to the row reduction pass.
+  """
+  print("Constraint solver: forced cells on long frontiers (search vs row reduction)")
+  print(f"{'size':>12} {'frontier':>9} {'largest':>8} {'forced':>7} {'search':>14} {'reduced':>8} {'reduction':>14}")
+  for width in [100, 300, 600]:
+    board = stripeBoard(width, 8)
+    components = splitComponents(getFrontierConstraints(board))
+    frontier = sum(len(component.cells) for component in components)
+    largest = max(len(component.cells) for component in components)
+    forcedCells = findAllForcedCells(board)
+    solveTime = timeCall(lambda: findAllForcedCells(board), 3)
+    reducedCells = findReducedCells(board)
+    reduceTime = timeCall(lambda: findReducedCells(board), 3)
+    print(f"{f'{width}x8':>12} {frontier:>9} {largest:>8} {forcedCells:>7} {solveTime:>12.1f}us {reducedCells:>8} {reduceTime:>12.1f}us")
+
+def uncachedProbabilities(board: Board) -> list[list[float]]:
+  componentCache.clear()
+  return getMineProbabilities(board)
+
+def benchmarkProbability():
+  """
+  Time the exact mine probability engine on expert boards where the solver has run out of certain moves.
+  """
+  print("Mine probabilities: expert boards stuck on a guess")
+  print(f"{'board':>6} {'hidden':>7} {'frontier':>9} {'uncached':>14} {'cached':>14}")
+  for boardNumber in range(5):
+    board = lateGameBoard(30, 16, 99)
+    if board.isSolved():
+      continue
+    frontier = sum(len(component.cells) for component in splitComponents(getFrontierConstraints(board)))
+    hidden = board.size - board.visiblePlane.count(1) - board.flagPlane.count(1)
+    uncachedTime = timeCall(lambda: uncachedProbabilities(board), 5)
+    cachedTime = timeCall(lambda: getMineProbabilities(board), 5)
+    print(f"{boardNumber:>6} {hidden:>7} {frontier:>9} {uncachedTime:>12.1f}us {cachedTime:>12.1f}us")
+
+benchmarks = {
+  "layout": benchmarkLayout,
+  "placement": benchmarkPlacement,
+  "shuffle": benchmarkShuffle,
+  "wholeboard": benchmarkWholeBoard,
+  "solve": benchmarkSolve,
+  "pairs": benchmarkPairs,
+  "bitmask": benchmarkBitmask,
+  "frontier": benchmarkFrontier,
+  "probability": benchmarkProbability,
+  "wire": benchmarkWire,
+  "parse": benchmarkParse,
+  "hintcache": benchmarkHintCache,
+  "patterns": benchmarkPatterns,
+}
+
+if __name__ == "__main__":
+  random.seed(0)
+  selected = sys.argv[1:] or list(benchmarks.keys())
+  for name in selected:
+    benchmarks[name]()
+    print()
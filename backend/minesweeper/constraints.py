@@ -0,0 +1,423 @@
+import time
+import threading
+from collections import OrderedDict
+from math import gcd
+from Board import Board
+
+UNKNOWN = -1
+SAFE = 0
+MINE = 1
+# Number of search decisions between two checks of the deadline
+DEADLINE_CHECK_INTERVAL = 256
+# Number of component results kept. Most of the frontier is unchanged between two searches of the same game.
+CACHE_SIZE = 1024
+
+resultCache: OrderedDict[tuple, tuple] = OrderedDict()
+# pool refills run the solver on a background thread while requests are served
+resultCacheLock = threading.Lock()
+
+def getCachedResult(key: tuple) -> tuple:
+  """
+  Get a component result stored by storeResult, or None if it is not cached.
+  """
+  with resultCacheLock:
+    result = resultCache.get(key)
+    if result is not None:
+      resultCache.move_to_end(key)
+    return result
+
+def storeResult(key: tuple, result: tuple):
+  with resultCacheLock:
+    resultCache[key] = result
+    resultCache.move_to_end(key)
+    if len(resultCache) > CACHE_SIZE:
+      resultCache.popitem(last=False)
+
+class Constraint:
+  def __init__(self, source: int, cells: tuple[int, ...], mines: int):
+    """
+    Initialize a Constraint.
+    A constraint states that exactly `mines` of `cells` hold mines, as read from a revealed number.
+    Args:
+      source (int): The flat index of the revealed number the constraint comes from.
+      cells (tuple[int, ...]): The flat indexes of the hidden, unflagged neighbors of the number.
+      mines (int): The number of mines still unaccounted for among those cells.
+    """
+    self.source = source
+    self.cells = cells
+    self.mines = mines
+
+class Component:
+  def __init__(self, cells: list[int], constraints: list[Constraint]):
+    """
+    Initialize a Component.
+    A component is a set of frontier cells whose constraints never touch cells outside of it, so it can be solved on its own.
+    Internally every cell is a variable numbered by its position in `cells`.
+    Args:
+      cells (list[int]): The flat indexes of the hidden cells in the component.
+      constraints (list[Constraint]): The constraints over those cells.
+    """
+    self.cells = cells
+    self.constraints = constraints
+    self.sources = [constraint.source for constraint in constraints]
+    variables = {cell: variable for variable, cell in enumerate(cells)}
+    self.constraintVariables = [tuple(variables[cell] for cell in constraint.cells) for constraint in constraints]
+    self.constraintMines = [constraint.mines for constraint in constraints]
+    self.variableConstraints: list[list[int]] = [[] for _ in cells]
+    for constraintIndex, constraintVariables in enumerate(self.constraintVariables):
+      for variable in constraintVariables:
+        self.variableConstraints[variable].append(constraintIndex)
+    self.key = tuple((constraint.source, constraint.cells, constraint.mines) for constraint in constraints)
+
+  def getSearchOrder(self, start: int) -> list[int]:
+    """
+    Order the variables breadth-first from a starting variable, following shared constraints.
+    Deciding variables in this order keeps each decision close to the ones before it, so conflicts are found (and
+    undone) near where they were caused instead of after decisions about unrelated parts of the frontier.
+    Args:
+      start (int): The variable to start from.
+    Returns:
+      list[int]: Every variable of the component, nearest to the start first.
+    """
+    order = [start]
+    seen = [False] * len(self.cells)
+    seen[start] = True
+    for variable in order:
+      for constraintIndex in self.variableConstraints[variable]:
+        for otherVariable in self.constraintVariables[constraintIndex]:
+          if not seen[otherVariable]:
+            seen[otherVariable] = True
+            order.append(otherVariable)
+    return order
+
+  def propagate(self, assignment: list[int], trail: list[int], queue: list[int]) -> bool:
+    """
+    Apply the constraints in the queue until nothing more can be deduced.
+    A constraint whose mines are all placed makes its other cells safe, and one that needs all of its unknown cells
+    makes them mines. Every assigned variable is pushed onto the trail so the search can undo it.
+    Args:
+      assignment (list[int]): The value of every variable: UNKNOWN, SAFE or MINE. Updated in place.
+      trail (list[int]): The variables assigned so far, in order. Updated in place.
+      queue (list[int]): The indexes of the constraints to check.
+    Returns:
+      bool: False if a constraint can no longer be satisfied, True otherwise.
+    """
+    constraintVariables = self.constraintVariables
+    constraintMines = self.constraintMines
+    variableConstraints = self.variableConstraints
+    while queue:
+      constraintIndex = queue.pop()
+      variables = constraintVariables[constraintIndex]
+      mines = 0
+      unknown = 0
+      for variable in variables:
+        value = assignment[variable]
+        if value == MINE:
+          mines += 1
+        elif value == UNKNOWN:
+          unknown += 1
+      target = constraintMines[constraintIndex]
+      if mines > target or mines + unknown < target:
+        return False
+      if unknown == 0:
+        continue
+      if mines == target:
+        forcedValue = SAFE
+      elif mines + unknown == target:
+        forcedValue = MINE
+      else:
+        continue
+      for variable in variables:
+        if assignment[variable] == UNKNOWN:
+          assignment[variable] = forcedValue
+          trail.append(variable)
+          queue.extend(variableConstraints[variable])
+    return True
+
+  def iterateSolutions(self, assumptions: dict[int, int] = {}, preferred: list[int] = None, deadline: float = None):
+    """
+    Iterate over the placements of mines that satisfy every constraint of the component.
+    The search is a depth-first backtracking search over the variables, with constraint propagation after every decision.
+    It keeps an explicit decision stack, so large components cannot hit the recursion limit.
+    Decisions start next to the first assumed variable (or the first variable) and spread out from there.
+    Args:
+      assumptions (dict[int, int]): Values (SAFE or MINE) that given variables must take.
+      preferred (list[int]): A value to try first for every variable, usually a previous solution. Defaults to SAFE.
+      deadline (float): A time.perf_counter() value after which the search gives up. Defaults to no limit.
+    Yields:
+      list[int]: The value of every variable. The list is reused for the next solution, so copy it to keep it.
+    Raises:
+      TimeoutError: If the deadline passes before the search is done.
+    """
+    numVariables = len(self.cells)
+    assignment = [UNKNOWN] * numVariables
+    trail: list[int] = []
+    queue = list(range(len(self.constraints)))
+    for variable, value in assumptions.items():
+      assignment[variable] = value
+      trail.append(variable)
+    if not self.propagate(assignment, trail, queue):
+      return
+    order = self.getSearchOrder(next(iter(assumptions), 0))
+    decisions: list[tuple[int, int, int, bool]] = [] # (position in order, trail length before the decision, variable, second value tried)
+    position = 0
+    steps = 0
+    while True:
+      steps += 1
+      if deadline is not None and steps % DEADLINE_CHECK_INTERVAL == 0 and time.perf_counter() > deadline:
+        raise TimeoutError("The constraint search ran past its deadline")
+      while position < numVariables and assignment[order[position]] != UNKNOWN:
+        position += 1
+      if position == numVariables:
+        yield assignment
+        consistent = False # backtrack to look for the next solution
+      else:
+        variable = order[position]
+        decisions.append((position, len(trail), variable, False))
+        assignment[variable] = SAFE if preferred is None else preferred[variable]
+        trail.append(variable)
+        consistent = self.propagate(assignment, trail, list(self.variableConstraints[variable]))
+      while not consistent:
+        if not decisions:
+          return
+        position, trailLength, variable, secondValueTried = decisions.pop()
+        while len(trail) > trailLength:
+          assignment[trail.pop()] = UNKNOWN
+        if secondValueTried:
+          continue
+        decisions.append((position, trailLength, variable, True))
+        assignment[variable] = MINE if preferred is None else 1 - preferred[variable]
+        trail.append(variable)
+        consistent = self.propagate(assignment, trail, list(self.variableConstraints[variable]))
+
+  def findSolution(self, assumptions: dict[int, int] = {}, preferred: list[int] = None, deadline: float = None) -> list[int]:
+    """
+    Find one placement of mines that satisfies every constraint of the component.
+    Args:
+      assumptions (dict[int, int]): Values (SAFE or MINE) that given variables must take.
+      preferred (list[int]): A value to try first for every variable, usually a previous solution. Defaults to SAFE.
+      deadline (float): A time.perf_counter() value after which the search gives up. Defaults to no limit.
+    Returns:
+      list[int]: The value of every variable, or None if no placement exists.
+    Raises:
+      TimeoutError: If the deadline passes before the search is done.
+    """
+    return next(self.iterateSolutions(assumptions, preferred, deadline), None)
+
+  def simplify(self) -> tuple[dict[int, int], list['Component']]:
+    """
+    Fix every cell that propagation alone can decide, and split the constraints left over into smaller independent components.
+    Returns:
+      tuple[dict[int, int], list[Component]]: The value (SAFE or MINE) of every fixed cell by flat index, and the
+        remaining components, or None if the component has no solution.
+    """
+    assignment = [UNKNOWN] * len(self.cells)
+    trail: list[int] = []
+    if not self.propagate(assignment, trail, list(range(len(self.constraints)))):
+      return None
+    fixedCells = {self.cells[variable]: assignment[variable] for variable in trail}
+    residualConstraints = []
+    for constraint, variables in zip(self.constraints, self.constraintVariables):
+      unknownCells = tuple(self.cells[variable] for variable in variables if assignment[variable] == UNKNOWN)
+      if len(unknownCells) > 0:
+        placedMines = sum(1 for variable in variables if assignment[variable] == MINE)
+        residualConstraints.append(Constraint(constraint.source, unknownCells, constraint.mines - placedMines))
+    return fixedCells, splitComponents(residualConstraints)
+
+  def getForcedCells(self, deadline: float = None) -> tuple[set[int], set[int]]:
+    """
+    Find the cells that take the same value in every solution of the component.
+    Propagation alone fixes the easy cells first. The constraints left over usually fall apart into several smaller
+    independent components, which are then searched one at a time. The result is cached, so an unchanged component is
+    not searched again the next time the solver gets stuck.
+    Args:
+      deadline (float): A time.perf_counter() value after which the search gives up. Defaults to no limit.
+    Returns:
+      tuple[set[int], set[int]]: The flat indexes of the forced safe cells and of the forced mines.
+        Both are empty if the component has no solution.
+    Raises:
+      TimeoutError: If the deadline passes before the search is done.
+    """
+    cached = getCachedResult(("forced", self.key))
+    if cached is not None:
+      return cached
+    simplified = self.simplify()
+    if simplified is None:
+      return set(), set()
+    fixedCells, components = simplified
+    safeCells = {cell for cell, value in fixedCells.items() if value == SAFE}
+    mineCells = {cell for cell, value in fixedCells.items() if value == MINE}
+    for component in components:
+      forcedCells = component.searchForcedCells(deadline)
+      if forcedCells is None:
+        return set(), set()
+      safeCells.update(forcedCells[0])
+      mineCells.update(forcedCells[1])
+    storeResult(("forced", self.key), (safeCells, mineCells))
+    return safeCells, mineCells
+
+  def searchForcedCells(self, deadline: float = None) -> tuple[set[int], set[int]]:
+    """
+    Find the cells that take the same value in every solution of the component by searching.
+    Each solution found is kept as a witness: a cell seen both safe and mined in witnesses cannot be forced, so only the
+    remaining cells need a search with the opposite value assumed. Those searches try the first solution's values
+    first, so they only have to rework the area around the assumed cell.
+    Args:
+      deadline (float): A time.perf_counter() value after which the search gives up. Defaults to no limit.
+    Returns:
+      tuple[set[int], set[int]]: The flat indexes of the forced safe cells and of the forced mines,
+        or None if the component has no solution.
+    Raises:
+      TimeoutError: If the deadline passes before the search is done.
+    """
+    solution = self.findSolution(deadline=deadline)
+    if solution is None:
+      return None
+    seenSafe = [value == SAFE for value in solution]
+    seenMine = [value == MINE for value in solution]
+    for variable in range(len(self.cells)):
+      if seenSafe[variable] and seenMine[variable]:
+        continue
+      witness = self.findSolution({variable: MINE if seenSafe[variable] else SAFE}, solution, deadline)
+      if witness is None:
+        continue
+      for otherVariable, value in enumerate(witness):
+        if value == SAFE:
+          seenSafe[otherVariable] = True
+        else:
+          seenMine[otherVariable] = True
+    safeCells = {self.cells[variable] for variable in range(len(self.cells)) if not seenMine[variable]}
+    mineCells = {self.cells[variable] for variable in range(len(self.cells)) if not seenSafe[variable]}
+    return safeCells, mineCells
+
+  def reduceForcedCells(self) -> tuple[set[int], set[int], set[int]]:
+    """
+    Find forced cells by row-reducing the constraints as a system of linear equations.
+    Every constraint is a row `sum of cells = mines` over 0/1 cells. Gauss-Jordan elimination with exact integer
+    arithmetic combines the rows, and each reduced row is then checked against its bounds: if a cell with a positive
+    coefficient would push the row past its right-hand side it must be safe, and so on. This finds many deductions that
+    need three or more numbers at once in polynomial time, without searching. The result is cached like getForcedCells.
+    Returns:
+      tuple[set[int], set[int], set[int]]: The flat indexes of the forced safe cells, of the forced mines, and of the
+        numbers whose combined rows forced them.
+    """
+    cached = getCachedResult(("reduced", self.key))
+    if cached is not None:
+      return cached
+    columns = {cell: column for column, cell in enumerate(sorted(self.cells))} # sorted cells keep the matrix banded
+    rows: list[tuple[dict[int, int], int, int]] = [] # (coefficients by column, right-hand side, bitmask of the constraints combined)
+    for constraintIndex, constraint in enumerate(self.constraints):
+      rows.append(({columns[cell]: 1 for cell in constraint.cells}, constraint.mines, 1 << constraintIndex))
+    rowsWithColumn: dict[int, set[int]] = {} # column -> indexes of the rows with a nonzero coefficient there
+    for rowIndex, (coefficients, _, _) in enumerate(rows):
+      for column in coefficients:
+        rowsWithColumn.setdefault(column, set()).add(rowIndex)
+    def combine(target: int, pivot: int, column: int):
+      targetCoefficients, targetValue, targetSources = rows[target]
+      pivotCoefficients, pivotValue, pivotSources = rows[pivot]
+      targetScale = pivotCoefficients[column]
+      pivotScale = targetCoefficients[column]
+      combined = {otherColumn: coefficient * targetScale for otherColumn, coefficient in targetCoefficients.items()}
+      for otherColumn, coefficient in pivotCoefficients.items():
+        value = combined.get(otherColumn, 0) - coefficient * pivotScale
+        if value == 0:
+          combined.pop(otherColumn, None)
+          rowsWithColumn[otherColumn].discard(target)
+        else:
+          combined[otherColumn] = value
+          rowsWithColumn[otherColumn].add(target)
+      value = targetValue * targetScale - pivotValue * pivotScale
+      divisor = gcd(value, *combined.values())
+      if divisor > 1:
+        combined = {otherColumn: coefficient // divisor for otherColumn, coefficient in combined.items()}
+        value //= divisor
+      rows[target] = (combined, value, targetSources | pivotSources)
+    usedRows: set[int] = set()
+    for column in range(len(columns)):
+      candidates = [rowIndex for rowIndex in rowsWithColumn.get(column, ()) if rowIndex not in usedRows]
+      if len(candidates) == 0:
+        continue
+      pivot = min(candidates, key=lambda rowIndex: len(rows[rowIndex][0]))
+      usedRows.add(pivot)
+      for rowIndex in list(rowsWithColumn[column]):
+        if rowIndex != pivot:
+          combine(rowIndex, pivot, column)
+    cells = sorted(self.cells)
+    safeCells: set[int] = set()
+    mineCells: set[int] = set()
+    sources: set[int] = set()
+    for coefficients, value, rowSources in rows:
+      if len(coefficients) == 0:
+        continue
+      lowest = sum(coefficient for coefficient in coefficients.values() if coefficient < 0)
+      highest = sum(coefficient for coefficient in coefficients.values() if coefficient > 0)
+      found = False
+      for column, coefficient in coefficients.items():
+        if coefficient > 0:
+          mustBeSafe = lowest + coefficient > value
+          mustBeMine = highest - coefficient < value
+        else:
+          mustBeSafe = highest + coefficient < value
+          mustBeMine = lowest - coefficient > value
+        if mustBeSafe:
+          safeCells.add(cells[column])
+          found = True
+        elif mustBeMine:
+          mineCells.add(cells[column])
+          found = True
+      if found:
+        sources.update(self.constraints[constraintIndex].source for constraintIndex in range(len(self.constraints)) if rowSources >> constraintIndex & 1)
+    storeResult(("reduced", self.key), (safeCells, mineCells, sources))
+    return safeCells, mineCells, sources
+
+def getFrontierConstraints(board: Board) -> list[Constraint]:
+  """
+  Build a constraint for every revealed number that still has hidden, unflagged neighbors.
+  Args:
+    board (Board): The Minesweeper board.
+  Returns:
+    list[Constraint]: The constraints, ordered by the flat index of their number.
+  """
+  visiblePlane = board.visiblePlane
+  flagPlane = board.flagPlane
+  mineCounts = board.mineCounts
+  flagCounts = board.flagCounts
+  neighborTable = board.neighborTable
+  constraints = []
+  for source in board.planeIndexes(visiblePlane):
+    cells = tuple(neighbor for neighbor in neighborTable[source] if not visiblePlane[neighbor] and not flagPlane[neighbor])
+    if len(cells) > 0:
+      constraints.append(Constraint(source, cells, mineCounts[source] - flagCounts[source]))
+  return constraints
+
+def splitComponents(constraints: list[Constraint]) -> list[Component]:
+  """
+  Split constraints into independent components with a union-find over the cells they share.
+  Args:
+    constraints (list[Constraint]): The frontier constraints.
+  Returns:
+    list[Component]: The components, ordered by their first number.
+  """
+  parents: dict[int, int] = {}
+  def find(cell: int) -> int:
+    root = cell
+    while parents[root] != root:
+      root = parents[root]
+    while parents[cell] != root: # path compression
+      parents[cell], cell = root, parents[cell]
+    return root
+  for constraint in constraints:
+    for cell in constraint.cells:
+      parents.setdefault(cell, cell)
+    root = find(constraint.cells[0])
+    for cell in constraint.cells[1:]:
+      otherRoot = find(cell)
+      if otherRoot != root:
+        parents[otherRoot] = root
+  componentCells: dict[int, dict[int, None]] = {} # insertion-ordered sets of cells
+  componentConstraints: dict[int, list[Constraint]] = {}
+  for constraint in constraints:
+    root = find(constraint.cells[0])
+    componentConstraints.setdefault(root, []).append(constraint)
+    componentCells.setdefault(root, {}).update(dict.fromkeys(constraint.cells))
+  return [Component(list(componentCells[root]), componentConstraints[root]) for root in componentConstraints]
@@ -1,49 +1,58 @@
-import math
+import os
 import random
-from solver import getNextMove
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from solver import getNextMove, SolverSession
+from moves import Move
 from Board import Board
-from Cell import Cell
+from probability import sampleConsistentLayout
+from profiling import recordEvent
 
-def basicGrid(width: int, height: int, mines: int, startLocation: tuple[int, int]) -> list[list[Cell]]:
+# Fewest moved mines a layout is allowed before it is reshuffled, for boards with very few mines
+MIN_REPAIRS = 20
+# Times a layout is rewound and resampled before it is reshuffled from scratch
+MAX_RESAMPLES = 3
+
+def basicGrid(width: int, height: int, mines: int, startLocation: tuple[int, int], seed: int = None, rng: random.Random = None) -> bytearray:
   """
   Generate a basic board with mines placed randomly.
+  Every layout that keeps the 3x3 area around the start location free of mines is equally likely. Mines are drawn with
+  random.sample over flat indexes, so placing them takes O(mines) time on top of allocating the plane.
 
   Args:
     startLocation (tuple[int, int]): The starting location on the board.
+    seed (int): Seed for the random placement, to reproduce a layout. Defaults to the global random state.
+    rng (random.Random): The random generator to draw from, e.g. one shared by a seeded generation. Overrides seed.
 
   Returns:
-    list[list[Cell]]: The generated board.
-  """
-  # print("Generating normal board...")
-  newBoard = [[Cell(False, False, False, (x, y)) for x in range(width)] for y in range(height)]
-  startingSquareLocations: tuple[int, int] = []
-  remainingSquareLocations: tuple[int, int] = []
-  for y in range(height):
-    for x in range(width):
-      if abs(x - startLocation[0]) <= 1 and abs(y - startLocation[1]) <= 1:
-        startingSquareLocations.append((x, y))
-      else:
-        remainingSquareLocations.append((x, y))
-  # print(f"Square locations: {len(remainingSquareLocations)}")
-  remainingMines = mines
-  for y in range(height):
-    for x in range(width):
-      if (x, y) in startingSquareLocations:
-        newBoard[y][x].isMine = False
-      else:
-        newBoard[y][x].isMine = random.random() < remainingMines / len(remainingSquareLocations)
-        if newBoard[y][x].isMine:
-          remainingMines -= 1
-          # print(f"Remaining mines: {remainingMines}")
-        remainingSquareLocations.remove((x, y))
-  return newBoard
+    bytearray: The generated mine plane, indexed by y * width + x.
+  """
+  rng = rng or (random if seed is None else random.Random(seed))
+  size = width * height
+  startX, startY = startLocation
+  startIndexes = {y * width + x for y in range(startY - 1, startY + 2) for x in range(startX - 1, startX + 2) if 0 <= x < width and 0 <= y < height}
+  minePlane = bytearray(size)
+  # A uniformly ordered sample stays uniform once the start cells are dropped from it, so drawing a few extra indexes
+  # and keeping the first `mines` others picks a uniform layout among the remaining cells.
+  placed = 0
+  for index in rng.sample(range(size), min(size, mines + len(startIndexes))):
+    if placed == mines:
+      break
+    if index not in startIndexes:
+      minePlane[index] = 1
+      placed += 1
+  return minePlane
 
-def generateBoard(width: int, height: int, mines: int, startLocation: tuple[int, int]) -> Board:
+def generateBoard(width: int, height: int, mines: int, startLocation: tuple[int, int], seed: int = None) -> Board:
   """
   Generate a board with mines placed randomly, ensuring the start location is safe.
 
   Args:
     startLocation (tuple[int, int]): The starting location on the board.
+    seed (int): Seed for every random choice, so the same seed always generates the same board. Defaults to the global random state.
 
   Raises:
     ValueError: If the start location is out of bounds.
@@ -51,8 +60,9 @@ def generateBoard(width: int, height: int, mines: int, startLocation: tuple[int,
   x, y = startLocation
   if (x < 0 or x >= width) or (y < 0 or y >= height):
     raise ValueError("Start location is out of bounds")
-  grid = basicGrid(width, height, mines, startLocation)
-  board = Board(width=width, height=height, mines=mines, startLocation=startLocation, grid=grid)
+  rng = random if seed is None else random.Random(seed)
+  minePlane = basicGrid(width, height, mines, startLocation, rng=rng)
+  board = Board(width=width, height=height, mines=mines, startLocation=startLocation, minePlane=minePlane)
   board.revealCell(board.grid[y][x])
   solved = False
   completeRestarts = 0
@@ -62,17 +72,18 @@ def generateBoard(width: int, height: int, mines: int, startLocation: tuple[int,
     if nextMove is None:
       concurrentShuffles = 0
       while concurrentShuffles < 10 and nextMove is None:
-        board.shuffleRemainingMines()
+        board.shuffleRemainingMines(rng=rng)
+        recordEvent("shuffles")
         concurrentShuffles += 1
         nextMove = getNextMove(board)
         if nextMove is not None:
           levels.append(board.copy())
       if concurrentShuffles >= 10:
         if len(levels) == 0:
-          newGrid = basicGrid(width, height, mines, startLocation)
-          board.grid = newGrid
+          board.loadPlanes(basicGrid(width, height, mines, startLocation, rng=rng))
           board.revealCell(board.grid[y][x])
           levels.append(board.copy())
+          recordEvent("restarts")
           completeRestarts += 1
         else:
           board = levels.pop()
@@ -85,150 +96,341 @@ def generateBoard(width: int, height: int, mines: int, startLocation: tuple[int,
         board.revealCell(board.grid[y2][x2])
     if board.isSolved():
       solved = True
-  if completeRestarts >= 10:
+  if not solved:
     raise ValueError("Could not generate a solvable board")
   # hide everything but the start location
-  for y2 in range(height):
-    for x2 in range(width):
-      board.grid[y2][x2].isVisible = False
-      board.grid[y2][x2].isFlagged = False
+  board.resetVisibility()
   board.revealCell(board.grid[y][x])
   return board
 
-def perturbBoard(board: Board):
+def perturbBoard(board: Board, rng: random.Random = None) -> tuple[int, int]:
   """
   Perturb the board by either moving a mine from the frontier to another unrevealed cell or into the revealed area.
+
+  Args:
+    rng (random.Random): The random generator to draw from. Defaults to the global random state.
+
+  Returns:
+    tuple[int, int]: The flat indexes of the cell the mine was moved from and the cell it was moved to.
   """
-  startingCell = board.grid[board.startLocation[1]][board.startLocation[0]]
-  startingCells = {startingCell.location}
-  startingNeighbors = board.neighbors(startingCell)
-  for neighbor in startingNeighbors:
-    startingCells.add(neighbor.location)
-  visibleCells = set()
-  unflaggedMinesInFrontier = set()
-  flaggedMinesInFrontier = set()
-  hiddenCellsNotInFrontier = set() # unrevealed cells not adjacent to revealed cells (not mines)
-  for y in range(board.height):
-    for x in range(board.width):
-      cell = board.grid[y][x]
-      if not cell.isVisible:
-        cellNeighbors = board.neighbors(cell)
-        hasVisibleNeighbor = any(neighbor.isVisible for neighbor in cellNeighbors)
-        if hasVisibleNeighbor:
-          numRevealedOrdinalNeighbors = len({neighbor for neighbor in cellNeighbors if sum(abs(neighbor.location[i] - cell.location[i]) for i in range(2)) == 1 and neighbor.isVisible})
-          if numRevealedOrdinalNeighbors < 3:
-            if cell.isMine:
-              if cell.isFlagged:
-                flaggedMinesInFrontier.add(cell)
-              else:
-                unflaggedMinesInFrontier.add(cell)
-          elif not cell.isMine:
-            hiddenCellsNotInFrontier.add(cell)
-        elif not cell.isMine:
-          hiddenCellsNotInFrontier.add(cell)
-      elif cell.location not in startingCells:
-        visibleCells.add(cell)
+  masks = board.laneMasks
+  startX, startY = board.startLocation
+  startingCells = 1 << (8 * (startY * board.width + startX))
+  startingCells = board.sumNeighborLanes(startingCells) | startingCells
+  visible = board.toLanes(board.visiblePlane)
+  hidden = masks["ones"] ^ visible
+  mine = board.toLanes(board.minePlane)
+  flag = board.toLanes(board.flagPlane)
+  # hidden cells next to a revealed cell, with fewer than 3 revealed orthogonal neighbors
+  orthogonalVisible = board.sumOrthogonalLanes(visible)
+  enclosed = (((orthogonalVisible >> 1) & orthogonalVisible) | (orthogonalVisible >> 2)) & masks["ones"]
+  frontier = hidden & board.nonZeroLanes(board.sumNeighborLanes(visible)) & (masks["ones"] ^ enclosed)
+  unflaggedMinesInFrontier = board.planeIndexes(board.fromLanes(frontier & mine & (masks["ones"] ^ flag)))
+  flaggedMinesInFrontier = board.planeIndexes(board.fromLanes(frontier & mine & flag))
+  hiddenCellsNotInFrontier = board.planeIndexes(board.fromLanes(hidden & (masks["ones"] ^ (mine | frontier)))) # unrevealed cells not adjacent to revealed cells (not mines)
+  visibleCells = board.planeIndexes(board.fromLanes(visible & (masks["ones"] ^ startingCells)))
+  rng = rng or random
   sourceCell = None
   targetCell = None
   if len(unflaggedMinesInFrontier) > 0: # move the mine to a random hidden cell
-    sourceCell = random.choice(list(unflaggedMinesInFrontier))
+    sourceCell = rng.choice(unflaggedMinesInFrontier)
   elif len(flaggedMinesInFrontier) > 0: # move the mine to a random hidden cell
-    sourceCell = random.choice(list(flaggedMinesInFrontier))
+    sourceCell = rng.choice(flaggedMinesInFrontier)
   else:
     raise ValueError("No mines in frontier")
   if len(hiddenCellsNotInFrontier) > 0:
-    targetCell = random.choice(list(hiddenCellsNotInFrontier))
+    targetCell = rng.choice(hiddenCellsNotInFrontier)
   elif len(visibleCells) > 0:
-    targetCell = random.choice(list(visibleCells))
+    targetCell = rng.choice(visibleCells)
   else:
     raise ValueError("No hidden cells or visible cells to move mine to")
-  # print(f"Moved mine from {sourceCell.location} to {targetCell.location}")
-  sourceCell.isMine = False
-  sourceCell.isFlagged = False
-  sourceCell.isVisible = False
-  targetCell.isMine = True
-  targetCell.isFlagged = False
-  targetCell.isVisible = False
+  # print(f"Moved mine from {sourceCell} to {targetCell}")
+  board.setMine(sourceCell, False)
+  board.setFlag(sourceCell, False)
+  board.visiblePlane[sourceCell] = 0
+  board.setMine(targetCell, True)
+  board.setFlag(targetCell, False)
+  board.visiblePlane[targetCell] = 0
+  return sourceCell, targetCell
 
-def generateBoard2(width: int, height: int, mines: int, startLocation: tuple[int, int]) -> Board:
+class GenerationResult:
+  def __init__(self, board: Board, noGuess: bool, perturbations: int, iterations: int, elapsedMillis: float):
+    """
+    Initialize a GenerationResult.
+    Args:
+      board (Board): The generated board, with only its start area revealed.
+      noGuess (bool): Whether the solver is known to finish the board from its start without guessing.
+      perturbations (int): The total number of mines moved while generating.
+      iterations (int): The number of times the board was replayed from its start or reshuffled.
+      elapsedMillis (float): How long generation took, in milliseconds.
+    """
+    self.board = board
+    self.noGuess = noGuess
+    self.perturbations = perturbations
+    self.iterations = iterations
+    self.elapsedMillis = elapsedMillis
+
+  def toJSON(self):
+    """
+    Convert the generation metadata to a JSON-serializable dictionary. The board itself is left out.
+    """
+    return {
+      "noGuess": self.noGuess,
+      "perturbations": self.perturbations,
+      "iterations": self.iterations,
+      "elapsedMillis": round(self.elapsedMillis, 1)
+    }
+
+def generateBoard2(width: int, height: int, mines: int, startLocation: tuple[int, int], stopEvent: multiprocessing.Event = None, seed: int = None) -> Board:
   """
   Generate a board with mines placed randomly, ensuring the start location is safe.
 
   Args:
     startLocation (tuple[int, int]): The starting location on the board.
+    stopEvent (multiprocessing.Event): When set, generation stops early and returns None. Used to cancel parallel attempts.
+    seed (int): Seed for every random choice, so the same seed always generates the same board. Defaults to the global random state.
+
+  Returns:
+    Board: The generated board, or None if generation was stopped.
+
+  Raises:
+    ValueError: If the start location is out of bounds.
+  """
+  result = generateBoundedBoard(width, height, mines, startLocation, stopEvent=stopEvent, seed=seed)
+  return result.board if result.noGuess else None
+
+def generateBoundedBoard(width: int, height: int, mines: int, startLocation: tuple[int, int], maxMillis: float = None, maxIterations: int = None, stopEvent: multiprocessing.Event = None, seed: int = None) -> GenerationResult:
+  """
+  Generate a board that can be solved without guessing, within an optional time and iteration budget.
+  The board is solved from the start, and every time the solver gets stuck a mine next to the revealed area is moved.
+  Moving a mine only changes the numbers around its old and new cells, so instead of replaying the whole solve, the
+  solver only undoes the moves whose deduction looked at those cells (and the moves that built on them) and resumes
+  from there. Every other move still holds on the new layout, so once the board is fully revealed it is known to be
+  solvable from the start without guessing. When a layout needs too many repairs, the solve is rewound halfway and the
+  hidden mines are redrawn among the layouts the revealed numbers still allow, so the moves that are kept stay valid.
+  After MAX_RESAMPLES of those the layout is reshuffled from scratch.
+  If the budget runs out first, the layout that the solver got furthest into is returned instead.
+
+  Args:
+    startLocation (tuple[int, int]): The starting location on the board.
+    maxMillis (float): Stop after this many milliseconds. Defaults to no limit.
+    maxIterations (int): Stop after this many resamples and reshuffles. Defaults to no limit.
+    stopEvent (multiprocessing.Event): Stop as soon as this event is set. Used to cancel parallel attempts.
+    seed (int): Seed for every random choice. Without a time budget, the same seed always generates the same board.
+      Defaults to the global random state.
+
+  Returns:
+    GenerationResult: The board and how it was generated. noGuess is False if the budget ran out or generation was stopped.
 
   Raises:
     ValueError: If the start location is out of bounds.
   """
+  startTime = time.perf_counter()
+  deadline = None if maxMillis is None else startTime + maxMillis / 1000
   x, y = startLocation
   if (x < 0 or x >= width) or (y < 0 or y >= height):
     raise ValueError("Start location is out of bounds")
-  grid = basicGrid(width, height, mines, startLocation)
-  board = Board(width=width, height=height, mines=mines, startLocation=startLocation, grid=grid)
+  rng = random if seed is None else random.Random(seed)
+  minePlane = basicGrid(width, height, mines, startLocation, rng=rng)
+  board = Board(width=width, height=height, mines=mines, startLocation=startLocation, minePlane=minePlane)
+  session = SolverSession(board)
+  startMove = Move(cellsToReveal={startLocation})
+  maxRepairs = max(mines, MIN_REPAIRS) # moved mines allowed per layout before it is reshuffled
   def reshuffleBoard():
-    newGrid = basicGrid(width, height, mines, startLocation)
-    board.grid = newGrid
-    board.revealCell(board.grid[y][x])
-  def resetBoard():
-    for row in board.grid:
-      for cell in row:
-        cell.isVisible = False
-        cell.isFlagged = False
-    board.revealCell(board.grid[y][x])
-  board.revealCell(board.grid[y][x])
+    board.loadPlanes(basicGrid(width, height, mines, startLocation, rng=rng))
+    session.reset()
+    session.applyMove(startMove)
+  def resampleBoard() -> bool:
+    session.restore(max(1, session.checkpoint() // 2)) # keep at least the start move
+    try:
+      minePlane = sampleConsistentLayout(board, rng, deadline)
+    except TimeoutError:
+      return False
+    if minePlane is None:
+      return False
+    changedCells = board.planeIndexes(board.fromLanes(board.toLanes(minePlane) ^ board.toLanes(board.minePlane)))
+    for index in changedCells:
+      board.setMine(index, minePlane[index] == 1)
+    session.markChanged(changedCells)
+    return True
+  def outOfBudget() -> bool:
+    return (stopEvent is not None and stopEvent.is_set()) or (deadline is not None and time.perf_counter() > deadline) or (maxIterations is not None and iterations >= maxIterations)
+  session.applyMove(startMove)
   solved = False
-  boardRevealed = False
-  prevNumPerturbations = math.inf
-  perturbations = 0
+  repairs = 0
+  resamples = 0
+  totalPerturbations = 0
   iterations = 0
-  while not solved:
-    while perturbations < prevNumPerturbations and not solved:
-      nextMove = getNextMove(board)
-      while not boardRevealed and perturbations < prevNumPerturbations:
-        if nextMove is None:
-          if board.isSolved():
-            if perturbations == 0:
-              print(f"Iteration {iterations}: {perturbations}")
-              solved = True
-            boardRevealed = True
-            break
-          else:
-            perturbBoard(board)
-            perturbations += 1
-        else:
-          for x2, y2 in nextMove.cellsToReveal:
-            if board.grid[y2][x2].isMine:
-              print(f"Revealed mine at {x2}, {y2}")
-              raise ValueError("Revealed mine")
-            board.revealCell(board.grid[y2][x2])
-          for x2, y2 in nextMove.cellsToFlag:
-            if not board.grid[y2][x2].isMine:
-              print(f"Flagged safe square at {x2}, {y2}")
-              raise ValueError("Flagged safe square")
-            board.flagCell(board.grid[y2][x2])
-          for x2, y2 in nextMove.cellsToExpand:
-            if board.grid[y2][x2].isMine:
-              print(f"Revealed mine at {x2}, {y2}")
-              raise ValueError("Revealed mine")
-            board.revealCell(board.grid[y2][x2])
-        nextMove = getNextMove(board)
-      if boardRevealed and not solved:
-        print(f"Iteration {iterations}: {perturbations}")
-        # print(f"Perturbations: {perturbations} vs. {prevNumPerturbations}")
-        resetBoard()
-        boardRevealed = False
-        prevNumPerturbations = perturbations
-        perturbations = 0
-        iterations += 1
-    if not solved:
-      print("Took more perturbations than before")
-      print(f"Restarting...")
-      prevNumPerturbations = math.inf
-      perturbations = 0
-      reshuffleBoard()
-  resetBoard()
+  bestPlane = board.minePlane.copy()
+  bestProgress = -1 # the number of cells the solver revealed from the start on the best layout so far
+  while not solved and not outOfBudget():
+    try:
+      nextMove = session.getNextMove(deadline)
+    except TimeoutError: # the budget ran out during a constraint search
+      if board.visiblePlane.count(1) > bestProgress:
+        bestPlane = board.minePlane.copy()
+      break
+    if nextMove is not None:
+      for x2, y2 in nextMove.cellsToReveal | nextMove.cellsToExpand:
+        if board.grid[y2][x2].isMine:
+          print(f"Revealed mine at {x2}, {y2}")
+          raise ValueError("Revealed mine")
+      for x2, y2 in nextMove.cellsToFlag:
+        if not board.grid[y2][x2].isMine:
+          print(f"Flagged safe square at {x2}, {y2}")
+          raise ValueError("Flagged safe square")
+      session.applyMove(nextMove)
+      continue
+    if board.isSolved():
+      solved = True
+      break
+    progress = board.visiblePlane.count(1)
+    if progress > bestProgress:
+      bestProgress = progress
+      bestPlane = board.minePlane.copy()
+    if repairs < maxRepairs:
+      try:
+        sourceCell, targetCell = perturbBoard(board, rng)
+      except ValueError:
+        sourceCell = None
+    if repairs >= maxRepairs or sourceCell is None:
+      repairs = 0
+      iterations += 1
+      if resamples < MAX_RESAMPLES and resampleBoard():
+        print(f"Iteration {iterations}: resampled the hidden mines")
+        recordEvent("resamples")
+        resamples += 1
+      else:
+        print(f"Iteration {iterations}: reshuffling")
+        recordEvent("reshuffles")
+        resamples = 0
+        reshuffleBoard()
+      continue
+    repairs += 1
+    totalPerturbations += 1
+    recordEvent("perturbations")
+    session.repair({sourceCell, targetCell})
+    if session.checkpoint() == 0: # the start area itself changed
+      session.applyMove(startMove)
+  if not solved:
+    session.reset()
+    board.loadPlanes(bestPlane)
+  board.resetVisibility()
+  board.revealCell(board.grid[y][x])
+  recordEvent("generations")
+  recordEvent("noGuessGenerations" if solved else "boundedGenerations")
+  return GenerationResult(board, solved, totalPerturbations, iterations, (time.perf_counter() - startTime) * 1000)
+
+workerStopEvent: multiprocessing.Event = None # the stop event of the parallel generation a worker process belongs to
+# worker processes shared by every parallel generation of this process, started on first use
+parallelExecutor: ProcessPoolExecutor = None
+parallelStopEvent: multiprocessing.Event = None
+parallelWorkers = 0
+lingeringFutures: set = set() # attempts of the last race that were still running when it ended
+parallelLock = threading.Lock()
+
+def initGenerationWorker(stopEvent: multiprocessing.Event):
+  global workerStopEvent
+  workerStopEvent = stopEvent
+
+def generateMinePlane(width: int, height: int, mines: int, startLocation: tuple[int, int], seed: int) -> bytearray:
+  """
+  Run one seeded generation attempt in a worker process.
+
+  Returns:
+    bytearray: The mine plane of the generated board, or None if the attempt was cancelled.
+  """
+  board = generateBoard2(width, height, mines, startLocation, workerStopEvent, seed)
+  return None if board is None else board.minePlane
+
+def generateBoardParallel(width: int, height: int, mines: int, startLocation: tuple[int, int], workers: int = None) -> Board:
+  """
+  Generate a board by running independent generation attempts in parallel processes, keeping the first one to finish.
+  Each attempt restarts at random, so the time a single attempt needs has a long tail; racing several seeded attempts
+  brings the latency down to roughly the fastest of them. Once one finishes the others are told to stop.
+  The worker processes are started on the first call and kept for the life of this process, since starting them costs
+  more than a typical board takes to generate. Only one parallel generation runs at a time; a call made while another
+  is running generates its board in this process.
+  Where processes are not available (e.g. AWS Lambda, which has no shared memory for multiprocessing), the board is
+  generated in this process instead.
+
+  Args:
+    startLocation (tuple[int, int]): The starting location on the board.
+    workers (int): The number of parallel attempts. Defaults to the number of CPUs.
+
+  Raises:
+    ValueError: If the start location is out of bounds.
+  """
+  x, y = startLocation
+  if (x < 0 or x >= width) or (y < 0 or y >= height):
+    raise ValueError("Start location is out of bounds")
+  workers = workers or os.cpu_count() or 1
+  if workers <= 1 or not parallelLock.acquire(blocking=False):
+    return generateBoard2(width, height, mines, startLocation)
+  try:
+    minePlane = raceGeneration(width, height, mines, startLocation, workers)
+  finally:
+    parallelLock.release()
+  if minePlane is None:
+    return generateBoard2(width, height, mines, startLocation)
+  board = Board(width=width, height=height, mines=mines, startLocation=startLocation, minePlane=minePlane)
+  board.revealCell(board.grid[y][x])
   return board
-  
+
+def raceGeneration(width: int, height: int, mines: int, startLocation: tuple[int, int], workers: int) -> bytearray:
+  """
+  Race seeded generation attempts on the shared worker processes. Must be called with parallelLock held.
+
+  Returns:
+    bytearray: The mine plane of the first attempt to finish, or None if parallel generation is unavailable or no
+      attempt finished a board.
+  """
+  global parallelExecutor, parallelStopEvent, parallelWorkers, lingeringFutures
+  try:
+    if parallelExecutor is None or parallelWorkers != workers:
+      if parallelExecutor is not None:
+        parallelExecutor.shutdown(wait=False, cancel_futures=True)
+      parallelStopEvent = multiprocessing.Event()
+      parallelExecutor = ProcessPoolExecutor(max_workers=workers, initializer=initGenerationWorker, initargs=(parallelStopEvent,))
+      parallelWorkers = workers
+      lingeringFutures = set()
+    wait(lingeringFutures) # the attempts that lost the last race stop soon after it ends
+    parallelStopEvent.clear()
+    pending = {parallelExecutor.submit(generateMinePlane, width, height, mines, startLocation, random.getrandbits(64)) for _ in range(workers)}
+  except (OSError, NotImplementedError, BrokenProcessPool) as e:
+    print(f"Parallel generation unavailable, generating serially: {e}")
+    discardParallelExecutor()
+    return None
+  minePlane = None
+  try:
+    while minePlane is None and pending:
+      done, pending = wait(pending, return_when=FIRST_COMPLETED)
+      for future in done:
+        if future.result() is not None:
+          minePlane = future.result()
+          break
+  except BrokenProcessPool as e:
+    print(f"Parallel generation failed, generating serially: {e}")
+    discardParallelExecutor()
+    pending = set() # the dead pool's futures never finish, so the next race must not wait on them
+    return None
+  finally:
+    parallelStopEvent.set()
+    for future in pending:
+      future.cancel()
+    lingeringFutures = pending
+  return minePlane
+
+def discardParallelExecutor():
+  """
+  Shut down the shared worker processes after a failure, so the next race starts a fresh pool. Must be called with
+  parallelLock held.
+  """
+  global parallelExecutor, lingeringFutures
+  if parallelExecutor is not None:
+    parallelExecutor.shutdown(wait=False, cancel_futures=True)
+  parallelExecutor = None
+  lingeringFutures = set()
 
 
 # testBoard = generateBoard2(30, 16, 179, (4, 4))
@@ -1,9 +1,33 @@
+import os
 import json
-from Board import parseBoard
-from generate import generateBoard2
-from solver import getNextMove
+import time
+import base64
+from Board import Board, parseBoard, parseCompactBoard, parseBinaryBoard
+from generate import generateBoardParallel, generateBoundedBoard
+from pool import takePooledBoard, schedulePoolRefill, getSeededBoard
+from solver import getNextMove, getGuessMove, SolverSession
+from profiling import PROFILING_ENABLED, profiler
+from hintcache import getCachedHint
 # Board generation route: https://06koy0jra2.execute-api.us-east-1.amazonaws.com/genboard
 # Hint Provider route: https://06koy0jra2.execute-api.us-east-1.amazonaws.com/hint
+# Batch Hint Provider route: https://06koy0jra2.execute-api.us-east-1.amazonaws.com/hint/batch
+# Solution route: https://06koy0jra2.execute-api.us-east-1.amazonaws.com/solve
+
+# Limits for POST /hint/batch
+BATCH_MAX_BOARDS = 1000
+BATCH_DEFAULT_TIMEOUT_MILLIS = 1000
+BATCH_MAX_TIMEOUT_MILLIS = 10000
+# Time a whole batch may take, leaving room to send the response before the 30 s function timeout
+BATCH_TOTAL_TIMEOUT_MILLIS = 25000
+# Time kept back from the function's remaining time for sending the response
+RESPONSE_MARGIN_MILLIS = 2000
+# Limits for POST /solve
+SOLVE_DEFAULT_TIMEOUT_MILLIS = 5000
+SOLVE_MAX_TIMEOUT_MILLIS = 20000
+# Board encodings accepted by the encoding parameter: per-cell JSON, or the bit-packed planes of Board.toCompactJSON
+BOARD_ENCODINGS = ('json', 'compact')
+# Number of processes racing to generate a board when none is pooled. Lambda cannot run worker processes, so it uses 1.
+GENERATION_WORKERS = int(os.environ.get("GENERATION_WORKERS", "1"))
 
 def handler(event: dict, context: dict) -> dict:
   """
@@ -18,9 +42,13 @@ def handler(event: dict, context: dict) -> dict:
     dict: The response dictionary with status code and body.
   The handler processes the following paths and methods:
     - GET /genboard: Generates a new Minesweeper board.
-    - POST /hint: Provides a hint for the Minesweeper game.
+    - POST /hint: Provides a hint for the Minesweeper game. A binary body (isBase64Encoded) is read as a board in the
+      format of Board.toBinary.
+    - POST /hint/batch: Provides a hint for each of many Minesweeper boards.
+    - POST /solve: Provides every move from the current position to the end of the game or the first guess.
     - Returns a 400 status code for invalid paths or methods.
     - Returns a 500 status code for internal server errors.
+  With SOLVER_PROFILING=true, the solver counters of the request are logged and returned in the X-Solver-Profile header.
   """
   print("Event:")
   print(event)
@@ -34,7 +62,9 @@ def handler(event: dict, context: dict) -> dict:
   if 'body' in event:
     inBody = event['body']
   try:
-    if inBody is not None:
+    if inBody is not None and event.get('isBase64Encoded'):
+      inBody = base64.b64decode(inBody)
+    elif inBody is not None:
       inBody = json.loads(event['body'])
   except:
     print("Could not parse body as JSON")
@@ -44,19 +74,43 @@ def handler(event: dict, context: dict) -> dict:
     queryStringParameters = event['queryStringParameters']
   print(f"Path 2: {path}, Method: {method}, Body: {inBody}, Query: {queryStringParameters}")
   # handle request
+  if PROFILING_ENABLED:
+    profiler.reset()
   try:
     if "genboard" in path and method == "GET":
-      return handle_genboard(queryStringParameters)
+      response = handle_genboard(queryStringParameters)
+    elif 'hint/batch' in path and method == "POST":
+      response = handle_hint_batch(inBody, context)
     elif 'hint' in path and method == "POST":
-      return handle_hint(inBody)
+      response = handle_hint(inBody)
+    elif 'solve' in path and method == "POST":
+      response = handle_solve(inBody)
     else:
-      return generate_response(400, {"message": "Invalid path or method"})
+      response = generate_response(400, {"message": "Invalid path or method"})
   except Exception as e:
-    return generate_response(500, {"message": str(e)})
+    response = generate_response(500, {"message": str(e)})
+  if PROFILING_ENABLED:
+    add_profile(response)
+  return response
+
+def add_profile(response: dict):
+  """
+  Log the solver counters collected during a request and attach them to its response as the X-Solver-Profile header.
+  Counters from background pool refills running at the same time are included too.
+  Args:
+    response (dict): The HTTP response dictionary to add the header to.
+  """
+  profile = json.dumps(profiler.toJSON())
+  print(f"Solver profile: {profile}")
+  response["headers"]["X-Solver-Profile"] = profile
+  response["headers"]["Access-Control-Expose-Headers"] = "X-Solver-Profile"
 
 def handle_genboard(params: dict) -> dict:
   """
   Handles the generation of a Minesweeper board based on the provided parameters.
+  A board is served from the pre-generated pool when one fits the start location, and generated on the spot otherwise.
+  Either way the pool is topped up in the background when the board has one of the preset sizes. A seeded request always gets the board its
+  seed generates instead, served from the seeded board cache once it has been generated.
   Args:
     params (dict): A dictionary containing the following keys:
       - 'width' (str): The width of the board.
@@ -64,9 +118,16 @@ def handle_genboard(params: dict) -> dict:
       - 'mines' (str): The number of mines to place on the board.
       - 'startX' (str): The starting X coordinate.
       - 'startY' (str): The starting Y coordinate.
+      - 'maxMillis' (str, optional): How long live generation may take, in milliseconds. Defaults to no limit.
+      - 'requireNoGuess' (str, optional): 'false' to accept the best board found within maxMillis even if it may need a
+        guess. Defaults to 'true', which fails with a 503 response when no no-guess board is found in time.
+      - 'seed' (str, optional): A non-negative integer. The same parameters and seed always give the same board, e.g. for
+        daily or shared boards. Defaults to a random board.
+      - 'encoding' (str, optional): 'compact' to return the board as bit-packed planes (see Board.toCompactJSON).
+        Defaults to 'json', the per-cell format.
   Returns:
     dict: A dictionary representing the HTTP response. If successful, the response contains
-        a message and the generated board in JSON format. If any required parameter is missing
+        a message, the generated board in JSON format and how it was generated. If any required parameter is missing
         or invalid, the response contains an error message.
   """
 
@@ -82,11 +143,44 @@ def handle_genboard(params: dict) -> dict:
   mines = int(params['mines'])
   startX = int(params['startX'])
   startY = int(params['startY'])
-  boardInst = generateBoard2(width, height, mines, (startX, startY))
+  maxMillis = None
+  if 'maxMillis' in params:
+    if not params['maxMillis'].isdigit():
+      return generate_response(400, {"message": "Invalid query parameter: maxMillis"})
+    maxMillis = int(params['maxMillis'])
+  requireNoGuess = params.get('requireNoGuess', 'true').lower()
+  if requireNoGuess not in ('true', 'false'):
+    return generate_response(400, {"message": "Invalid query parameter: requireNoGuess"})
+  requireNoGuess = requireNoGuess == 'true'
+  encoding = params.get('encoding', 'json').lower()
+  if encoding not in BOARD_ENCODINGS:
+    return generate_response(400, {"message": "Invalid query parameter: encoding"})
+  seed = params.get('seed')
+  if seed is not None and not seed.isdigit():
+    return generate_response(400, {"message": "Invalid query parameter: seed"})
+  if seed is not None:
+    boardInst, generation = getSeededBoard(width, height, mines, (startX, startY), int(seed), maxMillis)
+    if requireNoGuess and not generation["noGuess"]:
+      return generate_response(503, {"message": f"Could not generate a no-guess board within {maxMillis} ms", "generation": generation})
+  else:
+    boardInst = takePooledBoard(width, height, mines, (startX, startY))
+    generation = {"noGuess": True, "pooled": True}
+    if boardInst is None and maxMillis is None:
+      boardInst = generateBoardParallel(width, height, mines, (startX, startY), GENERATION_WORKERS)
+      generation = {"noGuess": True, "pooled": False}
+    elif boardInst is None:
+      result = generateBoundedBoard(width, height, mines, (startX, startY), maxMillis=maxMillis)
+      generation = {**result.toJSON(), "pooled": False}
+      if requireNoGuess and not result.noGuess:
+        return generate_response(503, {"message": f"Could not generate a no-guess board within {maxMillis} ms", "generation": generation})
+      boardInst = result.board
+    schedulePoolRefill(width, height, mines)
   # boardInst.display()
   outBody = {
     "message": f"Generated board with width: {width}, height: {height}, mines: {mines}",
-    "board": boardInst.toJSON()
+    "board": boardInst.toCompactJSON() if encoding == 'compact' else boardInst.toJSON(),
+    "encoding": encoding,
+    "generation": generation
   }
   return generate_response(200, outBody)
 
@@ -95,22 +189,154 @@ def handle_hint(body: dict) -> dict:
   Handles the request to provide a hint for the Minesweeper game.
 
   Args:
-    body (dict): A dictionary containing the board state.
+    body (dict): A dictionary containing the board state, in the format named by its 'encoding' key (see parse_board).
   Returns:
     dict: A response dictionary containing the status code and either a hint or an error message.
   The function performs the following steps:
   1. Parses the board from the provided body.
   2. If the board format is invalid, returns a 400 response with an error message.
   3. If the board format is valid, retrieves a hint from the parsed board.
+     If no cell can be deduced for certain, the hint points at the cell least likely to be a mine.
+     Hints are cached by what the player can see, so a repeated (or mirrored, or rotated) position is not solved again.
   4. Returns a 200 response with the hint.
   """
-  parsedBoard = parseBoard(body)
+  parsedBoard = parse_board(body)
   if parsedBoard is None:
     return generate_response(400, {"message": "Invalid board format"})
-  move = getNextMove(parsedBoard)
-  hint = [hintStep.toJSON() for hintStep in move.hintSteps]
+  outBody = getCachedHint(parsedBoard, lambda: get_hint(parsedBoard))
   print("Got hint!")
-  return generate_response(200, {"hint": hint})
+  return generate_response(200, outBody)
+
+def handle_hint_batch(body: dict | list, context=None) -> dict:
+  """
+  Handles the request to provide hints for many Minesweeper boards at once.
+  Every board is solved in this one invocation, so the solver's per-size tables and cached frontier components stay
+  warm across the whole batch instead of being rebuilt by a separate request per board.
+
+  Args:
+    body (dict | list): Either a list of board states, or a dictionary containing:
+      - 'boards' (list): The board states.
+      - 'timeoutMillis' (int): How long the solver may spend on a single board. Defaults to BATCH_DEFAULT_TIMEOUT_MILLIS.
+    context (LambdaContext): The Lambda context, if any. The whole batch stops before the function's remaining time runs
+      out, and never takes longer than BATCH_TOTAL_TIMEOUT_MILLIS.
+  Returns:
+    dict: A response dictionary containing the status code and either the results or an error message.
+      The results are in the same order as the boards. Each one is the body /hint would return for that board, or an
+      error message if the board could not be parsed, its hint took longer than the timeout, or the batch ran out of time
+      before reaching it.
+  """
+  boards = body.get('boards') if isinstance(body, dict) else body
+  if not isinstance(boards, list):
+    return generate_response(400, {"message": "Expected a list of boards"})
+  if len(boards) > BATCH_MAX_BOARDS:
+    return generate_response(400, {"message": f"Too many boards: at most {BATCH_MAX_BOARDS} are allowed per batch"})
+  timeoutMillis = body.get('timeoutMillis', BATCH_DEFAULT_TIMEOUT_MILLIS) if isinstance(body, dict) else BATCH_DEFAULT_TIMEOUT_MILLIS
+  if not isinstance(timeoutMillis, int) or isinstance(timeoutMillis, bool) or timeoutMillis <= 0 or timeoutMillis > BATCH_MAX_TIMEOUT_MILLIS:
+    return generate_response(400, {"message": f"Invalid timeoutMillis: expected a whole number from 1 to {BATCH_MAX_TIMEOUT_MILLIS}"})
+  totalMillis = BATCH_TOTAL_TIMEOUT_MILLIS
+  if hasattr(context, 'get_remaining_time_in_millis'):
+    totalMillis = min(totalMillis, context.get_remaining_time_in_millis() - RESPONSE_MARGIN_MILLIS)
+  batchDeadline = time.perf_counter() + totalMillis / 1000
+  results = []
+  for boardJson in boards:
+    if time.perf_counter() >= batchDeadline:
+      results.append({"hint": [], "message": "Timed out before this board was reached"})
+      continue
+    parsedBoard = parse_board(boardJson)
+    if parsedBoard is None:
+      results.append({"message": "Invalid board format"})
+      continue
+    try:
+      deadline = min(time.perf_counter() + timeoutMillis / 1000, batchDeadline)
+      results.append(getCachedHint(parsedBoard, lambda: get_hint(parsedBoard, deadline)))
+    except TimeoutError:
+      results.append({"hint": [], "message": "Timed out while looking for a hint"})
+  print(f"Got {len(results)} hints!")
+  return generate_response(200, {"results": results})
+
+def handle_solve(body: dict) -> dict:
+  """
+  Handles the request to solve a Minesweeper game from its current position.
+  The whole sequence of moves is found in one pass of a SolverSession, which only re-examines the cells each move
+  changed, so a client can show every later hint without asking the server again.
+
+  Args:
+    body (dict): The board state, in the format named by its 'encoding' key (see parse_board). It may also contain:
+      - 'timeoutMillis' (int): How long the solver may take. Defaults to SOLVE_DEFAULT_TIMEOUT_MILLIS.
+  Returns:
+    dict: A response dictionary containing the status code and either the solution or an error message.
+      The solution contains:
+        - moves (list): Every move in order, as returned by Move.toJSON. Each move is made on the board left by the
+          moves before it.
+        - guess (dict): When the game cannot be finished without guessing, the move the solver would guess, as returned
+          by Move.toJSON. It is not part of moves. None otherwise.
+        - status (str): 'solved' if the moves finish the game, 'guess' if they stop at a guess, 'timeout' if the solver
+          ran out of time (moves holds what it found so far), or 'stuck' if nothing more could be worked out.
+  """
+  parsedBoard = parse_board(body)
+  if parsedBoard is None:
+    return generate_response(400, {"message": "Invalid board format"})
+  timeoutMillis = body.get('timeoutMillis', SOLVE_DEFAULT_TIMEOUT_MILLIS) if isinstance(body, dict) else SOLVE_DEFAULT_TIMEOUT_MILLIS
+  if not isinstance(timeoutMillis, int) or isinstance(timeoutMillis, bool) or timeoutMillis <= 0 or timeoutMillis > SOLVE_MAX_TIMEOUT_MILLIS:
+    return generate_response(400, {"message": f"Invalid timeoutMillis: expected a whole number from 1 to {SOLVE_MAX_TIMEOUT_MILLIS}"})
+  deadline = time.perf_counter() + timeoutMillis / 1000
+  moves = []
+  guess = None
+  status = 'stuck'
+  try:
+    for move in SolverSession(parsedBoard).solve(deadline):
+      if move.isGuess:
+        guess = move.toJSON()
+        status = 'guess'
+      else:
+        moves.append(move.toJSON())
+    if parsedBoard.isSolved():
+      status = 'solved'
+  except TimeoutError:
+    status = 'timeout'
+  print(f"Solved {len(moves)} moves: {status}")
+  return generate_response(200, {"moves": moves, "guess": guess, "status": status})
+
+def parse_board(boardJson: dict) -> Board:
+  """
+  Parses a board sent by a client.
+
+  Args:
+    boardJson (dict | bytes): The board state. Its 'encoding' key selects the format: 'compact' for the bit-packed
+      planes of Board.toCompactJSON, or 'json' (the default) for the per-cell format of Board.toJSON.
+      Raw bytes are read as the binary format of Board.toBinary.
+  Returns:
+    Board: The parsed board, or None if the board or its encoding is invalid.
+  """
+  if isinstance(boardJson, (bytes, bytearray, memoryview)):
+    return parseBinaryBoard(boardJson)
+  if not isinstance(boardJson, dict):
+    return None
+  encoding = boardJson.get('encoding', 'json')
+  if encoding == 'compact':
+    return parseCompactBoard(boardJson)
+  if encoding == 'json':
+    return parseBoard(boardJson)
+  return None
+
+def get_hint(board: Board, deadline: float = None) -> dict:
+  """
+  Finds the hint for a board.
+
+  Args:
+    board (Board): The parsed board.
+    deadline (float): A time.perf_counter() value after which the solver gives up. Defaults to no limit.
+  Returns:
+    dict: The response body: the hint steps, plus a message if there is no hint.
+  Raises:
+    TimeoutError: If the deadline passes before a hint is found.
+  """
+  move = getNextMove(board, deadline=deadline)
+  if move is None:
+    move = getGuessMove(board, deadline)
+  if move is None:
+    return {"hint": [], "message": "No hint available for this board"}
+  return {"hint": [hintStep.toJSON() for hintStep in move.hintSteps]}
 
 def generate_response(statusCode: int, body: dict) -> dict:
   """
@@ -0,0 +1,133 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable
+from Board import Board
+from shared import SYMMETRIES, get_redis_connection, transformLocation, inverseLocation
+
+# "local" keeps hints in this process only; "redis" also shares them between instances through Redis
+HINT_CACHE_BACKEND = os.environ.get("HINT_CACHE_BACKEND", "local")
+# Number of hints kept by the in-process cache
+HINT_CACHE_SIZE = int(os.environ.get("HINT_CACHE_SIZE", "4096"))
+# How long a hint is kept in Redis
+HINT_CACHE_TTL_SECONDS = int(os.environ.get("HINT_CACHE_TTL_SECONDS", "86400"))
+def transformSymbols(symbols: bytes, width: int, height: int, symmetry: tuple[bool, bool, bool]) -> bytes:
+  """
+  Move every cell of a symbol plane to where transformLocation sends it, using slices instead of a loop over the cells.
+  Returns:
+    bytes: The transformed plane. It is height x width when the symmetry swaps x and y.
+  """
+  flipX, flipY, swap = symmetry
+  rows = [symbols[y * width:(y + 1) * width] for y in range(height)]
+  if flipX:
+    rows = [row[::-1] for row in rows]
+  if flipY:
+    rows.reverse()
+  transformed = b''.join(rows)
+  if swap:
+    transformed = b''.join(transformed[x::width] for x in range(width))
+  return transformed
+
+def getCanonicalKey(board: Board) -> tuple[str, tuple[bool, bool, bool]]:
+  """
+  Hash what the player can see of a board (its revealed numbers, its flags, and the mine total) so that every mirror
+  image and rotation of a position gets the same key. The hidden mine layout never goes into the key.
+  The key is taken from the orientation whose symbols sort first.
+  Args:
+    board (Board): The board.
+  Returns:
+    tuple[str, tuple[bool, bool, bool]]: The key, and the symmetry that turns the board into its canonical orientation.
+  """
+  symbols = board.symbolPlane()
+  canonical = None
+  for symmetry in SYMMETRIES: # a height x width board is solved the same way, so all 8 apply to boards of any size
+    width, height = (board.height, board.width) if symmetry[2] else (board.width, board.height)
+    candidate = (width, height, transformSymbols(symbols, board.width, board.height, symmetry))
+    if canonical is None or candidate < canonical[0]:
+      canonical = (candidate, symmetry)
+  (width, height, transformed), symmetry = canonical
+  digest = hashlib.sha256(f"{width}x{height}-{board.mines}:".encode() + transformed).hexdigest()
+  return digest, symmetry
+
+def mapHintLocations(result: dict, mapLocation: Callable[[tuple[int, int]], tuple[int, int]]) -> dict:
+  """
+  Apply a location mapping to every highlighted cell of a hint result, as returned by handler.get_hint.
+  """
+  hint = [{
+    **step,
+    "revealedCellsToHighlight": [list(mapLocation(tuple(location))) for location in step["revealedCellsToHighlight"]],
+    "hiddenCellsToHighlight": [list(mapLocation(tuple(location))) for location in step["hiddenCellsToHighlight"]]
+  } for step in result["hint"]]
+  return {**result, "hint": hint}
+
+class HintCache:
+  def __init__(self, maxSize: int = HINT_CACHE_SIZE, useRedis: bool = HINT_CACHE_BACKEND == "redis"):
+    """
+    Initialize a HintCache: an in-process LRU of hint results, optionally backed by Redis.
+    Results are stored in the canonical orientation of their board.
+    """
+    self.hints: OrderedDict[str, dict] = OrderedDict()
+    self.maxSize = maxSize
+    self.useRedis = useRedis
+    self.lock = threading.Lock()
+
+  def redisKey(self, key: str) -> str:
+    return f"hint-{key}"
+
+  def get(self, key: str) -> dict:
+    with self.lock:
+      result = self.hints.get(key)
+      if result is not None:
+        self.hints.move_to_end(key)
+        return result
+    if not self.useRedis:
+      return None
+    try:
+      value = get_redis_connection().get(self.redisKey(key))
+    except Exception as e:
+      print(f"Could not read hint cache: {e}")
+      return None
+    if value is None:
+      return None
+    result = json.loads(value)
+    self.storeLocal(key, result)
+    return result
+
+  def set(self, key: str, result: dict):
+    self.storeLocal(key, result)
+    if self.useRedis:
+      try:
+        get_redis_connection().set(self.redisKey(key), json.dumps(result), ex=HINT_CACHE_TTL_SECONDS)
+      except Exception as e:
+        print(f"Could not write hint cache: {e}")
+
+  def storeLocal(self, key: str, result: dict):
+    with self.lock:
+      self.hints[key] = result
+      self.hints.move_to_end(key)
+      if len(self.hints) > self.maxSize:
+        self.hints.popitem(last=False)
+
+hintCache = HintCache()
+
+def getCachedHint(board: Board, computeHint: Callable[[], dict]) -> dict:
+  """
+  Get the hint for a board from the hint cache, computing and storing it on a miss.
+  A position that was already solved in any orientation costs one hash of its visible state.
+  Args:
+    board (Board): The board.
+    computeHint (Callable[[], dict]): Computes the hint result for the board as it is oriented, e.g. handler.get_hint.
+      If it raises, nothing is cached.
+  Returns:
+    dict: The hint result, with its highlighted cells in the board's own orientation.
+  """
+  key, symmetry = getCanonicalKey(board)
+  width, height = board.width, board.height
+  cached = hintCache.get(key)
+  if cached is not None:
+    return mapHintLocations(cached, lambda location: inverseLocation(location, width, height, symmetry))
+  result = computeHint()
+  hintCache.set(key, mapHintLocations(result, lambda location: transformLocation(location, width, height, symmetry)))
+  return result
@@ -5,9 +5,9 @@ import requests
 import hashlib
 import base64
 import json
-from redis import Redis as RedisSetup
 from redis.client import Redis as RedisClient
 from routineSegments import allAvailableSegments
+from shared import get_redis_connection
 import random
 import struct
 import rsa
@@ -42,10 +42,6 @@ DB_PASSWORD = os.environ.get("DB_PASSWORD")
 JWT_SECRET = os.environ.get("JWT_SECRET")
 GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
 ENCRYPTION_KEY = os.environ.get("ENCRYPTION_KEY")
-REDIS_HOST = os.environ.get("REDIS_HOST")
-REDIS_PORT = os.environ.get("REDIS_PORT")
-REDIS_PASSWORD = os.environ.get("REDIS_PASSWORD")
-REDIS_DB = os.environ.get("REDIS_DB")
 RSA_PRIVATE_KEY = os.environ.get("RSA_PRIVATE_KEY")
 
 print("SUCCESS: Secrets loaded" if JWT_SECRET is not None and GROQ_API_KEY is not None and RSA_PRIVATE_KEY is not None else "ERROR: Secrets not loaded")
@@ -60,23 +56,6 @@ def decrypt(encryptedString: str) -> str:
   except Exception as e:
     raise ValueError("Error rsa decrypting string: " + str(e))
 
-reusableRedisConnection = None
-
-def get_redis_connection() -> RedisClient:
-  global reusableRedisConnection
-  if reusableRedisConnection is not None:
-    return reusableRedisConnection
-  r: RedisClient = RedisSetup(
-    host=REDIS_HOST,
-    port=REDIS_PORT,
-    decode_responses=True,
-    username="default",
-    password=REDIS_PASSWORD,
-    db=REDIS_DB
-  )
-  reusableRedisConnection = r
-  return reusableRedisConnection
-
 ONE_HOUR = 3600
 
 def base64url_encode(data: bytes) -> str:
@@ -128,7 +107,7 @@ def createAuthorization(userId: str, username: str) -> str:
   return encode_jwt({"userId": userId, "username": username, "createdAt": time.time()}, JWT_SECRET)
 
 def createUser(username: str, encryptedPassword: str, name: str) -> None:
-  redisClient: RedisClient = get_redis_connection()
+  redisClient: RedisClient = get_redis_connection(decode_responses=True)
   decrypt(encryptedPassword) # Test decryption
   redisClient.set(f"users-{username}", json.dumps({
     "_id": newObjectId(),
@@ -139,7 +118,7 @@ def createUser(username: str, encryptedPassword: str, name: str) -> None:
 
 def login(username: str, encryptedPassword: str) -> str:
   # Function to log in a user and return an auth token
-  redisClient = get_redis_connection()
+  redisClient = get_redis_connection(decode_responses=True)
   redisUser = redisClient.get(f"users-{username}")
   if redisUser is not None:
     redisUser = json.loads(redisUser)
@@ -152,14 +131,14 @@ def login(username: str, encryptedPassword: str) -> str:
 
 def checkUsernameAvailable(username: str) -> bool:
   # Function to check if a username is available
-  redisClient = get_redis_connection()
+  redisClient = get_redis_connection(decode_responses=True)
   redisUser = redisClient.get(f"users-{username}")
   return redisUser is None
 
 def getRoutineList(authorization: str) -> list:
   # Function to get a list of routines for a user
   userId, _ = validateAuthorization(authorization)
-  redisClient = get_redis_connection()
+  redisClient = get_redis_connection(decode_responses=True)
   routineKeys = redisClient.keys(f"routines-{userId}-*")
   if len(routineKeys) == 0:
     return []
@@ -175,7 +154,7 @@ def getRoutineList(authorization: str) -> list:
 def getRoutine(authorization: str, routineId: str) -> dict:
   # Function to get a routine by ID
   userId, _ = validateAuthorization(authorization)
-  redisClient = get_redis_connection()
+  redisClient = get_redis_connection(decode_responses=True)
   routine = redisClient.get(f"routines-{userId}-{routineId}")
   if routine is None:
     return None
@@ -248,7 +227,7 @@ def getSegmentsAvailable() -> list:
 def createRoutine(authorization: str, name: str, description: str, segments: list) -> str:
   # Function to create a new routine and return its ID
   userId, _ = validateAuthorization(authorization)
-  redisClient = get_redis_connection()
+  redisClient = get_redis_connection(decode_responses=True)
   availableSegments = getSegmentsAvailable()
   if len(segments) > 0:
     for segment in segments:
@@ -269,7 +248,7 @@ def createRoutine(authorization: str, name: str, description: str, segments: lis
 def updateRoutine(authorization: str, routineId: str, name: str, description: str, segments: list) -> None:
   # Function to update an existing routine
   userId, _ = validateAuthorization(authorization)
-  redisClient = get_redis_connection()
+  redisClient = get_redis_connection(decode_responses=True)
   availableSegments = getSegmentsAvailable()
   if len(segments) > 0:
     for segment in segments:
@@ -289,7 +268,7 @@ def updateRoutine(authorization: str, routineId: str, name: str, description: st
 def deleteRoutine(authorization: str, routineId: str) -> None:
   # Function to delete a routine by ID
   userId, _ = validateAuthorization(authorization)
-  redisClient = get_redis_connection()
+  redisClient = get_redis_connection(decode_responses=True)
   deletedCount = redisClient.delete(f"routines-{userId}-{routineId}")
   if deletedCount == 0:
     raise PermissionError("Routine not found")
@@ -297,7 +276,7 @@ def deleteRoutine(authorization: str, routineId: str) -> None:
 def getUser(authorization: str) -> dict:
   # Function to get user information based on authorization token
   _, username = validateAuthorization(authorization)
-  redisClient = get_redis_connection()
+  redisClient = get_redis_connection(decode_responses=True)
   user = redisClient.get(f"users-{username}")
   if user is None:
     return None
@@ -307,7 +286,7 @@ def getUser(authorization: str) -> dict:
 def updateUser(authorization: str, name: str) -> None:
   # Function to update user information
   _, username = validateAuthorization(authorization)
-  redisClient = get_redis_connection()
+  redisClient = get_redis_connection(decode_responses=True)
   user = redisClient.get(f"users-{username}")
   if user is None:
     raise PermissionError("User not found")
@@ -24,7 +24,7 @@ class HintStep:
     }
 
 class Move:
-  def __init__(self, *, cellsToReveal: set[tuple[int, int]] = set(), cellsToFlag: set[tuple[int, int]] = set(), cellsToExpand: set[tuple[int, int]] = set(), hintSteps: list[HintStep] = []):
+  def __init__(self, *, cellsToReveal: set[tuple[int, int]] = set(), cellsToFlag: set[tuple[int, int]] = set(), cellsToExpand: set[tuple[int, int]] = set(), hintSteps: list[HintStep] = [], isGuess: bool = False):
     """
     Initialize the Move.
     This is used to reveal, flag, and expand cells.
@@ -33,6 +33,7 @@ class Move:
       cellsToFlag (set[tuple[int, int]]): A set of (x, y) coordinates to flag.
       cellsToExpand (set[tuple[int, int]]): A set of (x, y) coordinates to expand.
       hintSteps (list[HintStep]): A list of hint steps to show the user.
+      isGuess (bool): Whether the move reveals a cell that could still be a mine.
     """
     if len(cellsToReveal) == 0 and len(cellsToFlag) == 0 and len(cellsToExpand) == 0:
       raise ValueError("Move must have at least one of cellsToReveal, cellsToFlag, or cellsToExpand.")
@@ -42,6 +43,7 @@ class Move:
     if any(not isinstance(hintStep, HintStep) for hintStep in hintSteps):
       raise ValueError("All hint steps must be of type HintStep.")
     self.hintSteps = hintSteps
+    self.isGuess = isGuess
   def toJSON(self):
     """
     Convert the Move object to a JSON-serializable dictionary.
@@ -1,6 +1,16 @@
-from Board import boardFromString
-from solver import getNextMove
+import json
+import time
+import random
+from itertools import combinations
+import probability
+from Board import NEIGHBOR_OFFSETS, Board, boardFromString, boardFromBytes, parseCompactBoard, parseBinaryBoard
+from generate import basicGrid, generateBoundedBoard
+from solver import getNextMove, SolverSession
 from moves import Move, HintStep
+from pool import getSeededBoard, seededBoardCache
+from shared import SYMMETRIES, transformLocation
+from hintcache import getCanonicalKey, getCachedHint, hintCache
+from handler import get_hint, handle_solve, handle_hint_batch, RESPONSE_MARGIN_MILLIS
 
 tests = [
   {
@@ -67,6 +77,31 @@ tests = [
       HintStep("Flag the remaining mine", {}, {(0, 0)})
     ])
   },
+  {
+    "problem": boardFromString("""
+                               ...
+                               ?M?
+                               """),
+    "function": "getConstrainedCells",
+    "solution": Move(cellsToReveal={(0, 1), (2, 1)}, cellsToFlag={(1, 1)}, hintSteps=[
+      HintStep('Look at how these numbers share their hidden cells.', {(0, 0), (1, 0), (2, 0)}, {(0, 1), (1, 1), (2, 1)}),
+      HintStep('Every way of placing the mines around these numbers puts a mine in this cell, so it should be flagged.', {}, {(1, 1)}),
+      HintStep('No way of placing the mines around these numbers puts a mine in these cells, so they are safe to reveal.', {}, {(0, 1), (2, 1)})
+    ])
+  },
+  {
+    "problem": boardFromString("""
+                               .?.??
+                               MM??M
+                               ??M??
+                               """),
+    "function": "getReducedCells",
+    "solution": Move(cellsToReveal={(2, 1), (3, 0), (3, 1)}, cellsToFlag={(0, 1)}, hintSteps=[
+      HintStep('Compare the counts of these numbers: adding and subtracting them cancels out the cells they share.', {(0, 0), (2, 0)}, set([(1, 0), (0, 1), (1, 1), (3, 0), (2, 1), (3, 1)])),
+      HintStep('What is left only adds up if this cell is a mine, so flag it.', {(0, 0), (2, 0)}, {(0, 1)}),
+      HintStep('What is left only adds up if these cells are safe, so reveal them.', {(0, 0), (2, 0)}, {(2, 1), (3, 0), (3, 1)})
+    ])
+  },
   {
     "problem": boardFromString("""
                                ?F.
@@ -109,6 +144,352 @@ for index, test in enumerate(tests):
   except Exception as e:
     print(f"Error: {e}")
     allTestsPassed = False
+def playStateless(board: Board):
+  move = getNextMove(board)
+  while move is not None:
+    for x, y in move.cellsToReveal:
+      assert not board.minePlane[y * board.width + x], f"Revealed a mine at {(x, y)}"
+      board.reveal(y * board.width + x)
+    for x, y in move.cellsToFlag:
+      assert board.minePlane[y * board.width + x], f"Flagged a safe cell at {(x, y)}"
+      board.setFlag(y * board.width + x, True)
+    move = getNextMove(board)
+
+def playSession(session: SolverSession):
+  move = session.getNextMove()
+  while move is not None:
+    session.applyMove(move)
+    move = session.getNextMove()
+
+# first hint step of the moves found by the single-cell and pair rules
+LOCAL_HINTS = ("Flag the remaining cell", "Reveal the remaining cell", "Check out these two cells.")
+
+def seededBoard(width: int, height: int, mines: int, seed: int) -> Board:
+  startLocation = (width // 2, height // 2)
+  board = Board(width=width, height=height, mines=mines, startLocation=startLocation, minePlane=basicGrid(width, height, mines, startLocation, seed=seed))
+  board.reveal(startLocation[1] * width + startLocation[0])
+  return board
+
+def checkSessionMatchesStateless():
+  for seed in range(8):
+    board = seededBoard(16, 16, 40, seed)
+    expected = board.copy()
+    playStateless(expected)
+    session = SolverSession(board)
+    move = session.getNextMove()
+    while move is not None:
+      # the dirty worklist must not hide a local deduction that a full scan finds
+      if any(getNextMove(board, type=rule) for rule in ('getFlagRemainingNeighbors', 'getExpandCell', 'getIntersectCells')):
+        assert move.hintSteps[0].text.startswith(LOCAL_HINTS), f"Seed {seed}: the session missed a local move"
+      session.applyMove(move)
+      move = session.getNextMove()
+    assert board.visiblePlane == expected.visiblePlane and board.flagPlane == expected.flagPlane, f"Seed {seed}: the session stopped in a different position than getNextMove"
+
+def checkSessionRestore():
+  board = seededBoard(16, 16, 40, 3)
+  session = SolverSession(board)
+  session.applyMove(session.getNextMove())
+  checkpoint = session.checkpoint()
+  visiblePlane, flagPlane = board.visiblePlane.copy(), board.flagPlane.copy()
+  playSession(session)
+  session.restore(checkpoint)
+  assert board.visiblePlane == visiblePlane and board.flagPlane == flagPlane, "restore did not undo the moves after the checkpoint"
+  expected = board.copy()
+  playStateless(expected)
+  playSession(session)
+  assert board.visiblePlane == expected.visiblePlane and board.flagPlane == expected.flagPlane, "the session did not resume after restore"
+
+def checkSessionMarkChanged():
+  board = seededBoard(16, 16, 40, 5)
+  session = SolverSession(board)
+  session.applyMove(session.getNextMove())
+  mine = next(index for index in range(board.size) if board.minePlane[index] and not board.visiblePlane[index])
+  board.setFlag(mine, True) # a flag placed outside the session
+  session.markChanged({mine})
+  expected = board.copy()
+  playStateless(expected)
+  playSession(session)
+  assert board.visiblePlane == expected.visiblePlane and board.flagPlane == expected.flagPlane, "the session missed a change reported with markChanged"
+
+def samePosition(board: Board, other: Board) -> bool:
+  return (board.width, board.height, board.mines, board.startLocation) == (other.width, other.height, other.mines, other.startLocation) and board.minePlane == other.minePlane and board.visiblePlane == other.visiblePlane and board.flagPlane == other.flagPlane
+
+def randomPosition(width: int, height: int, seed: int) -> Board:
+  rng = random.Random(seed)
+  minePlane = bytearray(1 if rng.random() < 0.2 else 0 for _ in range(width * height))
+  visiblePlane = bytearray(0 if mine or rng.random() < 0.5 else 1 for mine in minePlane)
+  flagPlane = bytearray(1 if not visible and rng.random() < 0.3 else 0 for visible in visiblePlane)
+  return Board(width=width, height=height, mines=minePlane.count(1), startLocation=(width // 2, height // 2), minePlane=minePlane, visiblePlane=visiblePlane, flagPlane=flagPlane)
+
+def checkCompactRoundTrip():
+  for width, height in [(1, 1), (3, 5), (8, 8), (30, 16)]: # sizes that do and do not fill whole bytes
+    board = randomPosition(width, height, width * height)
+    parsed = parseCompactBoard(board.toCompactJSON())
+    assert parsed is not None and samePosition(board, parsed), f"{width}x{height}: compact round trip changed the board"
+
+def checkCompactErrors():
+  compact = seededBoard(9, 9, 10, 2).toCompactJSON()
+  assert parseCompactBoard({**compact, "minePlane": compact["minePlane"][:-2]}) is None, "a truncated plane was accepted"
+  assert parseCompactBoard({**compact, "visiblePlane": "not base64!"}) is None, "an invalid plane was accepted"
+  assert parseCompactBoard({**compact, "width": -9}) is None, "a negative width was accepted"
+  assert parseCompactBoard({key: value for key, value in compact.items() if key != "flagPlane"}) is None, "a missing plane was accepted"
+
+def checkBinaryRoundTrip():
+  for width, height in [(1, 1), (3, 5), (8, 8), (30, 16)]:
+    board = randomPosition(width, height, width * height)
+    data = board.toBinary()
+    for encoded in (data, bytearray(data), memoryview(data)):
+      parsed = parseBinaryBoard(encoded)
+      assert parsed is not None and samePosition(board, parsed), f"{width}x{height}: binary round trip of {type(encoded).__name__} changed the board"
+
+def checkBinaryErrors():
+  data = randomPosition(9, 9, 4).toBinary()
+  assert parseBinaryBoard(data[:-1]) is None, "a truncated board was accepted"
+  assert parseBinaryBoard(data + b'\x00') is None, "trailing bytes were accepted"
+  assert parseBinaryBoard(data[:5]) is None, "a truncated header was accepted"
+
+def checkBoardFromBytes():
+  board = boardFromBytes(memoryview(b"""
+    M.?
+    F.?
+  """))
+  assert board is not None and (board.width, board.height, board.mines) == (3, 2, 2), "wrong board size or mine count"
+  assert board.minePlane == bytearray([1, 0, 0, 1, 0, 0]), "wrong mine plane"
+  assert board.visiblePlane == bytearray([0, 1, 0, 0, 1, 0]), "wrong visible plane"
+  assert board.flagPlane == bytearray([0, 0, 0, 1, 0, 0]), "wrong flag plane"
+  assert list(board.mineCounts) == [1, 2, 0, 1, 2, 0], "wrong mine counts"
+  assert samePosition(board, boardFromString("M.?\nF.?")), "boardFromString disagrees with boardFromBytes"
+  assert boardFromBytes(b"M.?\nF.") is None, "rows of different lengths were accepted"
+  assert boardFromBytes(b"M.x\nF.?") is None, "an invalid character was accepted"
+  assert boardFromBytes(b"\n\n") is None, "an empty board was accepted"
+
+def transformBoard(board: Board, symmetry: tuple[bool, bool, bool]) -> Board:
+  width, height = (board.height, board.width) if symmetry[2] else (board.width, board.height)
+  planes = [bytearray(board.size) for _ in range(3)]
+  for index in range(board.size):
+    x, y = transformLocation((index % board.width, index // board.width), board.width, board.height, symmetry)
+    for plane, source in zip(planes, (board.minePlane, board.visiblePlane, board.flagPlane)):
+      plane[y * width + x] = source[index]
+  startLocation = transformLocation(board.startLocation, board.width, board.height, symmetry)
+  return Board(width=width, height=height, mines=board.mines, startLocation=startLocation, minePlane=planes[0], visiblePlane=planes[1], flagPlane=planes[2])
+
+def checkCanonicalKeySymmetry():
+  board = boardFromString("""
+    F..FF
+    ??MM.
+    ????.
+  """)
+  key, _ = getCanonicalKey(board)
+  for symmetry in SYMMETRIES:
+    assert getCanonicalKey(transformBoard(board, symmetry))[0] == key, f"symmetry {symmetry} changed the key"
+  flagged = board.copy()
+  flagged.setFlag(2 * board.width, True)
+  assert getCanonicalKey(flagged)[0] != key, "a new flag did not change the key"
+  revealed = board.copy()
+  revealed.reveal(2 * board.width + 1)
+  assert getCanonicalKey(revealed)[0] != key, "a revealed cell did not change the key"
+
+def checkCachedHintLocations():
+  hintCache.hints.clear()
+  board = boardFromString("""
+    F..FF
+    ??MM.
+    ????.
+  """)
+  expected = getCachedHint(board, lambda: get_hint(board))
+  def cacheMiss():
+    raise AssertionError("a mirrored or rotated position was solved again")
+  for symmetry in SYMMETRIES:
+    transformed = transformBoard(board, symmetry)
+    result = getCachedHint(transformed, cacheMiss)
+    assert len(result["hint"]) == len(expected["hint"]), f"symmetry {symmetry} changed the number of hint steps"
+    for step, expectedStep in zip(result["hint"], expected["hint"]):
+      assert step["text"] == expectedStep["text"], f"symmetry {symmetry} changed a hint text"
+      for field in ("revealedCellsToHighlight", "hiddenCellsToHighlight"):
+        locations = {tuple(transformLocation(tuple(location), board.width, board.height, symmetry)) for location in expectedStep[field]}
+        assert {tuple(location) for location in step[field]} == locations, f"symmetry {symmetry} highlights the wrong cells"
+  hintCache.hints.clear()
+
+def replaySolution(board: Board, moves: list[dict]):
+  for move in moves:
+    for x, y in move["cellsToReveal"]:
+      assert not board.minePlane[y * board.width + x], f"/solve revealed a mine at {(x, y)}"
+      board.reveal(y * board.width + x)
+    for x, y in move["cellsToFlag"]:
+      assert board.minePlane[y * board.width + x], f"/solve flagged a safe cell at {(x, y)}"
+      board.setFlag(y * board.width + x, True)
+
+def checkSolveHandler():
+  statuses = set()
+  for seed in range(20):
+    board = seededBoard(9, 9, 10, seed)
+    response = handle_solve(board.toJSON())
+    assert response["statusCode"] == 200, f"seed {seed}: /solve failed"
+    body = json.loads(response["body"])
+    replaySolution(board, body["moves"])
+    assert (body["status"] == 'solved') == board.isSolved(), f"seed {seed}: status {body['status']} does not match the replayed board"
+    assert (body["status"] == 'guess') == (body["guess"] is not None), f"seed {seed}: guess does not match status {body['status']}"
+    statuses.add(body["status"])
+  assert {'solved', 'guess'} <= statuses, f"expected both solved and guess positions, got {statuses}"
+  boardJson = seededBoard(9, 9, 10, 0).toJSON()
+  for timeoutMillis in (True, 0, 1.5, "100"):
+    response = handle_solve({**boardJson, "timeoutMillis": timeoutMillis})
+    assert response["statusCode"] == 400, f"/solve accepted timeoutMillis {timeoutMillis!r}"
+  assert handle_solve({"width": 9})["statusCode"] == 400, "/solve accepted an invalid board"
+
+class FakeContext:
+  def __init__(self, remainingMillis: int):
+    self.remainingMillis = remainingMillis
+
+  def get_remaining_time_in_millis(self) -> int:
+    return self.remainingMillis
+
+def checkHintBatchHandler():
+  hintCache.hints.clear()
+  boards = [seededBoard(9, 9, 10, seed) for seed in range(3)]
+  boardsJson = [boards[0].toJSON(), {"width": 9}, {**boards[1].toCompactJSON(), "encoding": "compact"}, boards[2].toJSON()]
+  response = handle_hint_batch({"boards": boardsJson, "timeoutMillis": 1000})
+  assert response["statusCode"] == 200, "/hint/batch failed"
+  results = json.loads(response["body"])["results"]
+  assert len(results) == 4, "/hint/batch did not answer every board"
+  assert results[1] == {"message": "Invalid board format"}, "/hint/batch accepted an invalid board"
+  for result, board in zip([results[0], results[2], results[3]], boards):
+    expected = json.loads(json.dumps(get_hint(board)))
+    assert result == expected, "/hint/batch returned a different hint than /hint"
+  response = handle_hint_batch(boardsJson, FakeContext(RESPONSE_MARGIN_MILLIS))
+  results = json.loads(response["body"])["results"]
+  assert response["statusCode"] == 200 and len(results) == 4, "/hint/batch dropped boards when out of time"
+  assert all(result["message"] == "Timed out before this board was reached" for result in results), "/hint/batch kept solving past its deadline"
+  for body in ({"boards": boardsJson, "timeoutMillis": True}, {"boards": boardsJson, "timeoutMillis": 0}, {"boards": "nope"}):
+    assert handle_hint_batch(body)["statusCode"] == 400, f"/hint/batch accepted {body!r}"
+  hintCache.hints.clear()
+
+def checkSeededGeneration():
+  first = generateBoundedBoard(16, 16, 40, (8, 8), seed=1234)
+  random.random() # seeded generation must not depend on the global random state
+  second = generateBoundedBoard(16, 16, 40, (8, 8), seed=1234)
+  assert first.noGuess and second.noGuess, "seeded generation did not finish"
+  assert first.board.minePlane == second.board.minePlane, "the same seed generated different boards"
+  other = generateBoundedBoard(16, 16, 40, (8, 8), seed=4321)
+  assert other.board.minePlane != first.board.minePlane, "different seeds generated the same board"
+  seededBoardCache.boards.clear()
+  board, generation = getSeededBoard(16, 16, 40, (8, 8), 1234)
+  assert not generation["cached"] and board.minePlane == first.board.minePlane, "getSeededBoard generated a different board"
+  cachedBoard, generation = getSeededBoard(16, 16, 40, (8, 8), 1234)
+  assert generation["cached"] and generation["noGuess"], "a seeded board was not served from the cache"
+  assert samePosition(board, cachedBoard), "the cached seeded board differs from the generated one"
+  seededBoardCache.boards.clear()
+
+def isNoGuessBoard(board: Board) -> bool:
+  session = SolverSession(board.copy())
+  playSession(session)
+  return session.board.isSolved()
+
+def checkGenerationBounds():
+  outOfIterations = False
+  for seed in range(10): # 71 mines leave the 9x9 board no room to repair a layout
+    result = generateBoundedBoard(9, 9, 71, (4, 4), maxIterations=1, seed=seed)
+    assert result.iterations <= 1, f"seed {seed}: went past maxIterations"
+    assert result.noGuess or result.iterations == 1, f"seed {seed}: gave up before its iterations ran out"
+    assert not result.noGuess or isNoGuessBoard(result.board), f"seed {seed}: reported no-guess on a board that needs a guess"
+    outOfIterations = outOfIterations or not result.noGuess
+  assert outOfIterations, "no dense board ran out of iterations"
+  maxMillis = 50
+  for seed in range(3):
+    startTime = time.perf_counter()
+    result = generateBoundedBoard(30, 16, 170, (15, 8), maxMillis=maxMillis, seed=seed)
+    elapsedMillis = (time.perf_counter() - startTime) * 1000
+    assert elapsedMillis < maxMillis + 150, f"seed {seed}: took {elapsedMillis:.0f} ms with a {maxMillis} ms budget"
+    assert result.noGuess or result.elapsedMillis >= maxMillis, f"seed {seed}: gave up before its time ran out"
+    assert not result.noGuess or isNoGuessBoard(result.board), f"seed {seed}: reported no-guess on a board that needs a guess"
+  for seed in range(3):
+    result = generateBoundedBoard(16, 16, 40, (8, 8), seed=seed)
+    assert result.noGuess and isNoGuessBoard(result.board), f"seed {seed}: an unbounded generation did not finish a no-guess board"
+
+def smallPosition(width: int, height: int, mines: int, seed: int) -> Board:
+  rng = random.Random(seed)
+  minePlane = bytearray(width * height)
+  for index in rng.sample(range(width * height), mines):
+    minePlane[index] = 1
+  visiblePlane = bytearray(0 if mine or rng.random() < 0.6 else 1 for mine in minePlane)
+  flagPlane = bytearray(1 if mine and rng.random() < 0.3 else 0 for mine in minePlane)
+  return Board(width=width, height=height, mines=mines, startLocation=(0, 0), minePlane=minePlane, visiblePlane=visiblePlane, flagPlane=flagPlane)
+
+def bruteForceProbabilities(board: Board) -> tuple[list[float], bool]:
+  """
+  Enumerate every mine layout that agrees with the revealed numbers, the flags and the mine count.
+  Returns the mine probability of every cell, and whether the interior weighting matters: the frontier solutions use
+  different numbers of mines while some hidden cells touch no number.
+  """
+  def neighbors(index: int) -> list[int]:
+    x, y = index % board.width, index // board.width
+    return [(y + dy) * board.width + x + dx for dx, dy in NEIGHBOR_OFFSETS if 0 <= x + dx < board.width and 0 <= y + dy < board.height]
+  hidden = [index for index in range(board.size) if not board.visiblePlane[index] and not board.flagPlane[index]]
+  numbers = [index for index in range(board.size) if board.visiblePlane[index]]
+  frontier = {cell for index in numbers for cell in neighbors(index) if cell in hidden}
+  mineTotals = [0] * board.size
+  layouts = 0
+  frontierMineCounts = set()
+  for mines in combinations(hidden, board.mines - board.flagPlane.count(1)):
+    layout = board.flagPlane.copy()
+    for cell in mines:
+      layout[cell] = 1
+    if all(sum(layout[cell] for cell in neighbors(index)) == board.mineCounts[index] for index in numbers):
+      layouts += 1
+      frontierMineCounts.add(len(frontier.intersection(mines)))
+      for index in range(board.size):
+        mineTotals[index] += layout[index]
+  return [total / layouts for total in mineTotals], len(frontierMineCounts) > 1 and len(frontier) < len(hidden)
+
+def checkMineProbabilities():
+  interiorMatters = False
+  for seed in range(40):
+    board = smallPosition(4, 4, 4 + seed % 4, seed)
+    expected, weighted = bruteForceProbabilities(board)
+    probabilities = probability.getMineProbabilities(board)
+    assert probabilities is not None, f"seed {seed}: no probabilities for a consistent board"
+    for index, value in enumerate(expected):
+      actual = probabilities[index // board.width][index % board.width]
+      assert abs(actual - value) < 1e-9, f"seed {seed}: cell {index} has probability {actual}, expected {value}"
+    interiorMatters = interiorMatters or weighted
+  assert interiorMatters, "no board needed the interior weighting"
+  board = smallPosition(4, 4, 5, 0)
+  maxSolutions = probability.MAX_SOLUTIONS
+  probability.componentCache.clear()
+  probability.MAX_SOLUTIONS = 1
+  try:
+    assert probability.getMineProbabilities(board) is None, "a component with too many solutions was enumerated"
+  finally:
+    probability.MAX_SOLUTIONS = maxSolutions
+    probability.componentCache.clear()
+
+checks = [
+  checkSessionMatchesStateless,
+  checkSessionRestore,
+  checkSessionMarkChanged,
+  checkCompactRoundTrip,
+  checkCompactErrors,
+  checkBinaryRoundTrip,
+  checkBinaryErrors,
+  checkBoardFromBytes,
+  checkCanonicalKeySymmetry,
+  checkCachedHintLocations,
+  checkSolveHandler,
+  checkHintBatchHandler,
+  checkSeededGeneration,
+  checkGenerationBounds,
+  checkMineProbabilities
+]
+
+for check in checks:
+  print(f"-------- {check.__name__} --------")
+  try:
+    check()
+    print("Success!")
+  except Exception as e:
+    print(f"Error: {e}")
+    allTestsPassed = False
+
 if allTestsPassed:
   print("All tests passed!")
 else:
@@ -0,0 +1,109 @@
+from Board import NEIGHBOR_OFFSETS
+from profiling import profiledLookup
+
+# Hint templates a local pattern resolves to. The solver rule of the same name turns a template into its Move and hint.
+NO_MOVE = 0
+FLAG_REMAINING = 1 # getFlagRemainingNeighbors
+REVEAL_REMAINING = 2 # getExpandCell
+INTERSECT_FLAG = 3 # getIntersectCells, flagging the cells unique to the bigger number
+INTERSECT_REVEAL = 4 # getIntersectCells, revealing the cells unique to the bigger number
+UNRESOLVED = 255 # outside the tables (e.g. a number with too many flags): ask the general rules
+
+# offsets (dx, dy) of the cells within a 5x5 window that come after its center in row-major order
+PAIR_OFFSETS = [(dx, dy) for dy in range(0, 3) for dx in range(-2, 3) if dy > 0 or dx > 0]
+# offsets (dx, dy) of every other cell within a 5x5 window
+WINDOW_OFFSETS = [(dx, dy) for dy in range(-2, 3) for dx in range(-2, 3) if dx != 0 or dy != 0]
+
+# A neighborhood code has bit k set when the neighbor at NEIGHBOR_OFFSETS[k] is hidden and unflagged (see
+# Board.neighborCodes). Flagged and off-board neighbors are unset; flags enter the tables through the remaining mine
+# count of the number instead.
+CODE_COUNTS = bytes(code.bit_count() for code in range(256))
+
+def buildSingleTable() -> bytes:
+  """
+  Build the table of single-number patterns, indexed by remaining mines * 256 + neighborhood code.
+  """
+  table = bytearray(9 * 256)
+  for remaining in range(9):
+    for code in range(1, 256):
+      if remaining == CODE_COUNTS[code]:
+        table[remaining * 256 + code] = FLAG_REMAINING
+      elif remaining == 0:
+        table[remaining * 256 + code] = REVEAL_REMAINING
+  return bytes(table)
+
+def buildUniqueCounts(offsets: list[tuple[int, int]]) -> tuple[list[bytes], list[bytes]]:
+  """
+  For two numbers an offset apart, count the hidden neighbors of each one that the other does not share.
+  Cells in both neighborhoods are the same cells, so they are hidden in both codes or in neither: the counts only
+  depend on the offset and on one code.
+  Returns:
+    tuple[list[bytes], list[bytes]]: By offset and then by code, the unique count of the first and of the second number.
+  """
+  firstCounts, secondCounts = [], []
+  for dx, dy in offsets:
+    firstUnique = sum(1 << bit for bit, (x, y) in enumerate(NEIGHBOR_OFFSETS) if (x - dx, y - dy) not in NEIGHBOR_OFFSETS)
+    secondUnique = sum(1 << bit for bit, (x, y) in enumerate(NEIGHBOR_OFFSETS) if (x + dx, y + dy) not in NEIGHBOR_OFFSETS)
+    firstCounts.append(bytes(CODE_COUNTS[code & firstUnique] for code in range(256)))
+    secondCounts.append(bytes(CODE_COUNTS[code & secondUnique] for code in range(256)))
+  return firstCounts, secondCounts
+
+def buildPairTable() -> bytes:
+  """
+  Build the table of two-number patterns, indexed by ((remaining1 * 9 + remaining2) * 9 + unique1) * 9 + unique2.
+  It follows getIntersectCells: the number with more hidden neighbors is the bigger one (the second on a tie), and only
+  the mine counts and the sizes of the two set differences decide whether the pair forces a move.
+  """
+  table = bytearray(9 ** 4)
+  for remaining1 in range(1, 9):
+    for remaining2 in range(1, 9):
+      for unique1 in range(9):
+        for unique2 in range(9):
+          if unique1 > unique2:
+            mineDifference, biggerUnique, smallerUnique = remaining1 - remaining2, unique1, unique2
+          else:
+            mineDifference, biggerUnique, smallerUnique = remaining2 - remaining1, unique2, unique1
+          template = NO_MOVE
+          if biggerUnique > 0 and mineDifference == biggerUnique:
+            template = INTERSECT_FLAG
+          elif biggerUnique > 0 and mineDifference == 0 and smallerUnique == 0:
+            template = INTERSECT_REVEAL
+          table[((remaining1 * 9 + remaining2) * 9 + unique1) * 9 + unique2] = template
+  return bytes(table)
+
+SINGLE_PATTERNS = buildSingleTable()
+PAIR_PATTERNS = buildPairTable()
+FIRST_UNIQUE_COUNTS, SECOND_UNIQUE_COUNTS = buildUniqueCounts(PAIR_OFFSETS)
+# per window offset: (dx, dy, index of the pair's offset in PAIR_OFFSETS, whether the center comes first in the pair)
+WINDOW_PAIRS = [(dx, dy, PAIR_OFFSETS.index((dx, dy)), True) if (dx, dy) in PAIR_OFFSETS else (dx, dy, PAIR_OFFSETS.index((-dx, -dy)), False) for dx, dy in WINDOW_OFFSETS]
+
+@profiledLookup
+def singleTemplate(remaining: int, code: int) -> int:
+  """
+  Look up what a number can deduce on its own.
+  Args:
+    remaining (int): The number minus its flagged neighbors.
+    code (int): The neighborhood code of its hidden, unflagged neighbors.
+  Returns:
+    int: The hint template of the move it forces, NO_MOVE, or UNRESOLVED.
+  """
+  if 0 <= remaining <= 8:
+    return SINGLE_PATTERNS[remaining * 256 + code]
+  return UNRESOLVED
+
+@profiledLookup
+def pairTemplate(offset: int, remaining1: int, code1: int, remaining2: int, code2: int) -> int:
+  """
+  Look up what two numbers within a 5x5 window can deduce together.
+  Args:
+    offset (int): The index in PAIR_OFFSETS of the offset from the first number to the second.
+    remaining1 (int): The first number minus its flagged neighbors.
+    code1 (int): The neighborhood code of the first number.
+    remaining2 (int): The second number minus its flagged neighbors.
+    code2 (int): The neighborhood code of the second number.
+  Returns:
+    int: The hint template of the move they force, NO_MOVE, or UNRESOLVED.
+  """
+  if 0 <= remaining1 <= 8 and 0 <= remaining2 <= 8:
+    return PAIR_PATTERNS[((remaining1 * 9 + remaining2) * 9 + FIRST_UNIQUE_COUNTS[offset][code1]) * 9 + SECOND_UNIQUE_COUNTS[offset][code2]]
+  return UNRESOLVED
@@ -0,0 +1,274 @@
+import os
+import json
+import threading
+from collections import deque, OrderedDict
+from Board import Board
+from generate import generateBoard2, generateBoundedBoard
+from solver import SolverSession
+from shared import get_redis_connection, getSymmetries, transformLocation
+
+# Where pooled and seeded boards are kept: "local" (this process only) or "redis" (shared by every instance)
+POOL_BACKEND = os.environ.get("BOARD_POOL_BACKEND", "local")
+# Number of boards kept ready for each (width, height, mines)
+POOL_TARGET_SIZE = int(os.environ.get("BOARD_POOL_TARGET_SIZE", "20"))
+# Number of pooled boards tried for one request before falling back to live generation
+POOL_MAX_ATTEMPTS = 8
+# Sizes kept filled by the scheduled refill: beginner, intermediate and expert
+POOL_SIZES = [(9, 9, 10), (16, 16, 40), (30, 16, 99)]
+# Number of seeded boards kept by the local seeded board cache
+SEEDED_CACHE_SIZE = int(os.environ.get("SEEDED_BOARD_CACHE_SIZE", "256"))
+# How long a seeded board is kept in Redis. Seeds come from clients, so entries must expire.
+SEEDED_CACHE_TTL_SECONDS = int(os.environ.get("SEEDED_BOARD_CACHE_TTL_SECONDS", "86400"))
+
+class PooledBoard:
+  def __init__(self, minePlane: bytearray, startLocation: tuple[int, int]):
+    """
+    Initialize a PooledBoard.
+    A pooled board is a mine layout that the solver can finish without guessing from its start location.
+    Args:
+      minePlane (bytearray): The mine plane of the board.
+      startLocation (tuple[int, int]): The start location the board was generated for.
+    """
+    self.minePlane = minePlane
+    self.startLocation = startLocation
+
+  def toJSON(self) -> str:
+    return json.dumps({"minePlane": self.minePlane.hex(), "startLocation": self.startLocation})
+
+  @staticmethod
+  def fromJSON(value: str | bytes) -> 'PooledBoard':
+    data = json.loads(value)
+    return PooledBoard(bytearray.fromhex(data["minePlane"]), tuple(data["startLocation"]))
+
+class LocalBoardStore:
+  def __init__(self):
+    """
+    Initialize a LocalBoardStore, which keeps pooled boards in memory. Boards survive between requests served by the same
+    process, e.g. a warm Lambda container.
+    """
+    self.boards: dict[tuple[int, int, int], deque[PooledBoard]] = {}
+    self.lock = threading.Lock()
+
+  def size(self, key: tuple[int, int, int]) -> int:
+    with self.lock:
+      return len(self.boards.get(key, ()))
+
+  def push(self, key: tuple[int, int, int], board: PooledBoard):
+    with self.lock:
+      self.boards.setdefault(key, deque()).append(board)
+
+  def pop(self, key: tuple[int, int, int]) -> PooledBoard:
+    with self.lock:
+      boards = self.boards.get(key)
+      return boards.popleft() if boards else None
+
+class RedisBoardStore:
+  def __init__(self):
+    """
+    Initialize a RedisBoardStore, which keeps pooled boards in a Redis list per board size so every instance shares them.
+    """
+
+  def redisKey(self, key: tuple[int, int, int]) -> str:
+    return f"boardpool-{key[0]}x{key[1]}-{key[2]}"
+
+  def size(self, key: tuple[int, int, int]) -> int:
+    return get_redis_connection().llen(self.redisKey(key))
+
+  def push(self, key: tuple[int, int, int], board: PooledBoard):
+    get_redis_connection().rpush(self.redisKey(key), board.toJSON())
+
+  def pop(self, key: tuple[int, int, int]) -> PooledBoard:
+    value = get_redis_connection().lpop(self.redisKey(key))
+    return None if value is None else PooledBoard.fromJSON(value)
+
+class LocalSeededBoardCache:
+  def __init__(self, maxSize: int = SEEDED_CACHE_SIZE):
+    """
+    Initialize a LocalSeededBoardCache, which keeps the most recently used seeded boards in memory.
+    """
+    self.boards: OrderedDict[tuple, PooledBoard] = OrderedDict()
+    self.maxSize = maxSize
+    self.lock = threading.Lock()
+
+  def get(self, key: tuple) -> PooledBoard:
+    with self.lock:
+      board = self.boards.get(key)
+      if board is not None:
+        self.boards.move_to_end(key)
+      return board
+
+  def set(self, key: tuple, board: PooledBoard):
+    with self.lock:
+      self.boards[key] = board
+      self.boards.move_to_end(key)
+      if len(self.boards) > self.maxSize:
+        self.boards.popitem(last=False)
+
+class RedisSeededBoardCache:
+  def __init__(self):
+    """
+    Initialize a RedisSeededBoardCache, which shares seeded boards between instances. A seed always generates the same
+    board, so entries never go stale, but they expire after SEEDED_CACHE_TTL_SECONDS so client seeds cannot grow Redis
+    without bound.
+    """
+
+  def redisKey(self, key: tuple) -> str:
+    width, height, mines, (startX, startY), seed = key
+    return f"seededboard-{width}x{height}-{mines}-{startX}-{startY}-{seed}"
+
+  def get(self, key: tuple) -> PooledBoard:
+    value = get_redis_connection().get(self.redisKey(key))
+    return None if value is None else PooledBoard.fromJSON(value)
+
+  def set(self, key: tuple, board: PooledBoard):
+    get_redis_connection().set(self.redisKey(key), board.toJSON(), ex=SEEDED_CACHE_TTL_SECONDS)
+
+boardStore = RedisBoardStore() if POOL_BACKEND == "redis" else LocalBoardStore()
+seededBoardCache = RedisSeededBoardCache() if POOL_BACKEND == "redis" else LocalSeededBoardCache()
+refillingKeys: set[tuple[int, int, int]] = set()
+refillLock = threading.Lock()
+
+def transformPlane(plane: bytearray, width: int, height: int, symmetry: tuple[bool, bool, bool]) -> bytearray:
+  transformed = bytearray(width * height)
+  for index in range(width * height):
+    x, y = transformLocation((index % width, index // width), width, height, symmetry)
+    transformed[y * width + x] = plane[index]
+  return transformed
+
+def isSolvableFrom(board: Board) -> bool:
+  """
+  Check that the solver can finish a board from its start location without guessing.
+  Args:
+    board (Board): A board with only its start area revealed. It is left unchanged.
+  """
+  session = SolverSession(board.copy())
+  move = session.getNextMove()
+  while move is not None:
+    session.applyMove(move)
+    move = session.getNextMove()
+  return session.board.isSolved()
+
+def fitPooledBoard(pooledBoard: PooledBoard, width: int, height: int, mines: int, startLocation: tuple[int, int]) -> Board:
+  """
+  Try to serve a pooled board for a requested start location.
+  The pooled layout is mirrored (and on square boards transposed) so that its own start lands on the requested one if
+  possible. Other orientations are accepted when the requested start has no mines around it and the solver can still
+  finish the board from there.
+  Returns:
+    Board: The board with its start area revealed, or None if no orientation fits.
+  """
+  startX, startY = startLocation
+  symmetries = getSymmetries(width, height)
+  # orientations that move the pooled start exactly onto the requested start need no solver check
+  symmetries.sort(key=lambda symmetry: transformLocation(pooledBoard.startLocation, width, height, symmetry) != startLocation)
+  for symmetry in symmetries:
+    minePlane = transformPlane(pooledBoard.minePlane, width, height, symmetry)
+    board = Board(width=width, height=height, mines=mines, startLocation=startLocation, minePlane=minePlane)
+    startIndex = startY * width + startX
+    if minePlane[startIndex] or board.mineCounts[startIndex]:
+      continue
+    board.reveal(startIndex)
+    if transformLocation(pooledBoard.startLocation, width, height, symmetry) == startLocation or isSolvableFrom(board):
+      return board
+  return None
+
+def takePooledBoard(width: int, height: int, mines: int, startLocation: tuple[int, int]) -> Board:
+  """
+  Take a board from the pool that can be solved without guessing from the requested start location.
+  Pooled boards that do not fit the start location are put back for later requests.
+  Returns:
+    Board: The board with its start area revealed, or None if the pool has no fitting board or the start location is
+      out of bounds.
+  """
+  if not (0 <= startLocation[0] < width and 0 <= startLocation[1] < height):
+    return None
+  key = (width, height, mines)
+  unfit: list[PooledBoard] = []
+  board = None
+  for _ in range(POOL_MAX_ATTEMPTS):
+    pooledBoard = boardStore.pop(key)
+    if pooledBoard is None:
+      break
+    board = fitPooledBoard(pooledBoard, width, height, mines, startLocation)
+    if board is not None:
+      break
+    unfit.append(pooledBoard)
+  for pooledBoard in unfit:
+    boardStore.push(key, pooledBoard)
+  return board
+
+def getSeededBoard(width: int, height: int, mines: int, startLocation: tuple[int, int], seed: int, maxMillis: float = None) -> tuple[Board, dict]:
+  """
+  Get the board a seed generates, from the seeded board cache if it was generated before.
+  Seeded boards are generated in this process, since racing parallel attempts would make the result depend on which
+  attempt finishes first. Only no-guess boards are cached, so a board cut short by maxMillis is generated again next time.
+  Args:
+    startLocation (tuple[int, int]): The starting location on the board.
+    seed (int): The seed for every random choice made while generating.
+    maxMillis (float): How long generation may take, in milliseconds. Defaults to no limit.
+  Returns:
+    tuple[Board, dict]: The board with its start area revealed, and how it was generated.
+  Raises:
+    ValueError: If the start location is out of bounds.
+  """
+  key = (width, height, mines, startLocation, seed)
+  cachedBoard = seededBoardCache.get(key)
+  if cachedBoard is not None:
+    board = Board(width=width, height=height, mines=mines, startLocation=startLocation, minePlane=cachedBoard.minePlane)
+    board.reveal(startLocation[1] * width + startLocation[0])
+    return board, {"noGuess": True, "pooled": False, "cached": True, "seed": seed}
+  result = generateBoundedBoard(width, height, mines, startLocation, maxMillis=maxMillis, seed=seed)
+  if result.noGuess:
+    seededBoardCache.set(key, PooledBoard(result.board.minePlane, startLocation))
+  return result.board, {**result.toJSON(), "pooled": False, "cached": False, "seed": seed}
+
+def generatePooledBoard(width: int, height: int, mines: int) -> PooledBoard:
+  """
+  Generate a board for the pool. Boards are generated from the center, which leaves the most room for other start
+  locations to fit once the board is mirrored.
+  """
+  startLocation = (width // 2, height // 2)
+  board = generateBoard2(width, height, mines, startLocation)
+  return PooledBoard(board.minePlane, startLocation)
+
+def refillPool(width: int, height: int, mines: int, targetSize: int = POOL_TARGET_SIZE):
+  """
+  Generate boards until the pool for a board size holds targetSize boards.
+  """
+  key = (width, height, mines)
+  while boardStore.size(key) < targetSize:
+    boardStore.push(key, generatePooledBoard(width, height, mines))
+
+def schedulePoolRefill(width: int, height: int, mines: int):
+  """
+  Refill the pool for a board size on a background thread, unless a refill for that size is already running.
+  Only the sizes in POOL_SIZES are pooled. Custom sizes are generated when requested, so clients cannot start a thread
+  and a pool per size they ask for.
+  """
+  key = (width, height, mines)
+  if key not in POOL_SIZES:
+    return
+  with refillLock:
+    if key in refillingKeys:
+      return
+    refillingKeys.add(key)
+  def refill():
+    try:
+      refillPool(width, height, mines)
+    except Exception as e:
+      print(f"Could not refill board pool for {key}: {e}")
+    finally:
+      with refillLock:
+        refillingKeys.discard(key)
+  threading.Thread(target=refill, daemon=True).start()
+
+def handler(event: dict, context: dict) -> dict:
+  """
+  Scheduled entry point that keeps the pool filled for the common board sizes.
+  Only useful with the Redis backend, since a local pool belongs to a single process.
+  """
+  if POOL_BACKEND != "redis":
+    return {"message": "Board pool is local to each instance, nothing to refill"}
+  for width, height, mines in POOL_SIZES:
+    refillPool(width, height, mines)
+  return {"message": "Board pool refilled"}
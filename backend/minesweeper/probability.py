@@ -0,0 +1,244 @@
+import random
+import threading
+from collections import OrderedDict
+from math import comb
+from Board import Board
+from constraints import Component, MINE, getFrontierConstraints, splitComponents
+
+# Components with more solutions than this are not enumerated, so a single request cannot run away.
+MAX_SOLUTIONS = 100000
+# Number of enumerated components kept between requests. Hint requests on the same game share most of their frontier.
+CACHE_SIZE = 1024
+
+class SolutionCounts:
+  def __init__(self, cells: list[int], solutionCounts: dict[int, int], cellMineCounts: dict[int, list[int]]):
+    """
+    Initialize SolutionCounts.
+    This holds the solutions of an independent group of cells, grouped by how many mines they place.
+    Args:
+      cells (list[int]): The flat indexes of the cells.
+      solutionCounts (dict[int, int]): For each number of mines, how many solutions place that many.
+      cellMineCounts (dict[int, list[int]]): For each number of mines, how many of those solutions put a mine on each cell.
+    """
+    self.cells = cells
+    self.solutionCounts = solutionCounts
+    self.cellMineCounts = cellMineCounts
+
+componentCache: OrderedDict[tuple, SolutionCounts] = OrderedDict()
+componentCacheLock = threading.Lock() # hint requests and pool refills may count solutions at the same time
+
+def countSolutions(component: Component, deadline: float = None) -> SolutionCounts:
+  """
+  Enumerate the solutions of a component, reusing a previous result for an identical component.
+  Args:
+    component (Component): The component to enumerate.
+    deadline (float): A time.perf_counter() value after which the enumeration gives up. Defaults to no limit.
+  Returns:
+    SolutionCounts: The solutions grouped by mine count, or None if the component has more than MAX_SOLUTIONS solutions.
+  Raises:
+    ValueError: If the component has no solution.
+    TimeoutError: If the deadline passes before the enumeration is done.
+  """
+  key = tuple((constraint.cells, constraint.mines) for constraint in component.constraints)
+  with componentCacheLock:
+    cached = componentCache.get(key)
+    if cached is not None:
+      componentCache.move_to_end(key)
+      return cached
+  solutionCounts: dict[int, int] = {}
+  cellMineCounts: dict[int, list[int]] = {}
+  numSolutions = 0
+  for solution in component.iterateSolutions(deadline=deadline):
+    numSolutions += 1
+    if numSolutions > MAX_SOLUTIONS:
+      return None
+    mines = solution.count(MINE)
+    solutionCounts[mines] = solutionCounts.get(mines, 0) + 1
+    counts = cellMineCounts.get(mines)
+    if counts is None:
+      counts = [0] * len(component.cells)
+      cellMineCounts[mines] = counts
+    for variable, value in enumerate(solution):
+      if value == MINE:
+        counts[variable] += 1
+  if numSolutions == 0:
+    raise ValueError("The revealed numbers cannot all be satisfied")
+  result = SolutionCounts(component.cells, solutionCounts, cellMineCounts)
+  with componentCacheLock:
+    componentCache[key] = result
+    componentCache.move_to_end(key)
+    if len(componentCache) > CACHE_SIZE:
+      componentCache.popitem(last=False)
+  return result
+
+def convolve(first: dict[int, int], second: dict[int, int]) -> dict[int, int]:
+  """
+  Combine two independent solution counts by mine count.
+  Args:
+    first (dict[int, int]): Solutions by mine count.
+    second (dict[int, int]): Solutions by mine count.
+  Returns:
+    dict[int, int]: The number of ways to pick one solution of each, by total mine count.
+  """
+  combined: dict[int, int] = {}
+  for mines1, count1 in first.items():
+    for mines2, count2 in second.items():
+      combined[mines1 + mines2] = combined.get(mines1 + mines2, 0) + count1 * count2
+  return combined
+
+def collectSolutionGroups(board: Board, deadline: float = None) -> tuple[list[tuple[Component, SolutionCounts]], dict[int, int], list[int]]:
+  """
+  Split the frontier into independent components and count the solutions of each one by mine count.
+  Args:
+    board (Board): The Minesweeper board.
+    deadline (float): A time.perf_counter() value after which the counting gives up. Defaults to no limit.
+  Returns:
+    tuple: Every component that needs a search with its solution counts, the value (SAFE or MINE) of every frontier cell
+      that propagation alone fixes, and the flat indexes of the hidden, unflagged cells away from the frontier.
+      None if a component is too large to enumerate or the revealed numbers cannot all be satisfied.
+  Raises:
+    TimeoutError: If the deadline passes before the counting is done.
+  """
+  groups: list[tuple[Component, SolutionCounts]] = []
+  fixedCells: dict[int, int] = {}
+  frontierCells: set[int] = set()
+  try:
+    for component in splitComponents(getFrontierConstraints(board)):
+      frontierCells.update(component.cells)
+      simplified = component.simplify()
+      if simplified is None:
+        return None
+      componentFixedCells, subComponents = simplified
+      fixedCells.update(componentFixedCells)
+      for subComponent in subComponents:
+        counts = countSolutions(subComponent, deadline)
+        if counts is None:
+          return None
+        groups.append((subComponent, counts))
+  except ValueError:
+    return None
+  interiorCells = [index for index in range(board.size) if not board.visiblePlane[index] and not board.flagPlane[index] and index not in frontierCells]
+  return groups, fixedCells, interiorCells
+
+def getMineProbabilities(board: Board, deadline: float = None) -> list[list[float]]:
+  """
+  Compute the exact chance that each cell holds a mine, given the revealed numbers, the flags, and the total mine count.
+  Every frontier component is enumerated on its own and its solutions are grouped by how many mines they use. A
+  combination of component solutions using K mines leaves the remaining mines for the unconstrained interior cells, which
+  can hold them in comb(interior, remaining - K) ways, so each combination is weighted by that binomial coefficient.
+  Args:
+    board (Board): The Minesweeper board.
+    deadline (float): A time.perf_counter() value after which the computation gives up. Defaults to no limit.
+  Returns:
+    list[list[float]]: The mine probability of every cell, indexed [y][x]. Visible cells are 0 and flagged cells are 1.
+      None if a component is too large to enumerate or the revealed numbers cannot all be satisfied.
+  Raises:
+    TimeoutError: If the deadline passes before the computation is done.
+  """
+  remainingMines = board.getRemainingMineCount()
+  probabilities = [0.0] * board.size
+  for index in board.planeIndexes(board.flagPlane):
+    probabilities[index] = 1.0
+  collected = collectSolutionGroups(board, deadline)
+  if collected is None:
+    return None
+  solutionGroups, fixedCells, interiorCells = collected
+  groups = [counts for _, counts in solutionGroups]
+  for cell, value in fixedCells.items():
+    probabilities[cell] = float(value)
+  fixedMines = sum(fixedCells.values())
+  numInterior = len(interiorCells)
+  # prefix[i] and suffix[i] combine the groups before and from i, so every group can be paired with all of the others
+  prefix = [{0: 1}]
+  for group in groups:
+    prefix.append(convolve(prefix[-1], group.solutionCounts))
+  suffix = [{0: 1}]
+  for group in reversed(groups):
+    suffix.append(convolve(suffix[-1], group.solutionCounts))
+  suffix.reverse()
+  def interiorWays(frontierMines: int) -> int:
+    interiorMines = remainingMines - fixedMines - frontierMines
+    return comb(numInterior, interiorMines) if 0 <= interiorMines <= numInterior else 0
+  total = sum(count * interiorWays(mines) for mines, count in prefix[-1].items())
+  if total == 0:
+    return None
+  for groupIndex, group in enumerate(groups):
+    others = convolve(prefix[groupIndex], suffix[groupIndex + 1])
+    cellWeights = [0] * len(group.cells)
+    for mines, counts in group.cellMineCounts.items():
+      weight = sum(count * interiorWays(mines + otherMines) for otherMines, count in others.items())
+      for variable, count in enumerate(counts):
+        cellWeights[variable] += count * weight
+    for variable, cell in enumerate(group.cells):
+      probabilities[cell] = cellWeights[variable] / total
+  if numInterior > 0:
+    interiorWeight = 0
+    for mines, count in prefix[-1].items():
+      interiorMines = remainingMines - fixedMines - mines
+      if 1 <= interiorMines <= numInterior:
+        interiorWeight += count * comb(numInterior - 1, interiorMines - 1)
+    for index in interiorCells:
+      probabilities[index] = interiorWeight / total
+  return [probabilities[y * board.width:(y + 1) * board.width] for y in range(board.height)]
+
+def pickWeighted(weights: dict[int, int], rng: random.Random) -> int:
+  """
+  Pick a key of weights with probability proportional to its (integer) weight.
+  """
+  target = rng.randrange(sum(weights.values()))
+  for key, weight in weights.items():
+    if target < weight:
+      return key
+    target -= weight
+
+def sampleConsistentLayout(board: Board, rng: random.Random = None, deadline: float = None) -> bytearray:
+  """
+  Draw a mine layout uniformly among all layouts that agree with the revealed numbers, the flags, and the mine count.
+  The number of mines on the frontier is drawn first, weighted like in getMineProbabilities. Going through the
+  components one by one, each one's mine count is then drawn in proportion to its solutions with that count times the
+  ways the components before it can hold the rest, and one of those solutions is picked uniformly. The interior mines
+  are spread uniformly over the interior cells.
+  Args:
+    board (Board): The Minesweeper board. Flagged cells are taken to be mines.
+    rng (random.Random): The random generator to draw from. Defaults to the global random state.
+    deadline (float): A time.perf_counter() value after which the sampling gives up. Defaults to no limit.
+  Returns:
+    bytearray: The new mine plane. Visible cells hold no mine and flagged cells hold one.
+      None if a component is too large to enumerate or the revealed numbers cannot all be satisfied.
+  Raises:
+    TimeoutError: If the deadline passes before the sampling is done.
+  """
+  rng = rng or random
+  collected = collectSolutionGroups(board, deadline)
+  if collected is None:
+    return None
+  solutionGroups, fixedCells, interiorCells = collected
+  remainingMines = board.getRemainingMineCount() - sum(fixedCells.values())
+  prefix = [{0: 1}]
+  for _, counts in solutionGroups:
+    prefix.append(convolve(prefix[-1], counts.solutionCounts))
+  frontierWeights = {mines: count * comb(len(interiorCells), remainingMines - mines) for mines, count in prefix[-1].items() if 0 <= remainingMines - mines <= len(interiorCells)}
+  if sum(frontierWeights.values()) == 0:
+    return None
+  frontierMines = pickWeighted(frontierWeights, rng)
+  interiorMines = remainingMines - frontierMines
+  minePlane = board.flagPlane.copy()
+  for cell, value in fixedCells.items():
+    minePlane[cell] = value
+  for groupIndex in reversed(range(len(solutionGroups))):
+    component, counts = solutionGroups[groupIndex]
+    mineWeights = {mines: count * prefix[groupIndex].get(frontierMines - mines, 0) for mines, count in counts.solutionCounts.items()}
+    mines = pickWeighted({mines: weight for mines, weight in mineWeights.items() if weight > 0}, rng)
+    frontierMines -= mines
+    skip = rng.randrange(counts.solutionCounts[mines])
+    for solution in component.iterateSolutions(deadline=deadline):
+      if solution.count(MINE) != mines:
+        continue
+      if skip == 0:
+        for variable, value in enumerate(solution):
+          minePlane[component.cells[variable]] = value
+        break
+      skip -= 1
+  for index in rng.sample(interiorCells, interiorMines):
+    minePlane[index] = 1
+  return minePlane
@@ -0,0 +1,111 @@
+import os
+import time
+import functools
+import threading
+
+# Set SOLVER_PROFILING=true to count and time the solver rules and generation events.
+# It is read once at import: with profiling off, the rules are not wrapped at all and cost nothing extra.
+PROFILING_ENABLED = os.environ.get("SOLVER_PROFILING", "false").lower() == "true"
+
+class RuleStats:
+  def __init__(self):
+    """
+    Initialize RuleStats, the counters of one solver rule.
+    """
+    self.calls = 0
+    self.hits = 0 # calls that found a move
+    self.seconds = 0.0
+
+  def toJSON(self):
+    return {
+      "calls": self.calls,
+      "hits": self.hits,
+      "hitRate": round(self.hits / self.calls, 4) if self.calls > 0 else 0.0,
+      "totalMillis": round(self.seconds * 1000, 3)
+    }
+
+class Profiler:
+  def __init__(self):
+    """
+    Initialize a Profiler, which collects per-rule counters and counts of generation events.
+    Counters of rules run in other processes (e.g. parallel generation workers) are not collected.
+    """
+    self.lock = threading.Lock()
+    self.rules: dict[str, RuleStats] = {}
+    self.events: dict[str, int] = {}
+
+  def reset(self):
+    with self.lock:
+      self.rules = {}
+      self.events = {}
+
+  def recordRule(self, name: str, hit: bool, seconds: float):
+    with self.lock:
+      stats = self.rules.get(name)
+      if stats is None:
+        stats = RuleStats()
+        self.rules[name] = stats
+      stats.calls += 1
+      stats.hits += hit
+      stats.seconds += seconds
+
+  def recordEvent(self, name: str, count: int = 1):
+    with self.lock:
+      self.events[name] = self.events.get(name, 0) + count
+
+  def toJSON(self):
+    """
+    Convert the counters to a JSON-serializable dictionary.
+    Returns:
+      dict: A dictionary with:
+        - rules (dict): calls, hits, hitRate and totalMillis of every rule that ran, by rule name. The single-cell and
+          pair rules only run once a pattern lookup has matched, so every frontier cell and pair examined is counted
+          under singleTemplate and pairTemplate, and the rules themselves mostly count hits.
+        - events (dict): How many times each generation event happened (perturbations, resamples, reshuffles, ...).
+    """
+    with self.lock:
+      return {
+        "rules": {name: stats.toJSON() for name, stats in self.rules.items()},
+        "events": dict(self.events)
+      }
+
+profiler = Profiler()
+
+def profiledRule(rule):
+  """
+  Decorate a solver rule so its calls, hits and time are recorded while profiling is enabled.
+  A call is a hit when the rule returns a move.
+  """
+  if not PROFILING_ENABLED:
+    return rule
+  name = rule.__name__
+  @functools.wraps(rule)
+  def wrapper(*args, **kwargs):
+    startTime = time.perf_counter()
+    move = rule(*args, **kwargs)
+    profiler.recordRule(name, move is not None, time.perf_counter() - startTime)
+    return move
+  return wrapper
+
+def profiledLookup(lookup):
+  """
+  Decorate a pattern table lookup so its calls, hits and time are recorded while profiling is enabled.
+  A call is a hit when the lookup finds something for a rule to do, i.e. anything but NO_MOVE (0).
+  """
+  if not PROFILING_ENABLED:
+    return lookup
+  name = lookup.__name__
+  @functools.wraps(lookup)
+  def wrapper(*args, **kwargs):
+    startTime = time.perf_counter()
+    template = lookup(*args, **kwargs)
+    profiler.recordRule(name, template != 0, time.perf_counter() - startTime)
+    return template
+  return wrapper
+
+def recordEvent(name: str, count: int = 1):
+  """
+  Count a generation event, such as a perturbation or a reshuffle, while profiling is enabled.
+  """
+  if PROFILING_ENABLED:
+    profiler.recordEvent(name, count)
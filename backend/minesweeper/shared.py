@@ -0,0 +1,65 @@
+import os
+
+# Helpers shared between modules that should not import each other: the board pool and the hint cache both map boards
+# through their symmetries, and every service that keeps data in Redis gets its client here.
+
+# (flip x, flip y, swap x and y): every way to mirror or rotate a board, starting with the identity.
+SYMMETRIES = [(flipX, flipY, swap) for swap in (False, True) for flipX in (False, True) for flipY in (False, True)]
+
+# One client per decode_responses setting, since it applies to every reply of a client. The morning routines want str
+# replies, while the board pool and the hint cache parse their values with json.loads, which reads bytes as they are.
+reusableRedisConnections = {}
+
+def get_redis_connection(decode_responses: bool = False):
+  """
+  Get the Redis client shared by this process for a reply mode, connecting on first use.
+  The connection settings are read when connecting, so they can come from an env file loaded after this module.
+  Args:
+    decode_responses (bool): Whether the client decodes replies to str. Defaults to bytes replies.
+  """
+  connection = reusableRedisConnections.get(decode_responses)
+  if connection is not None:
+    return connection
+  from redis import Redis as RedisSetup # only needed by the services that use Redis
+  connection = RedisSetup(
+    host=os.environ.get("REDIS_HOST"),
+    port=os.environ.get("REDIS_PORT"),
+    decode_responses=decode_responses,
+    username="default",
+    password=os.environ.get("REDIS_PASSWORD"),
+    db=os.environ.get("REDIS_DB")
+  )
+  reusableRedisConnections[decode_responses] = connection
+  return connection
+
+def getSymmetries(width: int, height: int) -> list[tuple[bool, bool, bool]]:
+  """
+  Get the symmetries that map a board of the given size onto itself.
+  Returns:
+    list[tuple[bool, bool, bool]]: The symmetries in SYMMETRIES that keep the board's size. Swapping x and y turns a
+      width x height board into a height x width one, so it only keeps the size of square boards.
+  """
+  return [symmetry for symmetry in SYMMETRIES if width == height or not symmetry[2]]
+
+def transformLocation(location: tuple[int, int], width: int, height: int, symmetry: tuple[bool, bool, bool]) -> tuple[int, int]:
+  x, y = location
+  flipX, flipY, swap = symmetry
+  if flipX:
+    x = width - 1 - x
+  if flipY:
+    y = height - 1 - y
+  return (y, x) if swap else (x, y)
+
+def inverseLocation(location: tuple[int, int], width: int, height: int, symmetry: tuple[bool, bool, bool]) -> tuple[int, int]:
+  """
+  Undo transformLocation: find the cell of a width x height board that a symmetry sent to location.
+  """
+  x, y = location
+  flipX, flipY, swap = symmetry
+  if swap:
+    x, y = y, x
+  if flipX:
+    x = width - 1 - x
+  if flipY:
+    y = height - 1 - y
+  return (x, y)
@@ -1,8 +1,11 @@
-import itertools
 from typing import Literal
+from collections.abc import Iterator
 from Board import Board
-from Cell import Cell
+from constraints import getFrontierConstraints, splitComponents
 from moves import Move, HintStep
+from probability import getMineProbabilities
+from profiling import profiledRule
+from patterns import PAIR_OFFSETS, WINDOW_PAIRS, NO_MOVE, FLAG_REMAINING, REVEAL_REMAINING, UNRESOLVED, singleTemplate, pairTemplate
 
 def readableNumber(num: int):
   return [
@@ -17,111 +20,118 @@ def readableNumber(num: int):
     "eight"
   ][num]
 
-def getFlagRemainingNeighbors(cell: Cell, mineCount: int, flagCount: int, neighbors: list[Cell]) -> Move:
+@profiledRule
+def getFlagRemainingNeighbors(board: Board, index: int, hiddenNeighbors: int) -> Move:
   """
   Determines if all remaining neighbors of a cell must be mines.
   Args:
-    cell (Cell): The cell to check.
-    mineCount (int): The number of mines in the cell.
-    flagCount (int): The number of flags in the cell.
-    neighbors (list[Cell]): The neighbors of the cell.
+    board (Board): The Minesweeper board.
+    index (int): The flat index of the cell to check.
+    hiddenNeighbors (int): The bitmask of the hidden, unflagged neighbors of the cell.
   Returns:
     Move: The move to place flags on the unrevealed neighbors, or None if no move is found.
   """
-  hiddenNeighbors = [neighbor for neighbor in neighbors if not neighbor.isVisible and not neighbor.isFlagged]
-  if mineCount == len(hiddenNeighbors) + flagCount and len(hiddenNeighbors) > 0:
-    neighborLocations = {neighbor.location for neighbor in hiddenNeighbors}
+  hiddenCount = hiddenNeighbors.bit_count()
+  if hiddenCount > 0 and board.mineCounts[index] == hiddenCount + board.flagCounts[index]:
+    neighborLocations = board.maskLocations(hiddenNeighbors)
     hintSteps: list[HintStep] = [
-      HintStep(f"Flag the remaining cell{'s' if len(neighborLocations) > 1 else ''}", {cell.location}, neighborLocations)
+      HintStep(f"Flag the remaining cell{'s' if len(neighborLocations) > 1 else ''}", {board.cells[index].location}, neighborLocations)
     ]
     return Move(cellsToFlag=neighborLocations, hintSteps=hintSteps)
   return None
 
-def getExpandCell(cell: Cell, mineCount: int, flagCount: int, neighbors: list[Cell]) -> Move:
+@profiledRule
+def getExpandCell(board: Board, index: int, hiddenNeighbors: int) -> Move:
   """
   Determines if all remaining neighbors of a cell are safe to reveal.
   Args:
-    cell (Cell): The cell to check.
-    mineCount (int): The number of mines in the cell.
-    flagCount (int): The number of flags in the cell.
-    neighbors (list[Cell]): The neighbors of the cell.
+    board (Board): The Minesweeper board.
+    index (int): The flat index of the cell to check.
+    hiddenNeighbors (int): The bitmask of the hidden, unflagged neighbors of the cell.
   Returns:
     Move: The move to reveal the safe neighbors, or None if no move is found.
   """
-  hiddenNeighbors = [neighbor for neighbor in neighbors if not neighbor.isVisible and not neighbor.isFlagged]
-  if mineCount == flagCount and len(hiddenNeighbors) > 0:
-    neighborLocations = {neighbor.location for neighbor in hiddenNeighbors}
+  if hiddenNeighbors and board.mineCounts[index] == board.flagCounts[index]:
+    neighborLocations = board.maskLocations(hiddenNeighbors)
     hintSteps: list[HintStep] = [
-      HintStep(f"Reveal the remaining cell{'s' if len(neighborLocations) > 1 else ''}", {cell.location}, neighborLocations)
+      HintStep(f"Reveal the remaining cell{'s' if len(neighborLocations) > 1 else ''}", {board.cells[index].location}, neighborLocations)
     ]
     return Move(cellsToReveal=neighborLocations, hintSteps=hintSteps)
   return None
 
-def getIntersectCells(cell1Location: tuple[int, int], mineCount1: int, flagCount1: int, neighbors1: list[Cell], cell2Location: tuple[int, int], mineCount2: int, flagCount2: int, neighbors2: list[Cell]) -> Move:
+@profiledRule
+def getIntersectCells(board: Board, index1: int, hiddenNeighbors1: int, index2: int, hiddenNeighbors2: int) -> Move:
   """
   Checks a pair of cells to see if the intersection of their neighbors reveals the location of mines.
+  The hidden neighbors of each cell are bitmasks, so the set math is done with &, ~ and bit_count.
   Args:
-    cell1Location (tuple[int, int]): The location of the first cell.
-    mineCount1 (int): The number of mines in the first cell.
-    flagCount1 (int): The number of flags in the first cell.
-    neighbors1 (list[Cell]): The visible neighbors of the first cell within a 5x5 grid.
-    cell2Location (tuple[int, int]): The location of the second cell.
-    mineCount2 (int): The number of mines in the second cell.
-    flagCount2 (int): The number of flags in the second cell.
-    neighbors2 (list[Cell]): The visible neighbors of the second cell within a 5x5 grid.
+    board (Board): The Minesweeper board.
+    index1 (int): The flat index of the first cell.
+    hiddenNeighbors1 (int): The bitmask of the hidden, unflagged neighbors of the first cell.
+    index2 (int): The flat index of the second cell.
+    hiddenNeighbors2 (int): The bitmask of the hidden, unflagged neighbors of the second cell.
   Returns:
     Move: The move to flag the dangerous cells and reveal the safe cells, or None if no move is found.
   """
+  mineCounts = board.mineCounts
+  flagCounts = board.flagCounts
+  mineCount1, flagCount1 = mineCounts[index1], flagCounts[index1]
+  mineCount2, flagCount2 = mineCounts[index2], flagCounts[index2]
   if mineCount1 == 0 or mineCount2 == 0:
     return None
   if mineCount1 == flagCount1 or mineCount2 == flagCount2:
     return None
   # begin the set math!
-  set1 = {neighbor for neighbor in neighbors1 if not neighbor.isFlagged and not neighbor.isVisible}
   set1MineCount = mineCount1 - flagCount1
-  set2 = {neighbor for neighbor in neighbors2 if not neighbor.isFlagged and not neighbor.isVisible}
   set2MineCount = mineCount2 - flagCount2
-  biggerCellLocation = cell1Location if len(set1) > len(set2) else cell2Location
-  smallerCellLocation = cell2Location if len(set1) > len(set2) else cell1Location
-  biggerSet, biggerSetMineCount = (set1, set1MineCount) if len(set1) > len(set2) else (set2, set2MineCount)
-  smallerSet, smallerSetMineCount = (set2, set2MineCount) if len(set1) > len(set2) else (set1, set1MineCount)
-  intersection = set1.intersection(set2)
+  firstIsBigger = hiddenNeighbors1.bit_count() > hiddenNeighbors2.bit_count()
+  biggerIndex, smallerIndex = (index1, index2) if firstIsBigger else (index2, index1)
+  biggerSet, biggerSetMineCount = (hiddenNeighbors1, set1MineCount) if firstIsBigger else (hiddenNeighbors2, set2MineCount)
+  smallerSet, smallerSetMineCount = (hiddenNeighbors2, set2MineCount) if firstIsBigger else (hiddenNeighbors1, set1MineCount)
+  intersection = hiddenNeighbors1 & hiddenNeighbors2
   mineDifference = biggerSetMineCount - smallerSetMineCount # m(A) - m(B)
-  setDifference = biggerSet - smallerSet # A - B
-  if mineDifference == len(setDifference) and len(setDifference) > 0: # m(A) - m(B) = |A - B|
+  setDifference = biggerSet & ~smallerSet # A - B
+  setDifferenceSize = setDifference.bit_count()
+  if mineDifference == setDifferenceSize and setDifferenceSize > 0: # m(A) - m(B) = |A - B|
     # m(A) - m(B) = m(A - B) - m(B - A)
     # m(A - B) will equal |A - B|, so all squares in A - B are mines
     # m(B - A) will equal zero, so all squares in B - A are safe
-    safeSet = smallerSet - biggerSet
-    dangerousSet = biggerSet - smallerSet
+    safeSet = smallerSet & ~biggerSet
+    dangerousSet = setDifference
+    cells = board.cells
+    cell1Location, cell2Location = cells[index1].location, cells[index2].location
+    biggerCellLocation, smallerCellLocation = cells[biggerIndex].location, cells[smallerIndex].location
+    smallerSetSize = smallerSet.bit_count()
     hintSteps: list[HintStep] = [
       HintStep("Check out these two cells.", {cell1Location, cell2Location}, {}),
-      HintStep(f"There {'are' if smallerSetMineCount > 1 else 'is'} only {readableNumber(smallerSetMineCount)} remaining mine{'s' if smallerSetMineCount > 1 else ''} in {'these' if len(smallerSet) > 1 else 'this'} cell{'s' if len(smallerSet) > 1 else ''}.", {smallerCellLocation}, {c.location for c in smallerSet}),
-      HintStep(f"This means there can only be {readableNumber(smallerSetMineCount)} remaining mine{'s' if smallerSetMineCount > 1 else ''} in the cell{'s' if len(intersection) > 1 else ''} shared by both these numbers.", {smallerCellLocation, biggerCellLocation}, {c.location for c in intersection}),
-      HintStep(f"That accounts for {readableNumber(smallerSetMineCount)} of the mines, leaving {readableNumber(mineDifference)} more mine{'s' if mineDifference > 1 else ''} in the cells unique to this number.", {biggerCellLocation}, {c.location for c in setDifference}),
-      HintStep(f"There {'are' if mineDifference > 1 else 'is'} only {readableNumber(mineDifference)} cell{'s' if mineDifference > 1 else ''} unique to this number, so {'these cells' if mineDifference > 1 else 'this cell'} should be flagged.", {biggerCellLocation}, {c.location for c in dangerousSet})
+      HintStep(f"There {'are' if smallerSetMineCount > 1 else 'is'} only {readableNumber(smallerSetMineCount)} remaining mine{'s' if smallerSetMineCount > 1 else ''} in {'these' if smallerSetSize > 1 else 'this'} cell{'s' if smallerSetSize > 1 else ''}.", {smallerCellLocation}, board.maskLocations(smallerSet)),
+      HintStep(f"This means there can only be {readableNumber(smallerSetMineCount)} remaining mine{'s' if smallerSetMineCount > 1 else ''} in the cell{'s' if intersection.bit_count() > 1 else ''} shared by both these numbers.", {smallerCellLocation, biggerCellLocation}, board.maskLocations(intersection)),
+      HintStep(f"That accounts for {readableNumber(smallerSetMineCount)} of the mines, leaving {readableNumber(mineDifference)} more mine{'s' if mineDifference > 1 else ''} in the cells unique to this number.", {biggerCellLocation}, board.maskLocations(setDifference)),
+      HintStep(f"There {'are' if mineDifference > 1 else 'is'} only {readableNumber(mineDifference)} cell{'s' if mineDifference > 1 else ''} unique to this number, so {'these cells' if mineDifference > 1 else 'this cell'} should be flagged.", {biggerCellLocation}, board.maskLocations(dangerousSet))
     ]
-    if len(safeSet) > 0:
-      hintSteps.append(HintStep(f"Reveal the safe cell{'s' if smallerSetMineCount > 1 else ''} unique to this number.", {smallerCellLocation}, {c.location for c in safeSet}))
-    return Move(cellsToReveal={cell.location for cell in safeSet}, cellsToFlag={cell.location for cell in dangerousSet}, hintSteps=hintSteps)
-  elif mineDifference == 0 and len(setDifference) > 0 and intersection == smallerSet:
+    if safeSet:
+      hintSteps.append(HintStep(f"Reveal the safe cell{'s' if smallerSetMineCount > 1 else ''} unique to this number.", {smallerCellLocation}, board.maskLocations(safeSet)))
+    return Move(cellsToReveal=board.maskLocations(safeSet), cellsToFlag=board.maskLocations(dangerousSet), hintSteps=hintSteps)
+  elif mineDifference == 0 and setDifferenceSize > 0 and intersection == smallerSet:
     safeSet = setDifference
-    dangerousSet = intersection
+    cells = board.cells
+    cell1Location, cell2Location = cells[index1].location, cells[index2].location
+    biggerCellLocation, smallerCellLocation = cells[biggerIndex].location, cells[smallerIndex].location
+    smallerSetSize = smallerSet.bit_count()
     hintSteps: list[HintStep] = [
       HintStep("Check out these two cells.", {cell1Location, cell2Location}, {}),
-      HintStep(f"There {'are' if smallerSetMineCount > 1 else 'is'} {readableNumber(smallerSetMineCount)} remaining mine{'s' if smallerSetMineCount > 1 else ''} in {'these' if len(smallerSet) > 1 else 'this'} cell{'s' if len(smallerSet) > 1 else ''}.", {smallerCellLocation}, {c.location for c in intersection}),
-      HintStep(f"Therefore, there are no remaining mines in {'these' if len(safeSet) > 1 else 'this'} cell{'s' if len(safeSet) > 1 else ''}.", {biggerCellLocation}, {c.location for c in safeSet}),
-      HintStep(f"Reveal the safe cell{'s' if len(safeSet) > 1 else ''} unique to this number.", {biggerCellLocation}, {c.location for c in safeSet})
+      HintStep(f"There {'are' if smallerSetMineCount > 1 else 'is'} {readableNumber(smallerSetMineCount)} remaining mine{'s' if smallerSetMineCount > 1 else ''} in {'these' if smallerSetSize > 1 else 'this'} cell{'s' if smallerSetSize > 1 else ''}.", {smallerCellLocation}, board.maskLocations(intersection)),
+      HintStep(f"Therefore, there are no remaining mines in {'these' if setDifferenceSize > 1 else 'this'} cell{'s' if setDifferenceSize > 1 else ''}.", {biggerCellLocation}, board.maskLocations(safeSet)),
+      HintStep(f"Reveal the safe cell{'s' if setDifferenceSize > 1 else ''} unique to this number.", {biggerCellLocation}, board.maskLocations(safeSet))
     ]
-    return Move(cellsToReveal={cell.location for cell in safeSet}, hintSteps=hintSteps)
+    return Move(cellsToReveal=board.maskLocations(safeSet), hintSteps=hintSteps)
   return None
 
+@profiledRule
 def getFlagRemainingMines(board: Board) -> Move:
   """
   Attempts to find a set of cells that can be flagged as mines based on the number of remaining mines on the board.
-  It starts by evaluating if the number of remaining mines is equal to the number of unrevealed cells, and if so, flags all unrevealed cells.
-  If not, it groups cells together, then tries to place the fewest flags possible to satisfy the revealed neighbors of each group.
-  If the minimum number of flags possible to fulfill all exposed neighbors is equal to the number of remaining mines, it returns the move.
+  If the number of remaining mines is equal to the number of unrevealed cells, it flags all unrevealed cells.
   Otherwise, it returns None.
   Args:
     board (Board): The Minesweeper board.
@@ -129,82 +139,74 @@ def getFlagRemainingMines(board: Board) -> Move:
     Move: The move to flag the cells, or None if no move is found.
   """
   # print("getRemainingMinesFlagMove")
-  unrevealedCells = [cell for row in board.grid for cell in row if not cell.isVisible and not cell.isFlagged]
-  flaggedCells = [cell for row in board.grid for cell in row if cell.isFlagged]
-  remainingMines = board.mines - len(flaggedCells)
-  if remainingMines > 0 and remainingMines == len(unrevealedCells):
+  hiddenPlane = board.hiddenPlane()
+  remainingMines = board.getRemainingMineCount()
+  if remainingMines > 0 and remainingMines == hiddenPlane.count(1):
+    unrevealedCells = board.maskLocations(board.planeMask(hiddenPlane))
     hintSteps: list[HintStep] = [
-      HintStep(f"Flag {'the' if remainingMines == 1 else 'all'} remaining mine{'s' if remainingMines > 1 else ''}", {}, {cell.location for cell in unrevealedCells})
+      HintStep(f"Flag {'the' if remainingMines == 1 else 'all'} remaining mine{'s' if remainingMines > 1 else ''}", {}, unrevealedCells)
     ]
-    return Move(cellsToFlag={cell.location for cell in unrevealedCells}, hintSteps=hintSteps)
-  # form cell groups
-  cellGroups: list[list[Cell]] = []
-  for i in range(len(unrevealedCells)):
-    cell = unrevealedCells[i]
-    neighbors = board.neighbors(cell)
-    group = None
-    for j in range(len(cellGroups)):
-      potentialGroup = cellGroups[j]
-      if any(neighbor.location in potentialGroup for neighbor in neighbors):
-        cellGroups[j].append(cell)
-        break
-    if group is None:
-      cellGroups.append([cell])
-  # categorize groups
-  exposedGroups: list[tuple[list[Cell],list[Cell]]] = []
-  for group in cellGroups:
-    revealedNeighbors = set()
-    for cell in group:
-      if any(neighbor.isVisible for neighbor in board.neighbors(cell)):
-        revealedNeighbors.add(cell)
-        break
-    if len(revealedNeighbors) > 0:
-      exposedGroups.append((list(revealedNeighbors), group))
-  # combine groups that share a revealed neighbor
-  for i in range(len(exposedGroups)):
-    neighbors, group = exposedGroups[i]
-    for j in range(i + 1, len(exposedGroups)):
-      neighbors2, group2 = exposedGroups[j]
-      if any(neighbor in neighbors for neighbor in neighbors2):
-        exposedGroups[i] = (neighbors.union(neighbors2), group.union(group2))
-        del exposedGroups[j]
-        break
-  # for each group, only keep cells with a revealed neighbor
-  groupsToAnalyze: list[tuple[list[Cell],list[Cell]]] = []
-  for i in range(len(exposedGroups)):
-    neighbors, group = exposedGroups[i]
-    cellsToKeep = []
-    for cell in group:
-      if any(neighbor in neighbors for neighbor in board.neighbors(cell)):
-        cellsToKeep.append(cell)
-    if len(cellsToKeep) > 15:
-      # print("getRemainingMinesFlagMove: Too many cells to analyze")
-      return None # too many cells to analyze
-    groupsToAnalyze.append((neighbors, cellsToKeep))
-  # analyze groups by trying to place the fewest flags possible to satisfy the revealed neighbors
-  allFlags: set[tuple[int, int]] = set()
-  for neighbors, group in groupsToAnalyze:
-    numFlags = 0
-    foundSolutionForGroup = False
-    while numFlags <= len(group) and not foundSolutionForGroup:
-      for flags in itertools.combinations(group, numFlags):
-        if all(board.cellMinesNum(neighbor) == board.cellFlagsNum(neighbor) for neighbor in neighbors):
-          allFlags.update({flag.location for flag in flags})
-          if foundSolutionForGroup:
-            return None # multiple solutions found
-          foundSolutionForGroup = True
-      numFlags += 1
-  
-  # see if all mines have been flagged!
-  if len(allFlags) > 0:
-    if len(allFlags) == remainingMines:
-      hintSteps: list[HintStep] = [
-        HintStep(f"There {'are' if remainingMines > 1 else 'is'} only {remainingMines} remaining mine{'s' if remainingMines > 1 else ''} left", {}, {cell.location for cell in unrevealedCells}),
-        HintStep("This is the only possible configuration", {}, {cell.location for cell in allFlags})
-      ]
-      return Move(cellsToFlag=allFlags, hintSteps=hintSteps)
+    return Move(cellsToFlag=unrevealedCells, hintSteps=hintSteps)
+  return None
+
+@profiledRule
+def getReducedCells(board: Board) -> Move:
+  """
+  Finds cells whose state follows from combining several revealed numbers as linear equations.
+  Each independent part of the frontier is row-reduced, which catches deductions that need three or more numbers at
+  once without the cost of searching every placement of the mines.
+  Args:
+    board (Board): The Minesweeper board.
+  Returns:
+    Move: The move to reveal the forced safe cells and flag the forced mines of the first component that has any, or None if no move is found.
+  """
+  def toLocations(indexes) -> set[tuple[int, int]]:
+    return {(index % board.width, index // board.width) for index in indexes}
+  for component in splitComponents(getFrontierConstraints(board)):
+    safeCells, mineCells, sources = component.reduceForcedCells()
+    if len(safeCells) == 0 and len(mineCells) == 0:
+      continue
+    hintSteps: list[HintStep] = [
+      HintStep("Compare the counts of these numbers: adding and subtracting them cancels out the cells they share.", toLocations(sources), toLocations(component.cells))
+    ]
+    if len(mineCells) > 0:
+      hintSteps.append(HintStep(f"What is left only adds up if {'these cells are mines' if len(mineCells) > 1 else 'this cell is a mine'}, so flag {'them' if len(mineCells) > 1 else 'it'}.", toLocations(sources), toLocations(mineCells)))
+    if len(safeCells) > 0:
+      hintSteps.append(HintStep(f"What is left only adds up if {'these cells are' if len(safeCells) > 1 else 'this cell is'} safe, so reveal {'them' if len(safeCells) > 1 else 'it'}.", toLocations(sources), toLocations(safeCells)))
+    return Move(cellsToReveal=toLocations(safeCells), cellsToFlag=toLocations(mineCells), hintSteps=hintSteps)
+  return None
+
+@profiledRule
+def getConstrainedCells(board: Board, deadline: float = None) -> Move:
+  """
+  Finds cells whose state is forced by the revealed numbers taken together.
+  The frontier is split into independent components, and each component is searched for cells that are safe in every
+  possible placement of its mines, or a mine in every one.
+  Args:
+    board (Board): The Minesweeper board.
+    deadline (float): A time.perf_counter() value after which the search gives up. Defaults to no limit.
+  Returns:
+    Move: The move to reveal the forced safe cells and flag the forced mines of the first component that has any, or None if no move is found.
+  Raises:
+    TimeoutError: If the deadline passes before the search is done.
+  """
+  def toLocations(indexes) -> set[tuple[int, int]]:
+    return {(index % board.width, index // board.width) for index in indexes}
+  for component in splitComponents(getFrontierConstraints(board)):
+    safeCells, mineCells = component.getForcedCells(deadline)
+    if len(safeCells) == 0 and len(mineCells) == 0:
+      continue
+    hintSteps: list[HintStep] = [
+      HintStep("Look at how these numbers share their hidden cells.", toLocations(component.sources), toLocations(component.cells))
+    ]
+    if len(mineCells) > 0:
+      hintSteps.append(HintStep(f"Every way of placing the mines around these numbers puts a mine in {'these cells' if len(mineCells) > 1 else 'this cell'}, so {'they' if len(mineCells) > 1 else 'it'} should be flagged.", {}, toLocations(mineCells)))
+    if len(safeCells) > 0:
+      hintSteps.append(HintStep(f"No way of placing the mines around these numbers puts a mine in {'these cells' if len(safeCells) > 1 else 'this cell'}, so {'they are' if len(safeCells) > 1 else 'it is'} safe to reveal.", {}, toLocations(safeCells)))
+    return Move(cellsToReveal=toLocations(safeCells), cellsToFlag=toLocations(mineCells), hintSteps=hintSteps)
   return None
 
+@profiledRule
 def getRevealRemainingCells(board: Board) -> Move:
   """
   If there are no more mines to flag, this function will reveal the remaining cells.
@@ -217,7 +219,7 @@ def getRevealRemainingCells(board: Board) -> Move:
   remainingMines = board.getRemainingMineCount()
   
   if remainingMines == 0:
-    cellsToReveal = {cell.location for row in board.grid for cell in row if not cell.isVisible and not cell.isFlagged}
+    cellsToReveal = board.maskLocations(board.planeMask(board.hiddenPlane()))
     if len(cellsToReveal) > 0:      
       hintSteps : list[HintStep] = [
         HintStep("There are no remaining mines to flag. Reveal the remaining squares!", {}, cellsToReveal)
@@ -225,53 +227,351 @@ def getRevealRemainingCells(board: Board) -> Move:
       return Move(cellsToReveal= cellsToReveal, hintSteps= hintSteps)
   return None
 
-def getNextMove(board: Board, type: Literal['getFlagRemainingNeighbors', 'getExpandCell', 'getIntersectCells', 'getRevealRemainingCells', 'getFlagRemainingMines', None] = None) -> Move:
+@profiledRule
+def getGuessMove(board: Board, deadline: float = None) -> Move:
+  """
+  When no cell can be deduced for certain, picks the hidden cell least likely to hold a mine.
+  If counting the remaining mines proves some cells safe, those are revealed instead.
+  Args:
+    board (Board): The Minesweeper board.
+    deadline (float): A time.perf_counter() value after which the computation gives up. Defaults to no limit.
+  Returns:
+    Move: The move to reveal the safest cells, or None if there is nothing left to reveal or the odds cannot be computed.
+  Raises:
+    TimeoutError: If the deadline passes before the odds are computed.
+  """
+  probabilities = getMineProbabilities(board, deadline)
+  if probabilities is None:
+    return None
+  hiddenCells = [(probabilities[y][x], (x, y)) for y in range(board.height) for x in range(board.width) if not board.visiblePlane[y * board.width + x] and not board.flagPlane[y * board.width + x]]
+  if len(hiddenCells) == 0:
+    return None
+  lowestProbability = min(probability for probability, _ in hiddenCells)
+  if lowestProbability == 0:
+    safeCells = {location for probability, location in hiddenCells if probability == 0}
+    hintSteps: list[HintStep] = [
+      HintStep(f"There {'are' if board.getRemainingMineCount() != 1 else 'is'} only {board.getRemainingMineCount()} remaining mine{'s' if board.getRemainingMineCount() != 1 else ''} left to place.", {}, {location for _, location in hiddenCells}),
+      HintStep(f"Every way of placing {'them' if board.getRemainingMineCount() != 1 else 'it'} leaves {'these cells' if len(safeCells) > 1 else 'this cell'} safe.", {}, safeCells)
+    ]
+    return Move(cellsToReveal=safeCells, hintSteps=hintSteps)
+  guess = min(hiddenCells)[1]
+  hintSteps: list[HintStep] = [
+    HintStep(f"There is no certain move here, so a guess is needed. This cell has the lowest chance of being a mine ({round(lowestProbability * 100)}%).", {}, {guess})
+  ]
+  return Move(cellsToReveal={guess}, hintSteps=hintSteps, isGuess=True)
+
+def getNextMove(board: Board, type: Literal['getFlagRemainingNeighbors', 'getExpandCell', 'getIntersectCells', 'getReducedCells', 'getRevealRemainingCells', 'getFlagRemainingMines', 'getConstrainedCells', None] = None, deadline: float = None) -> Move:
   """
   Determines the next move to make on the Minesweeper board.
   Args:
     board (Board): The Minesweeper board.
+    type (str): Only try this rule. Defaults to trying every rule, cheapest first.
+    deadline (float): A time.perf_counter() value after which the constraint search gives up. Defaults to no limit.
   Returns:
     Move: The move to make, or None if no move is found.
+  Raises:
+    TimeoutError: If the deadline passes during the constraint search.
   """
-  visibleCells: list[dict] = list()
-  for row in board.grid:
-    for cell in row:
-      if cell.isVisible:
-        neighbors = board.neighbors(cell)
-        mineCount = board.cellMinesNum(cell)
-        flagCount = board.cellFlagsNum(cell)
-        visibleCells.append({
-          "location": cell.location,
-          "mineCount": mineCount,
-          "flagCount": flagCount,
-          "neighbors": neighbors
-        })
-        if type == 'getFlagRemainingNeighbors' or type is None:
-          move = getFlagRemainingNeighbors(cell, mineCount, flagCount, neighbors)
-          if move:
-            return move
-        if type == 'getExpandCell' or type is None:
-          move = getExpandCell(cell, mineCount, flagCount, neighbors)
-          if move:
-            return move
-  if type == 'getIntersectCells' or type is None:
-    pairCombos = itertools.combinations(visibleCells, 2)
-    for pair in pairCombos:
-      cell1Info = pair[0]
-      cell2Info = pair[1]
-      xDiff = cell1Info['location'][0] - cell2Info['location'][0]
-      yDiff = cell1Info['location'][1] - cell2Info['location'][1]
-      if xDiff < -2 or xDiff > 2 or yDiff < -2 or yDiff > 2:
-        continue
-      move = getIntersectCells(cell1Info['location'], cell1Info['mineCount'], cell1Info['flagCount'], cell1Info['neighbors'], cell2Info['location'], cell2Info['mineCount'], cell2Info['flagCount'], cell2Info['neighbors'])
+  mineCounts = board.mineCounts
+  flagCounts = board.flagCounts
+  hiddenPlane = board.hiddenPlane()
+  hiddenMask = board.planeMask(hiddenPlane)
+  hiddenCodes = board.neighborCodes(hiddenPlane)
+  frontierCells: dict[int, int] = dict() # neighborhood codes of the visible numbers that still need mines, by flat index
+  # the pattern tables tell which rule, if any, a number or a pair of numbers triggers; the rule then builds the move
+  for index in board.planeIndexes(board.visiblePlane):
+    code = hiddenCodes[index]
+    if code == 0:
+      continue
+    remaining = mineCounts[index] - flagCounts[index]
+    if mineCounts[index] != 0 and remaining != 0:
+      frontierCells[index] = code
+    template = singleTemplate(remaining, code)
+    if template == NO_MOVE:
+      continue
+    hiddenNeighbors = hiddenMask & board.neighborMask(index)
+    if (type == 'getFlagRemainingNeighbors' or type is None) and template in (FLAG_REMAINING, UNRESOLVED):
+      move = getFlagRemainingNeighbors(board, index, hiddenNeighbors)
       if move:
         return move
+    if (type == 'getExpandCell' or type is None) and template in (REVEAL_REMAINING, UNRESOLVED):
+      move = getExpandCell(board, index, hiddenNeighbors)
+      if move:
+        return move
+  if type == 'getIntersectCells' or type is None:
+    # only frontier numbers within a 5x5 window of each other can share hidden neighbors
+    width, height = board.width, board.height
+    for index, code in frontierCells.items():
+      x, y = index % width, index // width
+      for offset, (dx, dy) in enumerate(PAIR_OFFSETS):
+        if not (0 <= x + dx < width and y + dy < height):
+          continue
+        partner = index + dy * width + dx
+        partnerCode = frontierCells.get(partner)
+        if partnerCode is None:
+          continue
+        if pairTemplate(offset, mineCounts[index] - flagCounts[index], code, mineCounts[partner] - flagCounts[partner], partnerCode) == NO_MOVE:
+          continue
+        move = getIntersectCells(board, index, hiddenMask & board.neighborMask(index), partner, hiddenMask & board.neighborMask(partner))
+        if move:
+          return move
   if type == 'getRevealRemainingCells' or type is None:
     move = getRevealRemainingCells(board)
     if move:
       return move
+  if type == 'getReducedCells' or type is None:
+    move = getReducedCells(board)
+    if move:
+      return move
   if type == 'getFlagRemainingMines' or type is None:
     move = getFlagRemainingMines(board)
     if move:
       return move
-  return None
\ No newline at end of file
+  if type == 'getConstrainedCells' or type is None:
+    move = getConstrainedCells(board, deadline)
+    if move:
+      return move
+  return None
+
+class SolverSession:
+  def __init__(self, board: Board):
+    """
+    Initialize a SolverSession.
+    A session keeps a worklist of dirty cells: cells whose neighborhood changed since they were last examined.
+    Only dirty cells, and the pairs they form, are re-evaluated when looking for the next move, so solving a whole board
+    costs roughly one evaluation per changed cell instead of one full board scan per move.
+    Changes made to the board outside the session must be reported with markChanged, or reset must be called.
+    Every applied move is kept in a history along with the cells its deduction looked at, so moves can be undone: all
+    moves after a checkpoint with restore, or only the moves affected by a change to the mine layout with repair.
+    Args:
+      board (Board): The Minesweeper board to solve.
+    """
+    self.board = board
+    self.dirty: set[int] = set() # cells still to check with the single-cell rules
+    self.pending: set[int] = set() # cells that passed the single-cell rules and still need their pairs checked
+    self.history: list[tuple[set[int], list[tuple[int, int]], set[int]]] = [] # per applied move: (revealed cells, (flagged cell, previous flag) pairs, cells the move depends on or None for all)
+    self.reset()
+
+  def reset(self):
+    """
+    Mark every cell dirty and forget the move history, e.g. after the board was hidden or replaced.
+    """
+    self.dirty = set(range(self.board.size))
+    self.pending = set()
+    self.history = []
+
+  def markChanged(self, indexes: set[int]):
+    """
+    Mark changed cells and their neighbors dirty.
+    Args:
+      indexes (set[int]): The flat indexes of the cells whose state changed.
+    """
+    neighborTable = self.board.neighborTable
+    for index in indexes:
+      self.dirty.add(index)
+      self.dirty.update(neighborTable[index])
+
+  def applyMove(self, move: Move) -> set[int]:
+    """
+    Apply a move to the board, mark the cells it changed dirty and record it in the history.
+    The numbers highlighted by the move's hint steps are the ones its deduction used. The move depends on the state of
+    those numbers, of the cells it changed, and of all of their neighbors. A move that highlights no number (such as
+    counting the remaining mines) depends on the whole board.
+    Args:
+      move (Move): The move to apply.
+    Returns:
+      set[int]: The flat indexes of every cell that was revealed or flagged.
+    """
+    board = self.board
+    revealed: set[int] = set()
+    flagged: list[tuple[int, int]] = []
+    for x, y in move.cellsToReveal:
+      revealed.update(board.reveal(y * board.width + x))
+    for x, y in move.cellsToFlag:
+      index = y * board.width + x
+      flagged.append((index, board.flagPlane[index]))
+      board.setFlag(index, not board.flagPlane[index])
+    for x, y in move.cellsToExpand:
+      revealed.update(board.reveal(y * board.width + x))
+    changed = revealed.union(index for index, _ in flagged)
+    usedNumbers = {y * board.width + x for hintStep in move.hintSteps for x, y in hintStep.revealedCellsToHighlight}
+    dependencies = None
+    if len(usedNumbers) > 0 or len(move.hintSteps) == 0:
+      neighborTable = board.neighborTable
+      dependencies = usedNumbers | changed
+      for index in list(dependencies):
+        dependencies.update(neighborTable[index])
+    self.history.append((revealed, flagged, dependencies))
+    self.markChanged(changed)
+    return changed
+
+  def undoMoves(self, moves: list[tuple[set[int], list[tuple[int, int]], set[int]]]) -> set[int]:
+    """
+    Undo recorded moves, latest first, and mark the cells they changed dirty.
+    Returns:
+      set[int]: The flat indexes of the cells whose state was undone.
+    """
+    board = self.board
+    undone: set[int] = set()
+    for revealed, flagged, _ in reversed(moves):
+      for index in revealed:
+        board.visiblePlane[index] = 0
+      for index, previous in reversed(flagged):
+        board.setFlag(index, previous)
+      undone.update(revealed)
+      undone.update(index for index, _ in flagged)
+    self.markChanged(undone)
+    return undone
+
+  def checkpoint(self) -> int:
+    """
+    Get a checkpoint of the deduction state, to go back to with restore.
+    Returns:
+      int: The number of moves applied so far.
+    """
+    return len(self.history)
+
+  def restore(self, checkpoint: int) -> set[int]:
+    """
+    Undo every move applied after a checkpoint.
+    Args:
+      checkpoint (int): A value returned by checkpoint.
+    Returns:
+      set[int]: The flat indexes of the cells whose state was undone.
+    """
+    undoneMoves = self.history[checkpoint:]
+    del self.history[checkpoint:]
+    return self.undoMoves(undoneMoves)
+
+  def repair(self, changedCells: set[int]) -> set[int]:
+    """
+    Undo only the moves that are no longer justified after some cells changed whether they hold a mine.
+    A move is undone if it depends on a changed cell or on a cell changed by another undone move. Every other move still
+    follows from the same numbers, so the board stays in a state the solver can reach from the start without guessing.
+    Args:
+      changedCells (set[int]): The flat indexes of the cells whose mine was added or removed.
+    Returns:
+      set[int]: The flat indexes of the cells whose state was undone.
+    """
+    changed = set(changedCells)
+    keptMoves = []
+    undoneMoves = []
+    for record in self.history:
+      revealed, flagged, dependencies = record
+      if dependencies is None or not dependencies.isdisjoint(changed):
+        undoneMoves.append(record)
+        changed.update(revealed)
+        changed.update(index for index, _ in flagged)
+      else:
+        keptMoves.append(record)
+    self.history = keptMoves
+    self.markChanged(changedCells)
+    return self.undoMoves(undoneMoves)
+
+  def getNextMove(self, deadline: float = None) -> Move:
+    """
+    Determines the next move to make, examining only dirty cells for local deductions.
+    Cells that yield no move are marked clean until one of their neighbors changes.
+    Args:
+      deadline (float): A time.perf_counter() value after which the constraint search gives up. Defaults to no limit.
+    Returns:
+      Move: The move to make, or None if no move is found.
+    Raises:
+      TimeoutError: If the deadline passes during the constraint search.
+    """
+    board = self.board
+    visiblePlane = board.visiblePlane
+    mineCounts = board.mineCounts
+    flagCounts = board.flagCounts
+    hiddenPlane = board.hiddenPlane()
+    hiddenCodes: dict[int, int] = {} # neighborhood codes of the examined cells; only the cells near a change are encoded
+    hiddenMask = None # only built once a pattern lookup finds a move
+    def getCode(index: int) -> int:
+      code = hiddenCodes.get(index)
+      if code is None:
+        code = board.neighborCode(hiddenPlane, index)
+        hiddenCodes[index] = code
+      return code
+    for index in sorted(self.dirty):
+      if visiblePlane[index]:
+        template = singleTemplate(mineCounts[index] - flagCounts[index], getCode(index))
+        if template != NO_MOVE:
+          if hiddenMask is None:
+            hiddenMask = board.planeMask(hiddenPlane)
+          hiddenNeighbors = hiddenMask & board.neighborMask(index)
+          if template in (FLAG_REMAINING, UNRESOLVED):
+            move = getFlagRemainingNeighbors(board, index, hiddenNeighbors)
+            if move:
+              return move
+          if template in (REVEAL_REMAINING, UNRESOLVED):
+            move = getExpandCell(board, index, hiddenNeighbors)
+            if move:
+              return move
+        self.pending.add(index)
+      self.dirty.discard(index)
+    examined: set[int] = set()
+    width, height = board.width, board.height
+    for index in sorted(self.pending):
+      remaining = mineCounts[index] - flagCounts[index]
+      if visiblePlane[index] and mineCounts[index] != 0 and remaining != 0:
+        code = getCode(index)
+        x, y = index % width, index // width
+        for dx, dy, offset, indexIsFirst in WINDOW_PAIRS:
+          if not (0 <= x + dx < width and 0 <= y + dy < height):
+            continue
+          partner = index + dy * width + dx
+          partnerRemaining = mineCounts[partner] - flagCounts[partner]
+          if not visiblePlane[partner] or partner in examined or mineCounts[partner] == 0 or partnerRemaining == 0:
+            continue
+          if indexIsFirst:
+            template = pairTemplate(offset, remaining, code, partnerRemaining, getCode(partner))
+          else:
+            template = pairTemplate(offset, partnerRemaining, getCode(partner), remaining, code)
+          if template == NO_MOVE:
+            continue
+          if hiddenMask is None:
+            hiddenMask = board.planeMask(hiddenPlane)
+          hiddenNeighbors = hiddenMask & board.neighborMask(index)
+          partnerNeighbors = hiddenMask & board.neighborMask(partner)
+          if indexIsFirst:
+            move = getIntersectCells(board, index, hiddenNeighbors, partner, partnerNeighbors)
+          else:
+            move = getIntersectCells(board, partner, partnerNeighbors, index, hiddenNeighbors)
+          if move:
+            return move
+      examined.add(index)
+      self.pending.discard(index)
+    move = getRevealRemainingCells(board)
+    if move:
+      return move
+    move = getReducedCells(board)
+    if move:
+      return move
+    move = getFlagRemainingMines(board)
+    if move:
+      return move
+    return getConstrainedCells(board, deadline)
+
+  def solve(self, deadline: float = None) -> Iterator[Move]:
+    """
+    Play the board from its current position, yielding every move in order before applying it.
+    When the rules find nothing, the odds of the remaining cells are worked out with getGuessMove: cells they prove safe
+    are revealed and solving goes on. The first move that would need a guess (its isGuess is set) is yielded last and
+    not applied. Solving also stops when the board is solved or nothing is left to reveal.
+    Args:
+      deadline (float): A time.perf_counter() value after which the solver gives up. Defaults to no limit.
+    Yields:
+      Move: The moves to make, in order.
+    Raises:
+      TimeoutError: If the deadline passes. The moves yielded so far stay applied.
+    """
+    while True:
+      move = self.getNextMove(deadline)
+      if move is None:
+        move = getGuessMove(self.board, deadline)
+      if move is None:
+        return
+      yield move
+      if move.isGuess:
+        return
+      self.applyMove(move)